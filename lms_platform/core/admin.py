@@ -3,6 +3,14 @@ from django.contrib.auth.models import User
 from django.utils import timezone
 from datetime import timedelta
 from .models import UserProfile, Course, Module, Assignment, Enrollment, Submission
+from .counters import get_counters
+from .exports import streaming_export_response
+from .grading import apply_grades
+from .grading_queue import LeaseLost, claim_next, complete, peek_next, queue_metrics, release
+from .imports import IMPORT_COLUMNS, ImportFormatError, run_import
+from .paginators import EstimatedCountPaginator
+from .stats import recent_activity
+from .templatetags.avatars import avatar
 from django import forms
 
 # Import the UserAdmin from Django's auth module to customize the User model admin
@@ -10,8 +18,15 @@ from django.contrib.auth.admin import UserAdmin
 
 # For demo user admin restrictions
 from django.contrib import messages
-from django.http import HttpResponseRedirect
-from django.urls import reverse
+from django.http import HttpResponseBadRequest, HttpResponseRedirect
+from django.urls import path, reverse
+from django.core.exceptions import PermissionDenied
+from django.core.validators import MaxValueValidator
+from django.db.models import Count, F
+from django.db.models.functions import Upper
+from django.shortcuts import get_object_or_404
+from django.template.response import TemplateResponse
+import io
 
 
 class LMSAdminSite(admin.AdminSite):
@@ -24,36 +39,16 @@ class LMSAdminSite(admin.AdminSite):
     
     def index(self, request, extra_context=None):
         """
-        Override the default admin index to provide real data counts
+        Override the default admin index to provide real data counts.
+        Totals are read from StatCounter rows maintained by signals.
         """
         extra_context = extra_context or {}
         
-        # Get real counts from the database
-        extra_context.update({
-            # User counts
-            'total_users': User.objects.count(),
-            'total_profiles': UserProfile.objects.count(),
-            'students_count': UserProfile.objects.filter(role='student').count(),
-            'instructors_count': UserProfile.objects.filter(role='instructor').count(),
-            'admins_count': UserProfile.objects.filter(role='admin').count(),
-            
-            # Academic content counts
-            'total_courses': Course.objects.count(),
-            'total_modules': Module.objects.count(),
-            'total_assignments': Assignment.objects.count(),
-            
-            # Activity counts
-            'total_enrollments': Enrollment.objects.count(),
-            'active_enrollments': Enrollment.objects.filter(status='active').count(),
-            'total_submissions': Submission.objects.count(),
-            'graded_submissions': Submission.objects.filter(status='graded').count(),
-            'pending_submissions': Submission.objects.filter(status='submitted').count(),
-            
-            # Recent activity (last 7 days)
-            'recent_enrollments': Enrollment.objects.filter(
-                enrollment_date__gte=timezone.now() - timedelta(days=7)
-            ).count(),
-        })
+        # Counts come from the pre-aggregated counter table (one small query)
+        extra_context.update(get_counters())
+        
+        # Recent activity (last 7 days), cached briefly by core.stats
+        extra_context.update(recent_activity(days=7))
         
         return super().index(request, extra_context)
 
@@ -62,39 +57,6 @@ class LMSAdminSite(admin.AdminSite):
 admin_site = LMSAdminSite(name='lms_admin')
 
 
-class CourseAdmin(admin.ModelAdmin):
-    """ Custom admin for Course model to filter instructors """
-    def formfield_for_foreignkey(self, db_field, request, **kwargs):
-        if db_field.name == "instructor":
-            # Only show users who have instructor role
-            instructor_profiles = UserProfile.objects.filter(role='instructor')
-            instructor_users = [profile.user.id for profile in instructor_profiles]
-            kwargs["queryset"] = User.objects.filter(id__in=instructor_users)
-        return super().formfield_for_foreignkey(db_field, request, **kwargs)
-
-
-class EnrollmentAdmin(admin.ModelAdmin):
-    """ Custom admin for Enrollment model to filter students """
-    def formfield_for_foreignkey(self, db_field, request, **kwargs):
-        if db_field.name == "student":
-            # Only show users who have student role
-            student_profiles = UserProfile.objects.filter(role='student')
-            student_users = [profile.user.id for profile in student_profiles]
-            kwargs["queryset"] = User.objects.filter(id__in=student_users)
-        return super().formfield_for_foreignkey(db_field, request, **kwargs)
-
-
-class SubmissionAdmin(admin.ModelAdmin):
-    """ Custom admin for Submission model to filter students """
-    def formfield_for_foreignkey(self, db_field, request, **kwargs):
-        if db_field.name == "student":
-            # Only show users who have student role
-            student_profiles = UserProfile.objects.filter(role='student')
-            student_users = [profile.user.id for profile in student_profiles]
-            kwargs["queryset"] = User.objects.filter(id__in=student_users)
-        return super().formfield_for_foreignkey(db_field, request, **kwargs)
-
-
 class AssignmentAdminForm(forms.ModelForm):
     """ Custom form for Assignment model to handle specific field types and validation.
     This form allows for better control over how the fields are displayed in the admin interface.
@@ -124,13 +86,6 @@ class AssignmentAdminForm(forms.ModelForm):
         }
 
 
-class AssignmentAdmin(admin.ModelAdmin):
-    form = AssignmentAdminForm
-    list_display = ['assignment_name', 'module', 'due_date', 'max_points', 'assignment_type']
-    list_filter = ['assignment_type', 'due_date', 'module__course']
-    search_fields = ['assignment_name', 'description']
-
-
 # Custom mixin to restrict demo user actions
 class DemoUserMixin:
     """
@@ -228,54 +183,406 @@ class DemoUserMixin:
         )
 
 
-# Update existing admin classes to use the mixin
-class CourseAdmin(DemoUserMixin, admin.ModelAdmin):
-    """ Custom admin for Course model to filter instructors """
+def is_autocomplete_request(request):
+    """True when the request is for the admin's autocomplete JSON endpoint"""
+    match = getattr(request, 'resolver_match', None)
+    return match is not None and match.url_name == 'autocomplete'
+
+
+class PrefixAutocompleteMixin:
+    """
+    Answer admin autocomplete requests with a case-insensitive prefix match
+    on one column, UPPER(column) LIKE 'TERM%', which PostgreSQL serves from
+    the UPPER(column) text_pattern_ops indexes added in migration 0009. The
+    regular changelist search keeps using search_fields.
+    """
+    autocomplete_prefix_field = None
+    autocomplete_select_related = ()  # relations used by the result __str__
+
+    def filter_autocomplete_queryset(self, request, queryset):
+        """Hook for extra filtering of autocomplete results"""
+        return queryset
+
+    def get_search_results(self, request, queryset, search_term):
+        if not (self.autocomplete_prefix_field and is_autocomplete_request(request)):
+            return super().get_search_results(request, queryset, search_term)
+        queryset = self.filter_autocomplete_queryset(request, queryset)
+        queryset = queryset.alias(prefix_key=Upper(self.autocomplete_prefix_field))
+        term = search_term.strip().upper()
+        if term:
+            queryset = queryset.filter(prefix_key__startswith=term)
+        if self.autocomplete_select_related:
+            queryset = queryset.select_related(*self.autocomplete_select_related)
+        # Stable order so the endpoint's 20-per-page pagination walks the index
+        return queryset.order_by('prefix_key', 'pk'), False
+
+
+# Users offered in FK dropdowns/autocompletes, keyed by (model_name, field_name)
+USER_FIELD_ROLES = {
+    ('course', 'instructor'): ['instructor'],
+    ('enrollment', 'student'): ['student'],
+    ('submission', 'student'): ['student'],
+    ('submission', 'graded_by'): ['instructor', 'admin'],
+}
+
+
+def users_with_roles(roles):
+    """Users whose profile has one of the roles, as a single JOIN (no id__in list)"""
+    return User.objects.filter(userprofile__role__in=roles)
+
+
+class RoleFilteredUserFieldsMixin:
+    """Limit User foreign keys to the roles listed in USER_FIELD_ROLES"""
     def formfield_for_foreignkey(self, db_field, request, **kwargs):
-        if db_field.name == "instructor":
-            # Only show users who have instructor role
-            instructor_profiles = UserProfile.objects.filter(role='instructor')
-            instructor_users = [profile.user.id for profile in instructor_profiles]
-            kwargs["queryset"] = User.objects.filter(id__in=instructor_users)
+        roles = USER_FIELD_ROLES.get((self.model._meta.model_name, db_field.name))
+        if roles:
+            kwargs["queryset"] = users_with_roles(roles)
         return super().formfield_for_foreignkey(db_field, request, **kwargs)
 
 
-class EnrollmentAdmin(DemoUserMixin, admin.ModelAdmin):
+# Update existing admin classes to use the mixin
+class CourseAdmin(PrefixAutocompleteMixin, RoleFilteredUserFieldsMixin, DemoUserMixin, admin.ModelAdmin):
+    """ Custom admin for Course model to filter instructors """
+    list_display = ['course_code', 'course_name', 'term', 'instructor', 'credits', 'max_enrollment']
+    list_select_related = ['instructor']
+    list_filter = ['term']
+    search_fields = ['course_code', 'course_name']
+    autocomplete_prefix_field = 'course_code'
+
+
+class StreamingExportMixin:
+    """
+    Admin actions that stream the selected rows as CSV or JSONL.
+    Use "Select all" to export every row matching the current filters.
+    export_kind names the column set in core/exports.py.
+    """
+    export_kind = None
+    actions = ['export_csv', 'export_jsonl']
+
+    @admin.action(description='Export selected %(verbose_name_plural)s as CSV')
+    def export_csv(self, request, queryset):
+        return streaming_export_response(self.export_kind, queryset, 'csv')
+
+    @admin.action(description='Export selected %(verbose_name_plural)s as JSONL')
+    def export_jsonl(self, request, queryset):
+        return streaming_export_response(self.export_kind, queryset, 'jsonl')
+
+
+class CSVImportForm(forms.Form):
+    file = forms.FileField(help_text='CSV with a header row')
+
+
+class CSVImportMixin:
+    """
+    Adds an "Import CSV" page to the changelist (see core/imports.py).
+    import_kind selects the file layout: 'enrollments' or 'grades'.
+    """
+    import_kind = None
+    max_import_errors = 50
+
+    def get_urls(self):
+        opts = self.model._meta
+        return [
+            path(
+                'import/',
+                self.admin_site.admin_view(self.import_view),
+                name=f'{opts.app_label}_{opts.model_name}_import',
+            ),
+        ] + super().get_urls()
+
+    def changelist_view(self, request, extra_context=None):
+        extra_context = extra_context or {}
+        opts = self.model._meta
+        extra_context['import_url'] = reverse(f'admin:{opts.app_label}_{opts.model_name}_import')
+        return super().changelist_view(request, extra_context)
+
+    def import_view(self, request):
+        # Imports both create rows and update existing ones
+        if not (self.has_add_permission(request) and self.has_change_permission(request)):
+            raise PermissionDenied
+        opts = self.model._meta
+        report = None
+        form = CSVImportForm(request.POST or None, request.FILES or None)
+        if request.method == 'POST' and form.is_valid():
+            if request.user.username == 'PortfolioDemo':
+                messages.success(
+                    request,
+                    'Demo Mode: the file would have been imported successfully! '
+                    'No actual data was changed for this demonstration.'
+                )
+                return HttpResponseRedirect(reverse(f'admin:{opts.app_label}_{opts.model_name}_changelist'))
+            # Read the upload as a text stream; large uploads stay on disk
+            stream = io.TextIOWrapper(form.cleaned_data['file'].file, encoding='utf-8-sig', newline='')
+            try:
+                report = run_import(self.import_kind, stream, user=request.user)
+            except ImportFormatError as error:
+                form.add_error('file', str(error))
+            else:
+                level = messages.WARNING if report.errors else messages.SUCCESS
+                messages.add_message(request, level, f'Import finished. {report.summary()}.')
+
+        required, optional = IMPORT_COLUMNS[self.import_kind]
+        context = {
+            **self.admin_site.each_context(request),
+            'title': f'Import {opts.verbose_name_plural} from CSV',
+            'opts': opts,
+            'form': form,
+            'columns': required + [f'{column} (optional)' for column in optional],
+            'report': report,
+            'errors': report.errors[:self.max_import_errors] if report else [],
+        }
+        return TemplateResponse(request, 'admin/core/csv_import.html', context)
+
+
+class EnrollmentAdmin(CSVImportMixin, StreamingExportMixin, RoleFilteredUserFieldsMixin, DemoUserMixin, admin.ModelAdmin):
     """ Custom admin for Enrollment model to filter students """
-    def formfield_for_foreignkey(self, db_field, request, **kwargs):
-        if db_field.name == "student":
-            # Only show users who have student role
-            student_profiles = UserProfile.objects.filter(role='student')
-            student_users = [profile.user.id for profile in student_profiles]
-            kwargs["queryset"] = User.objects.filter(id__in=student_users)
-        return super().formfield_for_foreignkey(db_field, request, **kwargs)
+    list_display = ['student', 'course', 'status', 'current_grade', 'final_grade', 'enrollment_date']
+    list_select_related = ['student', 'course']
+    list_filter = ['status']
+    # Avoid exact COUNT(*)s on the enrollment table (see core/paginators.py)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    search_fields = ['student__username', 'course__course_code']
+    # Search-as-you-type instead of rendering every student/course as an <option>
+    autocomplete_fields = ['student', 'course']
+    export_kind = 'enrollments'
+    import_kind = 'enrollments'
+
+
+class BulkGradeForm(forms.Form):
+    submission = forms.IntegerField(widget=forms.HiddenInput)
+    grade = forms.DecimalField(required=False, max_digits=5, decimal_places=2, min_value=0)
+    feedback = forms.CharField(required=False, widget=forms.Textarea(attrs={'rows': 2}))
+
+    def __init__(self, *args, max_points=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if max_points is not None:
+            self.fields['grade'].validators.append(MaxValueValidator(max_points))
+            self.fields['grade'].widget.attrs.update({'max': max_points, 'step': '0.01'})
 
 
-class SubmissionAdmin(DemoUserMixin, admin.ModelAdmin):
+BulkGradeFormSet = forms.formset_factory(BulkGradeForm, extra=0)
+
+
+class SubmissionAdmin(CSVImportMixin, StreamingExportMixin, RoleFilteredUserFieldsMixin, DemoUserMixin, admin.ModelAdmin):
     """ Custom admin for Submission model to filter students """
-    def formfield_for_foreignkey(self, db_field, request, **kwargs):
-        if db_field.name == "student":
-            # Only show users who have student role
-            student_profiles = UserProfile.objects.filter(role='student')
-            student_users = [profile.user.id for profile in student_profiles]
-            kwargs["queryset"] = User.objects.filter(id__in=student_users)
-        return super().formfield_for_foreignkey(db_field, request, **kwargs)
+    list_display = ['student', 'assignment', 'course_code', 'status', 'grade', 'submission_date', 'graded_by']
+    list_select_related = ['student', 'assignment__module__course', 'graded_by']
+    list_filter = ['status']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    search_fields = ['student__username', 'assignment__assignment_name']
+    autocomplete_fields = ['student', 'assignment', 'graded_by']
+    export_kind = 'submissions'
+    import_kind = 'grades'
+    
+    # Pending submissions shown per bulk grading page
+    bulk_grade_page_size = 100
+
+    @admin.display(description='Course', ordering='assignment__module__course__course_code')
+    def course_code(self, obj):
+        return obj.assignment.module.course.course_code
 
+    def get_urls(self):
+        return [
+            path('grade/', self.admin_site.admin_view(self.bulk_grade_view), name='core_submission_bulk_grade'),
+            path('grade/next/', self.admin_site.admin_view(self.grade_next_view), name='core_submission_grade_next'),
+        ] + super().get_urls()
 
-class AssignmentAdmin(DemoUserMixin, admin.ModelAdmin):
+    def changelist_view(self, request, extra_context=None):
+        extra_context = extra_context or {}
+        extra_context['bulk_grade_url'] = reverse('admin:core_submission_bulk_grade')
+        extra_context['grade_next_url'] = reverse('admin:core_submission_grade_next')
+        return super().changelist_view(request, extra_context)
+
+    def bulk_grade_view(self, request):
+        """
+        Grade an assignment's pending submissions in one screen.
+        Rows left without a grade stay pending; everything else is saved
+        with one bulk_update (see core/grading.py).
+        """
+        if not self.has_change_permission(request):
+            raise PermissionDenied
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': 'Bulk grade submissions',
+        }
+        assignment_id = request.GET.get('assignment')
+        if not assignment_id:
+            # Assignment picker: pending counts in one GROUP BY over the pending-only index
+            context['assignments'] = (
+                Submission.objects.filter(status='submitted').order_by()
+                .values(
+                    'assignment_id',
+                    'assignment__assignment_name',
+                    'assignment__max_points',
+                    course_code=F('assignment__module__course__course_code'),
+                )
+                .annotate(pending=Count('id'))
+                .order_by('course_code', 'assignment__assignment_name')
+            )
+            return TemplateResponse(request, 'admin/core/bulk_grade.html', context)
+
+        assignment = get_object_or_404(Assignment.objects.select_related('module__course'), pk=assignment_id)
+        form_kwargs = {'max_points': assignment.max_points}
+        if request.method == 'POST':
+            formset = BulkGradeFormSet(request.POST, form_kwargs=form_kwargs)
+            if formset.is_valid():
+                entries = {
+                    form.cleaned_data['submission']: form.cleaned_data
+                    for form in formset if form.cleaned_data.get('grade') is not None
+                }
+                submissions = list(
+                    Submission.objects.filter(assignment=assignment, status='submitted', pk__in=entries)
+                    .only('id', 'student_id', 'assignment_id', 'status')
+                )
+                for submission in submissions:
+                    submission.grade = entries[submission.pk]['grade']
+                    submission.feedback = entries[submission.pk]['feedback']
+                if request.user.username == 'PortfolioDemo':
+                    messages.success(
+                        request,
+                        f'Demo Mode: {len(submissions)} submission(s) would have been graded successfully! '
+                        f'No actual data was changed for this demonstration.'
+                    )
+                else:
+                    graded = apply_grades(submissions, request.user)
+                    messages.success(request, f'Graded {graded} submission(s) for {assignment.assignment_name}.')
+                if len(submissions) < len(entries):
+                    messages.warning(
+                        request,
+                        f'{len(entries) - len(submissions)} submission(s) were graded by someone else meanwhile and were skipped.'
+                    )
+                return HttpResponseRedirect(request.get_full_path())
+            submission_ids = [form['submission'].value() for form in formset]
+        else:
+            submission_ids = list(
+                Submission.objects.filter(assignment=assignment, status='submitted')
+                .order_by('submission_date')
+                .values_list('id', flat=True)[:self.bulk_grade_page_size]
+            )
+            formset = BulkGradeFormSet(
+                initial=[{'submission': submission_id} for submission_id in submission_ids],
+                form_kwargs=form_kwargs,
+            )
+
+        submissions = Submission.objects.filter(assignment=assignment, pk__in=submission_ids).select_related('student')
+        by_id = {str(submission.pk): submission for submission in submissions}
+        context.update({
+            'assignment': assignment,
+            'formset': formset,
+            'rows': [(by_id.get(str(form['submission'].value())), form) for form in formset],
+        })
+        return TemplateResponse(request, 'admin/core/bulk_grade.html', context)
+
+    def grade_next_view(self, request):
+        """
+        Grade pending submissions one at a time from the shared work queue.
+        Each grader is handed a different submission (see core/grading_queue.py),
+        optionally narrowed with ?assignment= or ?course=.
+        """
+        if not self.has_change_permission(request):
+            raise PermissionDenied
+        try:
+            filters = {
+                'assignment_id': int(request.GET['assignment']) if request.GET.get('assignment') else None,
+                'course_id': int(request.GET['course']) if request.GET.get('course') else None,
+            }
+            submission_id = int(request.POST['submission']) if request.method == 'POST' else None
+        except (KeyError, ValueError):
+            return HttpResponseBadRequest('Invalid submission, assignment or course id.')
+        # The read-only demo account looks at the queue without leasing anything
+        demo_user = request.user.username == 'PortfolioDemo'
+        if request.method == 'POST':
+            action = request.POST.get('action')
+            if action == 'release':
+                release(submission_id, request.user)
+                messages.info(request, 'Submission released back to the queue.')
+                return HttpResponseRedirect(reverse('admin:core_submission_changelist'))
+            if action == 'skip' and demo_user:
+                messages.info(request, 'Demo Mode: the next grader would now get a different submission.')
+                return HttpResponseRedirect(request.get_full_path())
+            if action == 'skip':
+                # claim_next() only gives up the old claim when it finds another submission
+                if claim_next(request.user, exclude=[submission_id], **filters) is None:
+                    release(submission_id, request.user)
+                return HttpResponseRedirect(request.get_full_path())
+            submission = get_object_or_404(
+                Submission.objects.select_related('student', 'assignment__module__course'), pk=submission_id
+            )
+            form = BulkGradeForm(request.POST, max_points=submission.assignment.max_points)
+            if form.is_valid() and form.cleaned_data['grade'] is not None:
+                if demo_user:
+                    messages.success(
+                        request,
+                        'Demo Mode: Submission would have been graded successfully! '
+                        'No actual data was changed for this demonstration.'
+                    )
+                    return HttpResponseRedirect(request.get_full_path())
+                try:
+                    complete(submission.pk, request.user, form.cleaned_data['grade'], form.cleaned_data['feedback'])
+                except LeaseLost:
+                    messages.error(
+                        request,
+                        'Your claim on this submission expired and it was taken by another grader; the grade was not saved.'
+                    )
+                else:
+                    messages.success(request, f'Graded {submission}.')
+                return HttpResponseRedirect(request.get_full_path())
+            if form.is_valid():
+                form.add_error('grade', 'Enter a grade, or skip this submission.')
+        else:
+            submission = peek_next(**filters) if demo_user else claim_next(request.user, **filters)
+            form = None
+            if submission is not None:
+                form = BulkGradeForm(
+                    initial={'submission': submission.pk}, max_points=submission.assignment.max_points
+                )
+
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': 'Grade next submission',
+            'submission': submission,
+            'form': form,
+            'metrics': queue_metrics(**filters),
+        }
+        return TemplateResponse(request, 'admin/core/grade_next.html', context)
+
+
+class AssignmentAdmin(PrefixAutocompleteMixin, DemoUserMixin, admin.ModelAdmin):
     form = AssignmentAdminForm
     list_display = ['assignment_name', 'module', 'due_date', 'max_points', 'assignment_type']
+    list_select_related = ['module__course']  # Module.__str__ shows the course code
     list_filter = ['assignment_type', 'due_date', 'module__course']
     search_fields = ['assignment_name', 'description']
+    autocomplete_fields = ['module']
+    autocomplete_prefix_field = 'assignment_name'
+    autocomplete_select_related = ['module__course']
 
 
 # Add mixin to other admin classes
 class UserProfileAdmin(DemoUserMixin, admin.ModelAdmin):
-    pass
+    list_display = ['picture', 'first_name', 'last_name', 'user', 'role', 'phone_number']
+    list_display_links = ['first_name']
+    list_select_related = ['user']
+    list_filter = ['role']
+    search_fields = ['first_name', 'last_name', 'user__username']
 
+    @admin.display(description='')
+    def picture(self, obj):
+        # A 32px variant, not the full-size upload (see core/images.py)
+        return avatar(obj, 32)
 
-class ModuleAdmin(DemoUserMixin, admin.ModelAdmin):
-    pass
+
+class ModuleAdmin(PrefixAutocompleteMixin, DemoUserMixin, admin.ModelAdmin):
+    list_display = ['module_name', 'course', 'order_number', 'updated_at']
+    list_select_related = ['course']
+    search_fields = ['module_name', 'course__course_code']
+    autocomplete_fields = ['course']
+    autocomplete_prefix_field = 'module_name'
+    autocomplete_select_related = ['course']
 
 
 
@@ -298,7 +605,7 @@ admin_site.register(Submission, SubmissionAdmin)
 
 # Register Django's built-in User model with demo restrictions
 from django.contrib.auth.admin import UserAdmin
-class DemoUserAdmin(DemoUserMixin, UserAdmin):
+class DemoUserAdmin(PrefixAutocompleteMixin, DemoUserMixin, UserAdmin):
     """Custom User admin with hidden password details and demo protections"""
     
     # Explicitly set all necessary attributes
@@ -306,6 +613,14 @@ class DemoUserAdmin(DemoUserMixin, UserAdmin):
     list_filter = ('is_staff', 'is_superuser', 'is_active', 'groups')
     search_fields = ('username', 'first_name', 'last_name', 'email')
     ordering = ('username',)
+    autocomplete_prefix_field = 'username'
+    
+    def filter_autocomplete_queryset(self, request, queryset):
+        """Only offer users whose role fits the field (student, graded_by, ...)"""
+        roles = USER_FIELD_ROLES.get((request.GET.get('model_name'), request.GET.get('field_name')))
+        if roles:
+            queryset = queryset.filter(userprofile__role__in=roles)
+        return queryset
     
     def get_fieldsets(self, request, obj=None):
         """Override fieldsets to hide password details but keep functionality"""
@@ -3,4 +3,8 @@ from django.apps import AppConfig
 
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'lms_platform.core'
\ No newline at end of file
+    name = 'lms_platform.core'
+
+    def ready(self):
+        # Register signal handlers (dashboard counters, etc.)
+        from . import signals  # noqa: F401
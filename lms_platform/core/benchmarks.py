@@ -0,0 +1,308 @@
+"""
+Benchmarks for the LMS hot paths.
+
+Generates deterministic synthetic data with core.seeding.LoadDataGenerator
+and measures latency, query count and peak Python memory for the student
+portal, the admin dashboard and every admin changelist. Results are plain
+dicts so they can be written out as a JSON report by the run_benchmarks
+management command and compared against a previous release's report.
+
+benchmark_gradebook() times the three course-grade recompute paths (a
+naive per-enrollment loop, the SQL CASE update and the NumPy path) on a
+single synthetic course.
+"""
+import platform
+import random
+import statistics
+import time
+import tracemalloc
+
+import django
+from django.contrib.auth.models import User
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .gradebook import (
+    gpa_points_for, recompute_course, recompute_course_vectorized, weighted_grade,
+)
+from .middleware import QueryRecorder
+from .models import UserProfile, Course, Module, Assignment, Enrollment, Submission
+from .seeding import BATCH_SIZE, LoadDataGenerator, Seeder
+
+
+# Named dataset sizes (number of synthetic students)
+SCALES = {
+    'small': 100,
+    'medium': 1000,
+    'large': 10000,
+}
+
+# Steady-state query budgets; exceeding one is reported as a regression
+QUERY_BUDGETS = {
+    'student_dashboard': 8,
+    'student_login': 12,
+    'admin_index': 8,
+    'admin_changelist': 8,
+}
+
+# A target is this much slower than the baseline report before it is flagged
+LATENCY_REGRESSION_RATIO = 1.5
+
+BENCHMARK_ADMIN = 'benchmark_admin'
+BENCHMARK_PASSWORD = LoadDataGenerator.PASSWORD
+
+CHANGELIST_MODELS = [UserProfile, Course, Module, Assignment, Enrollment, Submission, User]
+
+
+def get_targets():
+    """(name, budget key, method, url, data, role) for every benchmarked request"""
+    targets = [
+        ('student_dashboard', 'student_dashboard', 'get', reverse('student_dashboard'), None, 'student'),
+        ('student_login', 'student_login', 'post', reverse('student_login'), 'credentials', None),
+        ('admin_index', 'admin_index', 'get', reverse('admin:index'), None, 'admin'),
+    ]
+    for model in CHANGELIST_MODELS:
+        opts = model._meta
+        targets.append((
+            f'admin_changelist_{opts.model_name}',
+            'admin_changelist',
+            'get',
+            reverse(f'admin:{opts.app_label}_{opts.model_name}_changelist'),
+            None,
+            'admin',
+        ))
+    return targets
+
+
+def prepare_dataset(scale, seed=0):
+    """Generate (or top up) the synthetic dataset and the benchmark admin"""
+    with transaction.atomic():
+        summary = LoadDataGenerator(scale=scale, seed=seed).generate()
+        Seeder().seed_users([{
+            'username': BENCHMARK_ADMIN,
+            'email': 'benchmark@example.com',
+            'password': BENCHMARK_PASSWORD,
+            'first_name': 'Benchmark',
+            'last_name': 'Admin',
+            'role': 'admin',
+            'is_staff': True,
+            'is_superuser': True,
+        }])
+    summary['submissions'] = Submission.objects.count()
+    summary['enrollments'] = Enrollment.objects.count()
+    return summary
+
+
+def measure_request(client, method, url, data, repeat):
+    """Time `repeat` requests and capture queries and peak memory of one more"""
+    send = getattr(client, method)
+    cache.clear()
+    with CaptureQueriesContext(connection) as cold_queries:
+        response = send(url, data) if data else send(url)
+    if response.status_code >= 400:
+        raise RuntimeError(f'{method.upper()} {url} returned {response.status_code}')
+
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        send(url, data) if data else send(url)
+        timings.append((time.perf_counter() - started) * 1000)
+
+    with CaptureQueriesContext(connection) as warm_queries:
+        tracemalloc.start()
+        send(url, data) if data else send(url)
+        peak_memory = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    return {
+        'status': response.status_code,
+        'latency_ms': {
+            'min': round(min(timings), 2),
+            'median': round(statistics.median(timings), 2),
+            'p95': round(sorted(timings)[max(0, round(len(timings) * 0.95) - 1)], 2),
+            'max': round(max(timings), 2),
+        },
+        'queries': len(warm_queries),
+        'cold_queries': len(cold_queries),
+        'sql_ms': round(sum(float(query['time']) for query in warm_queries) * 1000, 2),
+        'peak_memory_kb': round(peak_memory / 1024, 1),
+    }
+
+
+def run_scale(scale, repeat=5, seed=0):
+    """Benchmark every target against a dataset of `scale` students"""
+    dataset = prepare_dataset(scale, seed=seed)
+    student = User.objects.filter(username__startswith=f'{LoadDataGenerator.PREFIX}_student_').order_by('id').first()
+    clients = {'student': Client(), 'admin': Client()}
+    clients['student'].force_login(student)
+    clients['admin'].force_login(User.objects.get(username=BENCHMARK_ADMIN))
+    credentials = {'username': student.username, 'password': BENCHMARK_PASSWORD}
+
+    results = {}
+    for name, budget_key, method, url, data, role in get_targets():
+        client = clients[role] if role else Client()
+        result = measure_request(client, method, url, credentials if data == 'credentials' else None, repeat)
+        result['query_budget'] = QUERY_BUDGETS[budget_key]
+        result['within_budget'] = result['queries'] <= result['query_budget']
+        results[name] = result
+    return {'students': scale, 'dataset': dataset, 'results': results}
+
+
+def run_benchmarks(scales, repeat=5, seed=0):
+    """Run every scale in ascending size order and build the JSON report"""
+    report = {
+        'generated_at': timezone.now().isoformat(),
+        'environment': {
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+        },
+        'repeat': repeat,
+        'seed': seed,
+        'scales': {},
+    }
+    for name in sorted(scales, key=lambda scale: SCALES[scale]):
+        report['scales'][name] = run_scale(SCALES[name], repeat=repeat, seed=seed)
+    return report
+
+
+def find_regressions(report, baseline):
+    """
+    Compare a report with a previous one.
+    Flags targets over their query budget, using more queries than the
+    baseline, or slower than LATENCY_REGRESSION_RATIO times its median.
+    """
+    regressions = []
+    for scale, data in report['scales'].items():
+        previous = baseline.get('scales', {}).get(scale, {}).get('results', {}) if baseline else {}
+        for target, result in data['results'].items():
+            if not result['within_budget']:
+                regressions.append(
+                    f"{scale}/{target}: {result['queries']} queries exceeds budget of {result['query_budget']}"
+                )
+            before = previous.get(target)
+            if not before:
+                continue
+            if result['queries'] > before['queries']:
+                regressions.append(f"{scale}/{target}: queries {before['queries']} -> {result['queries']}")
+            old_median, new_median = before['latency_ms']['median'], result['latency_ms']['median']
+            if old_median and new_median > old_median * LATENCY_REGRESSION_RATIO:
+                regressions.append(f"{scale}/{target}: median latency {old_median}ms -> {new_median}ms")
+    return regressions
+
+
+GRADEBOOK_COURSE = 'GRADEBOOK'
+GRADEBOOK_PREFIX = 'gradebook_student'
+
+
+def prepare_gradebook_course(students, assignments=10, seed=0):
+    """One course with `students` enrollments and a graded submission per assignment"""
+    seeder = Seeder()
+    instructor = seeder.seed_users([{
+        'username': 'gradebook_instructor',
+        'email': 'gradebook@example.com',
+        'first_name': 'Gradebook',
+        'last_name': 'Instructor',
+        'role': 'instructor',
+        'password': BENCHMARK_PASSWORD,
+    }])['gradebook_instructor']
+    course = seeder.seed_courses([{
+        'course_code': GRADEBOOK_COURSE,
+        'course_name': 'Gradebook Benchmark',
+        'description': 'Synthetic course for gradebook benchmarks.',
+        'credits': 3,
+        'max_enrollment': students,
+    }], term=LoadDataGenerator.TERM, instructor=instructor)[0]
+    module = seeder.seed_modules([{
+        'course': course, 'order_number': 1, 'module_name': 'Module 1', 'description': '', 'content': '',
+    }])[0]
+    types = [choice[0] for choice in Assignment.ASSIGNMENT_TYPES]
+    course_assignments = seeder.seed_assignments([
+        {
+            'module': module,
+            'assignment_name': f'Gradebook A{number}',
+            'description': '',
+            'due_date': timezone.now(),
+            'max_points': 100,
+            'assignment_type': types[number % len(types)],
+            'instructions': '',
+        }
+        for number in range(assignments)
+    ])
+
+    usernames = [f'{GRADEBOOK_PREFIX}_{number:06d}' for number in range(students)]
+    password = make_password(BENCHMARK_PASSWORD)
+    User.objects.bulk_create(
+        [User(username=username, password=password) for username in usernames],
+        batch_size=BATCH_SIZE, ignore_conflicts=True,
+    )
+    student_ids = list(User.objects.filter(username__in=usernames).values_list('id', flat=True))
+    Enrollment.objects.bulk_create(
+        [Enrollment(student_id=student_id, course=course) for student_id in student_ids],
+        batch_size=BATCH_SIZE, ignore_conflicts=True,
+    )
+    rng = random.Random(seed)
+    Submission.objects.bulk_create(
+        [
+            Submission(student_id=student_id, assignment=assignment, status='graded',
+                       grade=rng.randint(40, assignment.max_points))
+            for student_id in student_ids for assignment in course_assignments
+        ],
+        batch_size=BATCH_SIZE, ignore_conflicts=True,
+    )
+    return course
+
+
+def naive_recompute_course(course):
+    """Per-enrollment loop: the baseline the set-based paths are measured against"""
+    updated = 0
+    for enrollment in Enrollment.objects.filter(course=course):
+        type_totals = {}
+        submissions = Submission.objects.filter(
+            student_id=enrollment.student_id, assignment__module__course=course, grade__isnull=False,
+        ).select_related('assignment')
+        for submission in submissions:
+            points, possible = type_totals.get(submission.assignment.assignment_type, (0, 0))
+            type_totals[submission.assignment.assignment_type] = (
+                points + submission.grade, possible + submission.assignment.max_points
+            )
+        enrollment.current_grade = weighted_grade(type_totals)
+        enrollment.gpa_points = gpa_points_for(enrollment.current_grade)
+        enrollment.save(update_fields=['current_grade', 'gpa_points'])
+        updated += 1
+    return updated
+
+
+def benchmark_gradebook(students=20000, assignments=10, seed=0):
+    """
+    Time each recompute path over the same course.
+    Enrollment grades are cleared before each run so every path writes every row.
+    """
+    with transaction.atomic():
+        course = prepare_gradebook_course(students, assignments=assignments, seed=seed)
+    engines = [
+        ('naive', naive_recompute_course),
+        ('sql', recompute_course),
+        ('numpy', recompute_course_vectorized),
+    ]
+    results = {}
+    for name, recompute in engines:
+        Enrollment.objects.filter(course=course).update(current_grade=None, gpa_points=None)
+        recorder = QueryRecorder(top_n=0)
+        with connection.execute_wrapper(recorder):
+            started = time.perf_counter()
+            with transaction.atomic():
+                updated = recompute(course)
+            elapsed = time.perf_counter() - started
+        results[name] = {
+            'seconds': round(elapsed, 3),
+            'queries': recorder.count,
+            'sql_seconds': round(recorder.total_time, 3),
+            'enrollments_updated': updated,
+        }
+    return {'students': students, 'assignments': assignments, 'results': results}
@@ -0,0 +1,139 @@
+"""
+Incrementally maintained row counters for the admin dashboard.
+
+Every counter the dashboard shows lives as one StatCounter row. Signal
+handlers (see core/signals.py) adjust the affected rows whenever a tracked
+model is created, deleted or changes role/status, so reading the dashboard
+numbers is a single query against a tiny table instead of thirteen COUNTs.
+
+Bulk operations (bulk_create, QuerySet.update, raw SQL) bypass signals, so
+the reconcile_counters management command recomputes the true values and
+should be run periodically (e.g. from cron) to correct any drift.
+"""
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import F
+
+from .models import UserProfile, Course, Module, Assignment, Enrollment, Submission, StatCounter
+from .stats import enrollment_status_breakdown, role_breakdown, submission_status_breakdown
+
+
+ROLE_COUNTER_KEYS = {
+    'student': 'students_count',
+    'instructor': 'instructors_count',
+    'admin': 'admins_count',
+}
+
+ENROLLMENT_STATUS_COUNTER_KEYS = {
+    'active': 'active_enrollments',
+}
+
+SUBMISSION_STATUS_COUNTER_KEYS = {
+    'graded': 'graded_submissions',
+    'submitted': 'pending_submissions',
+}
+
+COUNTER_KEYS = [
+    'total_users',
+    'total_profiles',
+    *ROLE_COUNTER_KEYS.values(),
+    'total_courses',
+    'total_modules',
+    'total_assignments',
+    'total_enrollments',
+    *ENROLLMENT_STATUS_COUNTER_KEYS.values(),
+    'total_submissions',
+    *SUBMISSION_STATUS_COUNTER_KEYS.values(),
+]
+
+TRACKED_MODELS = (User, UserProfile, Course, Module, Assignment, Enrollment, Submission)
+
+
+def counter_keys_for(instance):
+    """Return the counter keys a single model instance contributes to"""
+    if isinstance(instance, User):
+        return ['total_users']
+    if isinstance(instance, UserProfile):
+        return ['total_profiles'] + _optional(ROLE_COUNTER_KEYS.get(instance.role))
+    if isinstance(instance, Course):
+        return ['total_courses']
+    if isinstance(instance, Module):
+        return ['total_modules']
+    if isinstance(instance, Assignment):
+        return ['total_assignments']
+    if isinstance(instance, Enrollment):
+        return ['total_enrollments'] + _optional(ENROLLMENT_STATUS_COUNTER_KEYS.get(instance.status))
+    if isinstance(instance, Submission):
+        return ['total_submissions'] + _optional(SUBMISSION_STATUS_COUNTER_KEYS.get(instance.status))
+    return []
+
+
+def _optional(key):
+    return [key] if key else []
+
+
+def adjust_counters(increments=(), decrements=()):
+    """Apply +1/-1 to the given counter keys with F() updates (no read-modify-write)"""
+    increments, decrements = set(increments), set(decrements)
+    # A key in both sets is unchanged (e.g. total_submissions on a status change)
+    for keys, delta in ((increments - decrements, 1), (decrements - increments, -1)):
+        if keys:
+            StatCounter.objects.filter(key__in=keys).update(value=F('value') + delta)
+
+
+def adjust_counter(key, delta):
+    """Apply an arbitrary delta to one counter (for bulk updates that bypass signals)"""
+    if delta:
+        StatCounter.objects.filter(key=key).update(value=F('value') + delta)
+
+
+def compute_counters():
+    """Compute exact counter values from the real tables (one GROUP BY per model)"""
+    roles = role_breakdown(use_cache=False)
+    enrollment_statuses = enrollment_status_breakdown(use_cache=False)
+    submission_statuses = submission_status_breakdown(use_cache=False)
+    return {
+        'total_users': User.objects.count(),
+        'total_profiles': sum(roles.values()),
+        **{key: roles.get(role, 0) for role, key in ROLE_COUNTER_KEYS.items()},
+        'total_courses': Course.objects.count(),
+        'total_modules': Module.objects.count(),
+        'total_assignments': Assignment.objects.count(),
+        'total_enrollments': sum(enrollment_statuses.values()),
+        **{key: enrollment_statuses.get(status, 0) for status, key in ENROLLMENT_STATUS_COUNTER_KEYS.items()},
+        'total_submissions': sum(submission_statuses.values()),
+        **{key: submission_statuses.get(status, 0) for status, key in SUBMISSION_STATUS_COUNTER_KEYS.items()},
+    }
+
+
+@transaction.atomic
+def reconcile_counters():
+    """
+    Overwrite every stored counter with its exact value.
+    Returns a dict of {key: (stored_value, actual_value)} for counters that drifted.
+    """
+    actual = compute_counters()
+    stored = {
+        counter.key: counter
+        for counter in StatCounter.objects.select_for_update().filter(key__in=actual)
+    }
+    drift = {}
+    for key, value in actual.items():
+        counter = stored.get(key)
+        if counter is None:
+            StatCounter.objects.create(key=key, value=value)
+            drift[key] = (None, value)
+        elif counter.value != value:
+            drift[key] = (counter.value, value)
+            counter.value = value
+            counter.save(update_fields=['value', 'updated_at'])
+    return drift
+
+
+def get_counters():
+    """Read all dashboard counters, seeding them on first use"""
+    counters = dict(StatCounter.objects.filter(key__in=COUNTER_KEYS).values_list('key', 'value'))
+    if len(counters) < len(COUNTER_KEYS):
+        reconcile_counters()
+        counters = dict(StatCounter.objects.filter(key__in=COUNTER_KEYS).values_list('key', 'value'))
+    return counters
@@ -0,0 +1,101 @@
+"""
+Read model for the student dashboard.
+
+Assembles everything templates/student/dashboard.html needs in a fixed number
+of queries, no matter how many courses the student is enrolled in. Related
+rows are pulled in with select_related so the template never has to walk
+relations on its own.
+"""
+from django.db.models import Prefetch
+from django.utils import timezone
+
+from .models import Assignment, Enrollment, Submission
+from .stats import student_submission_summary
+
+
+RECENT_ITEMS_LIMIT = 5
+
+
+def get_active_enrollments(student):
+    """Active enrollments with course, instructor and instructor profile (1 query)"""
+    enrollments = list(
+        Enrollment.objects.filter(student=student, status='active')
+        .select_related('course', 'course__instructor', 'course__instructor__userprofile')
+        .order_by('course__course_code')
+    )
+    for enrollment in enrollments:
+        enrollment.instructor_name = get_instructor_name(enrollment.course.instructor)
+    return enrollments
+
+
+def get_instructor_name(instructor):
+    """Display name for an instructor, preferring the LMS profile name"""
+    profile = getattr(instructor, 'userprofile', None)
+    if profile is not None:
+        return f"{profile.first_name} {profile.last_name}".strip()
+    return instructor.get_full_name() or instructor.username
+
+
+def get_recent_assignments(student, limit=RECENT_ITEMS_LIMIT):
+    """
+    Newest assignments across the student's active courses (2 queries).
+    Each assignment gets a student_submission attribute holding this
+    student's own submission (or None), fetched in one batched prefetch
+    filtered on (student, assignment) rather than assignment.submissions.
+    """
+    assignments = list(
+        Assignment.objects.filter(
+            module__course__enrollments__student=student,
+            module__course__enrollments__status='active',
+        )
+        .select_related('module', 'module__course')
+        .prefetch_related(
+            Prefetch(
+                'submissions',
+                queryset=Submission.objects.filter(student=student),
+                to_attr='student_submissions',
+            )
+        )
+        .order_by('-created_at')[:limit]
+    )
+    for assignment in assignments:
+        assignment.student_submission = next(iter(assignment.student_submissions), None)
+    return assignments
+
+
+def get_recent_submissions(student, limit=RECENT_ITEMS_LIMIT):
+    """Student's latest submissions with assignment and course code (1 query)"""
+    return list(
+        Submission.objects.filter(student=student)
+        .select_related('assignment', 'assignment__module', 'assignment__module__course')
+        .order_by('-submission_date')[:limit]
+    )
+
+
+def get_submission_totals(student):
+    """Submission count, graded count and summed graded percentage (1 cached query)"""
+    summary = student_submission_summary(student)
+    return {
+        'total_submissions': sum(summary['by_status'].values()),
+        'graded_submissions': summary['by_status'].get('graded', 0),
+        'total_grade_points': round(summary['grade_points'].get('graded', 0)),
+    }
+
+
+def build_student_dashboard(student):
+    """
+    Build the full template context for the student dashboard.
+    Issues at most five queries: enrollments, recent assignments, the
+    student's submissions for those assignments, recent submissions and
+    the (cached) submission totals from core.stats.
+    """
+    enrollments = get_active_enrollments(student)
+    context = {
+        'enrollments': enrollments,
+        'recent_assignments': get_recent_assignments(student),
+        'recent_submissions': get_recent_submissions(student),
+        'total_courses': len(enrollments),
+        'today': timezone.now(),
+    }
+    context.update(get_submission_totals(student))
+    return context
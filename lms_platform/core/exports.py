@@ -0,0 +1,118 @@
+"""
+Streaming CSV / JSONL exports of enrollments (gradebooks) and submissions.
+
+Rows are read with values_list() over the joined course/assignment/student
+columns (one query, no per-row lookups) and iterator(chunk_size=...), which
+uses a server-side cursor on PostgreSQL, then written out one line at a
+time. Memory use stays flat however many rows are exported, whether the
+lines go to a StreamingHttpResponse (admin actions) or to a file (the
+export_grades management command).
+"""
+import csv
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+from .models import Enrollment, Submission
+
+
+CHUNK_SIZE = 2000
+
+# kind: (model, path from the model to its Course, [(column, lookup), ...])
+EXPORTS = {
+    'enrollments': (Enrollment, 'course', [
+        ('enrollment_id', 'id'),
+        ('student', 'student__username'),
+        ('student_email', 'student__email'),
+        ('course_code', 'course__course_code'),
+        ('course_name', 'course__course_name'),
+        ('term', 'course__term'),
+        ('credits', 'course__credits'),
+        ('status', 'status'),
+        ('current_grade', 'current_grade'),
+        ('final_grade', 'final_grade'),
+        ('gpa_points', 'gpa_points'),
+        ('enrollment_date', 'enrollment_date'),
+    ]),
+    'submissions': (Submission, 'assignment__module__course', [
+        ('submission_id', 'id'),
+        ('student', 'student__username'),
+        ('course_code', 'assignment__module__course__course_code'),
+        ('term', 'assignment__module__course__term'),
+        ('assignment', 'assignment__assignment_name'),
+        ('assignment_type', 'assignment__assignment_type'),
+        ('max_points', 'assignment__max_points'),
+        ('status', 'status'),
+        ('grade', 'grade'),
+        ('submission_date', 'submission_date'),
+        ('graded_by', 'graded_by__username'),
+        ('graded_at', 'graded_at'),
+    ]),
+}
+
+CONTENT_TYPES = {
+    'csv': 'text/csv',
+    'jsonl': 'application/x-ndjson',
+}
+
+
+def export_queryset(kind, course_code=None, term=None):
+    """All rows of an export, optionally limited to one course or one term"""
+    model, course_path, _ = EXPORTS[kind]
+    queryset = model.objects.order_by('id')
+    if course_code:
+        queryset = queryset.filter(**{f'{course_path}__course_code': course_code})
+    if term:
+        queryset = queryset.filter(**{f'{course_path}__term': term})
+    return queryset
+
+
+def export_rows(kind, queryset, chunk_size=CHUNK_SIZE):
+    """(headers, row iterator) for a queryset of the export's model"""
+    _, _, columns = EXPORTS[kind]
+    headers = [column for column, _ in columns]
+    rows = queryset.values_list(*[lookup for _, lookup in columns]).iterator(chunk_size=chunk_size)
+    return headers, rows
+
+
+class Echo:
+    """File-like object whose write() hands the line back to csv.writer's caller"""
+
+    def write(self, value):
+        return value
+
+
+def csv_lines(headers, rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(headers)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def jsonl_lines(headers, rows):
+    encoder = DjangoJSONEncoder()
+    for row in rows:
+        yield encoder.encode(dict(zip(headers, row))) + '\n'
+
+
+FORMATTERS = {
+    'csv': csv_lines,
+    'jsonl': jsonl_lines,
+}
+
+
+def export_lines(kind, queryset, fmt, chunk_size=CHUNK_SIZE):
+    """Lazily formatted lines of an export"""
+    headers, rows = export_rows(kind, queryset, chunk_size=chunk_size)
+    return FORMATTERS[fmt](headers, rows)
+
+
+def streaming_export_response(kind, queryset, fmt):
+    """StreamingHttpResponse that downloads the export as a file"""
+    filename = f'{kind}-{timezone.now():%Y%m%d-%H%M%S}.{fmt}'
+    return StreamingHttpResponse(
+        export_lines(kind, queryset, fmt),
+        content_type=CONTENT_TYPES[fmt],
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'},
+    )
@@ -0,0 +1,77 @@
+"""
+Term-end grade finalization.
+
+finalize_term() locks in the grades of every active enrollment of a term:
+final_grade is copied from current_grade, gpa_points is derived from it and
+the enrollment is marked completed. Enrollments are walked in primary key
+order in batches (keyset pagination, so each batch is an index range scan
+no matter how far the job has got), and every batch is its own short
+transaction that also advances a JobCheckpoint. Row locks are only held for
+one batch, and an interrupted run resumes after the last committed batch.
+"""
+import time
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .counters import ENROLLMENT_STATUS_COUNTER_KEYS, adjust_counter
+from .gradebook import gpa_points_expression
+from .models import Course, Enrollment, JobCheckpoint
+from .transcript import bump_transcript_versions
+
+
+BATCH_SIZE = 1000
+
+
+def finalize_job_name(term):
+    return f'finalize_term:{term}'
+
+
+def finalize_term(term, batch_size=BATCH_SIZE, restart=False, pause=0, log=None):
+    """
+    Finalize all active enrollments of `term`, resuming from the term's
+    checkpoint. restart=True starts over from the first enrollment.
+    pause is an optional sleep (seconds) between batches to leave room for
+    other traffic. Returns the JobCheckpoint.
+    """
+    log = log or (lambda message: None)
+    checkpoint, _ = JobCheckpoint.objects.get_or_create(job_name=finalize_job_name(term))
+    if restart:
+        checkpoint.cursor = checkpoint.processed = 0
+        checkpoint.completed_at = None
+        checkpoint.save()
+    elif checkpoint.completed_at:
+        log(f'{term} was already finalized at {checkpoint.completed_at:%Y-%m-%d %H:%M}.')
+        return checkpoint
+    elif checkpoint.cursor:
+        log(f'Resuming after enrollment {checkpoint.cursor} ({checkpoint.processed} finalized so far).')
+
+    course_ids = list(Course.objects.filter(term=term).values_list('id', flat=True))
+    pending = Enrollment.objects.filter(course_id__in=course_ids, status='active').order_by('id')
+    active_counter = ENROLLMENT_STATUS_COUNTER_KEYS['active']
+
+    while True:
+        with transaction.atomic():
+            rows = list(pending.filter(id__gt=checkpoint.cursor).values_list('id', 'student_id')[:batch_size])
+            if not rows:
+                checkpoint.completed_at = timezone.now()
+                checkpoint.save(update_fields=['completed_at', 'updated_at'])
+                break
+            ids = [enrollment_id for enrollment_id, _ in rows]
+            finalized = Enrollment.objects.filter(id__in=ids, status='active').update(
+                final_grade=F('current_grade'),
+                gpa_points=gpa_points_expression('current_grade'),
+                status='completed',
+            )
+            # update() bypasses the counter and transcript signals
+            adjust_counter(active_counter, -finalized)
+            transaction.on_commit(lambda rows=rows: bump_transcript_versions({student for _, student in rows}))
+            checkpoint.cursor = ids[-1]
+            checkpoint.processed += finalized
+            checkpoint.save(update_fields=['cursor', 'processed', 'updated_at'])
+        log(f'Finalized {checkpoint.processed} enrollment(s), up to id {checkpoint.cursor}')
+        if pause:
+            time.sleep(pause)
+
+    return checkpoint
@@ -0,0 +1,304 @@
+"""
+Gradebook engine that maintains Enrollment.current_grade and gpa_points.
+
+A course grade is the weighted average of the student's percentage in each
+assignment type (homework, quiz, exam, project), using LMS_GRADE_WEIGHTS.
+Types the student has no graded work in yet are left out and the remaining
+weights are rescaled, so early-term grades are not dragged down by exams
+that have not happened.
+
+All of a course's per-type totals come from one GROUP BY query, and the
+results are written back with set-based UPDATEs (a CASE on student_id),
+so recomputing a course costs a constant number of statements per batch
+of students rather than one round trip per enrollment.
+
+recompute_course_vectorized() is the alternative for whole-course rebuilds
+(a changed max_points or grade weight): it pulls the graded submissions as
+columnar arrays, does the per-student arithmetic in NumPy and rewrites
+only the enrollments whose grade changed. NumPy is optional; without it the
+same entry point falls back to the pure Python calculation.
+"""
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import Case, DecimalField, Sum, Value, When
+
+from .models import Assignment, Course, Enrollment, Module, Submission
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - NumPy is optional
+    np = None
+
+
+# Minimum percentage for each GPA point value (4.0 scale)
+GPA_SCALE = [
+    (Decimal('93'), Decimal('4.00')),
+    (Decimal('90'), Decimal('3.70')),
+    (Decimal('87'), Decimal('3.30')),
+    (Decimal('83'), Decimal('3.00')),
+    (Decimal('80'), Decimal('2.70')),
+    (Decimal('77'), Decimal('2.30')),
+    (Decimal('73'), Decimal('2.00')),
+    (Decimal('70'), Decimal('1.70')),
+    (Decimal('67'), Decimal('1.30')),
+    (Decimal('63'), Decimal('1.00')),
+    (Decimal('60'), Decimal('0.70')),
+]
+
+# The same scale as ascending arrays for np.searchsorted
+GPA_THRESHOLDS = [minimum for minimum, _ in reversed(GPA_SCALE)]
+GPA_POINTS = [Decimal('0.00')] + [points for _, points in reversed(GPA_SCALE)]
+
+ASSIGNMENT_TYPES = [choice for choice, _ in Assignment.ASSIGNMENT_TYPES]
+
+# Students per UPDATE statement (keeps CASE expressions and parameter counts bounded)
+UPDATE_BATCH_SIZE = 500
+
+TWO_PLACES = Decimal('0.01')
+
+
+def get_grade_weights():
+    """Assignment type weights, e.g. {'homework': 20, 'exam': 35, ...}"""
+    return settings.LMS_GRADE_WEIGHTS
+
+
+def weighted_grade(type_totals, weights=None):
+    """
+    Weighted course percentage from {assignment_type: (points, possible)}.
+    Returns None when nothing has been graded yet.
+    """
+    weights = weights or get_grade_weights()
+    weighted_sum = Decimal('0')
+    weight_total = Decimal('0')
+    for assignment_type, (points, possible) in type_totals.items():
+        weight = Decimal(str(weights.get(assignment_type, 0)))
+        if not possible or not weight:
+            continue
+        weighted_sum += weight * Decimal(str(points)) * 100 / Decimal(str(possible))
+        weight_total += weight
+    if not weight_total:
+        return None
+    return (weighted_sum / weight_total).quantize(TWO_PLACES, rounding=ROUND_HALF_UP)
+
+
+def gpa_points_for(grade):
+    """GPA points for a percentage grade (None stays None)"""
+    if grade is None:
+        return None
+    for minimum, points in GPA_SCALE:
+        if grade >= minimum:
+            return points
+    return Decimal('0.00')
+
+
+def gpa_points_expression(grade_field):
+    """The GPA scale as a CASE expression over a grade column, for set-based UPDATEs"""
+    gpa_field = Enrollment._meta.get_field('gpa_points')
+    return Case(
+        When(**{f'{grade_field}__isnull': True}, then=Value(None)),
+        *[When(**{f'{grade_field}__gte': minimum}, then=Value(points)) for minimum, points in GPA_SCALE],
+        default=Value(Decimal('0.00')),
+        output_field=DecimalField(max_digits=gpa_field.max_digits, decimal_places=gpa_field.decimal_places),
+    )
+
+
+def graded_totals(course_id, student_ids=None):
+    """
+    {student_id: {assignment_type: (points, possible)}} for one course.
+    One aggregate query grouped by student and assignment type.
+    """
+    submissions = Submission.objects.filter(
+        assignment__module__course_id=course_id,
+        grade__isnull=False,
+    )
+    if student_ids is not None:
+        submissions = submissions.filter(student_id__in=student_ids)
+    rows = (
+        submissions.order_by()
+        .values('student_id', 'assignment__assignment_type')
+        .annotate(points=Sum('grade'), possible=Sum('assignment__max_points'))
+    )
+    totals = {}
+    for row in rows:
+        totals.setdefault(row['student_id'], {})[row['assignment__assignment_type']] = (
+            row['points'], row['possible']
+        )
+    return totals
+
+
+def compute_course_grades(course_id, student_ids=None, weights=None):
+    """{student_id: (current_grade, gpa_points)} for students with graded work"""
+    weights = weights or get_grade_weights()
+    grades = {}
+    for student_id, type_totals in graded_totals(course_id, student_ids).items():
+        grade = weighted_grade(type_totals, weights)
+        grades[student_id] = (grade, gpa_points_for(grade))
+    return grades
+
+
+def write_grades(course_id, grades, student_ids):
+    """
+    Set current_grade/gpa_points for the given students' enrollments with
+    one UPDATE ... SET col = CASE student_id WHEN ... END per batch of
+    students. Students missing from `grades` are reset to NULL. Only active
+    enrollments are written; finalized ones keep their locked-in grade.
+    Returns the number of rows updated.
+
+    The statement is written by hand because building the equivalent
+    Case(When(...)) expression costs far more Python time than running it.
+    """
+    connection = connections[Enrollment.objects.db]
+    quote = connection.ops.quote_name
+    max_params = connection.features.max_query_params or UPDATE_BATCH_SIZE * 5
+    batch_size = min(UPDATE_BATCH_SIZE, (max_params - 1) // 5)
+    student_ids = list(student_ids)
+    updated = 0
+    with connection.cursor() as cursor:
+        for start in range(0, len(student_ids), batch_size):
+            batch = student_ids[start:start + batch_size]
+            graded = [student_id for student_id in batch if student_id in grades]
+            assignments, params = [], []
+            for column, index in (('current_grade', 0), ('gpa_points', 1)):
+                if graded:
+                    whens = ' '.join(['WHEN %s THEN %s'] * len(graded))
+                    assignments.append(f'{quote(column)} = CASE {quote("student_id")} {whens} ELSE NULL END')
+                    for student_id in graded:
+                        params += [student_id, grades[student_id][index]]
+                else:
+                    assignments.append(f'{quote(column)} = NULL')
+            placeholders = ', '.join(['%s'] * len(batch))
+            cursor.execute(
+                f'UPDATE {quote(Enrollment._meta.db_table)} SET {", ".join(assignments)} '
+                f'WHERE {quote("course_id")} = %s AND {quote("status")} = %s '
+                f'AND {quote("student_id")} IN ({placeholders})',
+                params + [course_id, 'active'] + batch,
+            )
+            updated += cursor.rowcount
+    return updated
+
+
+def recompute_course(course):
+    """Recompute every active enrollment in a course. Returns the number of enrollments updated."""
+    course_id = course.pk if isinstance(course, Course) else course
+    student_ids = Enrollment.objects.filter(course_id=course_id, status='active').values_list('student_id', flat=True)
+    return write_grades(course_id, compute_course_grades(course_id), student_ids)
+
+
+def recompute_students(course_id, student_ids):
+    """Recompute some students' grades in a course (used after bulk grading)"""
+    student_ids = list(student_ids)
+    grades = compute_course_grades(course_id, student_ids=student_ids)
+    return write_grades(course_id, grades, student_ids)
+
+
+def recompute_enrollment(student_id, course_id):
+    """Recompute a single student's grade in a course (used after grading)"""
+    return recompute_students(course_id, [student_id])
+
+
+def recompute_for_submission(submission):
+    """Recompute the grade of the enrollment a submission counts towards"""
+    course_id = (
+        Assignment.objects.filter(pk=submission.assignment_id)
+        .values_list('module__course_id', flat=True)
+        .first()
+    )
+    if course_id is None:
+        return 0
+    return recompute_enrollment(submission.student_id, course_id)
+
+
+def recompute_for_assignment(assignment):
+    """Rebuild a whole course after one of its assignments changed max_points"""
+    course_id = (
+        Module.objects.filter(pk=assignment.module_id)
+        .values_list('course_id', flat=True)
+        .first()
+    )
+    if course_id is None:
+        return 0
+    return recompute_course_vectorized(course_id)
+
+
+def course_grade_arrays(course_id):
+    """
+    Graded submissions of a course as NumPy columns:
+    student_id, assignment_id, grade, max_points and type (index into ASSIGNMENT_TYPES).
+    """
+    rows = list(
+        Submission.objects.filter(assignment__module__course_id=course_id, grade__isnull=False)
+        .order_by()
+        .values_list('student_id', 'assignment_id', 'grade', 'assignment__max_points', 'assignment__assignment_type')
+    )
+    type_index = {assignment_type: index for index, assignment_type in enumerate(ASSIGNMENT_TYPES)}
+    student_ids, assignment_ids, grades, max_points, types = zip(*rows) if rows else ((), (), (), (), ())
+    return {
+        'student_id': np.array(student_ids, dtype=np.int64),
+        'assignment_id': np.array(assignment_ids, dtype=np.int64),
+        'grade': np.array(grades, dtype=np.float64),
+        'max_points': np.array(max_points, dtype=np.float64),
+        'type': np.array([type_index.get(assignment_type, -1) for assignment_type in types], dtype=np.int64),
+    }
+
+
+def vectorized_course_grades(course_id, weights=None):
+    """
+    {student_id: (current_grade, gpa_points)} computed with NumPy.
+    Same result as compute_course_grades(); falls back to it without NumPy.
+    """
+    weights = weights or get_grade_weights()
+    if np is None:
+        return compute_course_grades(course_id, weights=weights)
+
+    columns = course_grade_arrays(course_id)
+    known = columns['type'] >= 0
+    if not known.any():
+        return {}
+    student_ids, rows = np.unique(columns['student_id'][known], return_inverse=True)
+    types = columns['type'][known]
+
+    # (students x assignment types) matrices of points earned and possible
+    shape = (len(student_ids), len(ASSIGNMENT_TYPES))
+    points = np.zeros(shape)
+    possible = np.zeros(shape)
+    np.add.at(points, (rows, types), columns['grade'][known])
+    np.add.at(possible, (rows, types), columns['max_points'][known])
+
+    percent = np.divide(points * 100, possible, out=np.zeros(shape), where=possible > 0)
+    weight_row = np.array([float(weights.get(assignment_type, 0)) for assignment_type in ASSIGNMENT_TYPES])
+    weight_matrix = np.where(possible > 0, weight_row, 0.0)
+    weight_totals = weight_matrix.sum(axis=1)
+    course_grades = np.divide(
+        (weight_matrix * percent).sum(axis=1), weight_totals,
+        out=np.full(len(student_ids), np.nan), where=weight_totals > 0,
+    )
+    # Round half up like the Decimal path; the epsilon absorbs float error on exact ties
+    course_grades = np.floor(course_grades * 100 + 0.5 + 1e-9) / 100
+    gpa_index = np.searchsorted(np.array(GPA_THRESHOLDS, dtype=np.float64), course_grades, side='right')
+
+    return {
+        int(student_id): (Decimal(f'{grade:.2f}'), GPA_POINTS[index])
+        for student_id, grade, index in zip(student_ids, course_grades, gpa_index)
+        if not np.isnan(grade)
+    }
+
+
+def recompute_course_vectorized(course):
+    """
+    Recompute every active enrollment in a course with vectorized_course_grades()
+    and write back only the rows whose grade changed.
+    Returns the number of enrollments updated.
+    """
+    course_id = course.pk if isinstance(course, Course) else course
+    grades = vectorized_course_grades(course_id)
+    current = (
+        Enrollment.objects.filter(course_id=course_id, status='active')
+        .values_list('student_id', 'current_grade', 'gpa_points')
+    )
+    changed = [
+        student_id for student_id, current_grade, gpa_points in current
+        if grades.get(student_id, (None, None)) != (current_grade, gpa_points)
+    ]
+    return write_grades(course_id, grades, changed)
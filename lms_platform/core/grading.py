@@ -0,0 +1,69 @@
+"""
+Writing grades for many submissions at once.
+
+apply_grades() stores grades and feedback for a batch of submissions with a
+single bulk_update and then does the bookkeeping the per-row signals would
+have done: dashboard counters, cached student stats and course grades.
+"""
+from collections import Counter
+
+from django.db import transaction
+from django.utils import timezone
+
+from .counters import SUBMISSION_STATUS_COUNTER_KEYS, adjust_counter
+from .gradebook import recompute_students
+from .models import Assignment, Submission
+from .stats import invalidate_student
+
+
+GRADED_FIELDS = ['grade', 'feedback', 'status', 'graded_by', 'graded_at', 'claimed_by', 'claimed_until']
+
+
+def apply_grades(submissions, grader):
+    """
+    Mark submissions graded by `grader`. Each submission must already carry
+    its new grade and feedback; status, graded_by and graded_at are set here
+    and any grading queue claim is released.
+    Returns the number of submissions written.
+    """
+    submissions = list(submissions)
+    if not submissions:
+        return 0
+    now = timezone.now()
+    previous_statuses = Counter(submission.status for submission in submissions)
+    for submission in submissions:
+        submission.status = 'graded'
+        submission.graded_by = grader
+        submission.graded_at = now
+        submission.claimed_by = submission.claimed_until = None
+
+    with transaction.atomic():
+        Submission.objects.bulk_update(submissions, GRADED_FIELDS)
+        record_grading(submissions, previous_statuses)
+    return len(submissions)
+
+
+def record_grading(submissions, previous_statuses):
+    """
+    Bookkeeping after submissions were graded with bulk_update()/update(),
+    which bypass the counter, stats and gradebook signals.
+    previous_statuses counts the submissions' statuses before grading.
+    Call inside the transaction that graded them.
+    """
+    for status, count in previous_statuses.items():
+        if status in SUBMISSION_STATUS_COUNTER_KEYS:
+            adjust_counter(SUBMISSION_STATUS_COUNTER_KEYS[status], -count)
+    adjust_counter(SUBMISSION_STATUS_COUNTER_KEYS['graded'], len(submissions))
+
+    students_by_course = {}
+    courses = dict(
+        Assignment.objects.filter(pk__in={submission.assignment_id for submission in submissions})
+        .values_list('id', 'module__course_id')
+    )
+    for submission in submissions:
+        students_by_course.setdefault(courses[submission.assignment_id], set()).add(submission.student_id)
+    for course_id, student_ids in students_by_course.items():
+        recompute_students(course_id, student_ids)
+
+    student_ids = {submission.student_id for submission in submissions}
+    transaction.on_commit(lambda: [invalidate_student(student_id) for student_id in student_ids])
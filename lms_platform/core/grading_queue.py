@@ -0,0 +1,219 @@
+"""
+A "next ungraded submission" work queue for graders.
+
+Each grader holds at most one claimed submission at a time. A claim is a
+lease: Submission.claimed_by plus claimed_until. Pending submissions whose
+lease is missing or has run out are handed out oldest first, so several
+graders working on the same course never open the same row, and a grader
+who walks away only holds a submission until LMS_GRADING_LEASE_SECONDS
+have passed.
+
+Claiming never waits on another grader:
+
+  * On databases with SELECT ... FOR UPDATE SKIP LOCKED (PostgreSQL) the
+    next row is picked and leased in one short transaction; rows another
+    grader is claiming at that moment are skipped rather than waited on.
+  * Elsewhere (SQLite) a few candidates are read and leased with a
+    compare-and-set UPDATE that only matches if claimed_until still holds
+    the value that was read. Losing the race to another grader just moves
+    on to the next candidate.
+
+Completing a claim is a conditional UPDATE that only matches while the
+grader still owns it, so a grade entered after the lease was lost and the
+submission handed to someone else is rejected instead of overwriting
+their work. Throughput comes from graded_by/graded_at (queue_metrics()).
+"""
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import Count, Min, Q
+from django.utils import timezone
+
+from .grading import record_grading
+from .models import Submission
+
+
+# Candidate rows read per compare-and-set round when SKIP LOCKED is unavailable
+CLAIM_CANDIDATES = 10
+CLAIM_ROUNDS = 3
+
+
+class LeaseLost(Exception):
+    """The grader no longer holds the claim on this submission"""
+
+
+def lease_duration():
+    return timedelta(seconds=settings.LMS_GRADING_LEASE_SECONDS)
+
+
+def pending_submissions(course_id=None, assignment_id=None):
+    """Pending submissions, optionally for one course or assignment"""
+    submissions = Submission.objects.filter(status='submitted')
+    if assignment_id:
+        submissions = submissions.filter(assignment_id=assignment_id)
+    if course_id:
+        submissions = submissions.filter(assignment__module__course_id=course_id)
+    return submissions
+
+
+def claimable(now, course_id=None, assignment_id=None, exclude=()):
+    """Pending submissions nobody holds an unexpired claim on, oldest first"""
+    return (
+        pending_submissions(course_id, assignment_id)
+        .filter(Q(claimed_until__isnull=True) | Q(claimed_until__lt=now))
+        .exclude(pk__in=exclude)
+        .order_by('submission_date', 'pk')
+    )
+
+
+def current_claim(grader, now, course_id=None, assignment_id=None):
+    """The pending submission `grader` holds an unexpired claim on, if any"""
+    return (
+        pending_submissions(course_id, assignment_id)
+        .filter(claimed_by=grader, claimed_until__gte=now)
+        .values_list('pk', flat=True)
+        .first()
+    )
+
+
+def _claim_skip_locked(grader, until, now, filters, exclude):
+    with transaction.atomic():
+        submission_id = (
+            claimable(now, exclude=exclude, **filters)
+            .select_for_update(skip_locked=True, of=('self',))
+            .values_list('pk', flat=True)
+            .first()
+        )
+        if submission_id is not None:
+            Submission.objects.filter(pk=submission_id).update(claimed_by=grader, claimed_until=until)
+    return submission_id
+
+
+def _claim_compare_and_set(grader, until, now, filters, exclude):
+    for _ in range(CLAIM_ROUNDS):
+        candidates = list(
+            claimable(now, exclude=exclude, **filters).values_list('pk', 'claimed_until')[:CLAIM_CANDIDATES]
+        )
+        if not candidates:
+            return None
+        for submission_id, claimed_until in candidates:
+            # Only matches if nobody leased the row since it was read
+            lease = Q(claimed_until__isnull=True) if claimed_until is None else Q(claimed_until=claimed_until)
+            won = (
+                Submission.objects.filter(lease, pk=submission_id, status='submitted')
+                .update(claimed_by=grader, claimed_until=until)
+            )
+            if won:
+                return submission_id
+    return None
+
+
+def claim_next(grader, course_id=None, assignment_id=None, exclude=()):
+    """
+    Claim the next pending submission for `grader` and return it, or None
+    when the queue is empty. A claim the grader already holds is renewed
+    and returned first. Claiming a new submission releases the grader's
+    other claims; pass `exclude` to skip the one they hold.
+    """
+    now = timezone.now()
+    until = now + lease_duration()
+    filters = {'course_id': course_id, 'assignment_id': assignment_id}
+
+    submission_id = None
+    if not exclude:
+        submission_id = current_claim(grader, now, **filters)
+    if submission_id is not None:
+        Submission.objects.filter(pk=submission_id, claimed_by=grader).update(claimed_until=until)
+    else:
+        connection = connections[Submission.objects.db]
+        if connection.features.has_select_for_update_skip_locked:
+            submission_id = _claim_skip_locked(grader, until, now, filters, exclude)
+        else:
+            submission_id = _claim_compare_and_set(grader, until, now, filters, exclude)
+        if submission_id is None:
+            return None
+    Submission.objects.filter(claimed_by=grader).exclude(pk=submission_id).update(claimed_by=None, claimed_until=None)
+    return Submission.objects.select_related('student', 'assignment__module__course').get(pk=submission_id)
+
+
+def peek_next(course_id=None, assignment_id=None, exclude=()):
+    """The submission claim_next() would hand out, without claiming it (read-only viewers)"""
+    return (
+        claimable(timezone.now(), course_id, assignment_id, exclude)
+        .select_related('student', 'assignment__module__course')
+        .first()
+    )
+
+
+def release(submission_id, grader):
+    """Give up a claim so another grader can take the submission. Returns True if one was held."""
+    return bool(
+        Submission.objects.filter(pk=submission_id, claimed_by=grader)
+        .update(claimed_by=None, claimed_until=None)
+    )
+
+
+def complete(submission_id, grader, grade, feedback=''):
+    """
+    Grade a claimed submission and release the claim.
+    Raises LeaseLost if the claim expired and another grader took the
+    submission (or it was graded some other way) in the meantime.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        graded = (
+            Submission.objects.filter(pk=submission_id, claimed_by=grader, status='submitted')
+            .update(
+                grade=grade, feedback=feedback, status='graded', graded_by=grader, graded_at=now,
+                claimed_by=None, claimed_until=None,
+            )
+        )
+        if not graded:
+            raise LeaseLost(f'Submission {submission_id} is no longer claimed by {grader.username}')
+        submission = Submission.objects.only('id', 'student_id', 'assignment_id').get(pk=submission_id)
+        record_grading([submission], Counter({'submitted': 1}))
+    return submission
+
+
+def queue_metrics(window=timedelta(hours=1), course_id=None, assignment_id=None):
+    """
+    Queue depth and grading throughput.
+    Depth counts come from one aggregate query over pending submissions;
+    throughput is the number graded per grader within `window`.
+    """
+    now = timezone.now()
+    depth = pending_submissions(course_id, assignment_id).aggregate(
+        pending=Count('id'),
+        claimed=Count('id', filter=Q(claimed_until__gte=now)),
+        expired_claims=Count('id', filter=Q(claimed_until__lt=now)),
+        oldest=Min('submission_date'),
+    )
+    graded = Submission.objects.filter(status='graded', graded_at__gte=now - window, graded_by__isnull=False)
+    if assignment_id:
+        graded = graded.filter(assignment_id=assignment_id)
+    if course_id:
+        graded = graded.filter(assignment__module__course_id=course_id)
+    graders = list(
+        graded.order_by()
+        .values('graded_by__username')
+        .annotate(graded=Count('id'))
+        .order_by('-graded', 'graded_by__username')
+    )
+    total = sum(row['graded'] for row in graders)
+    hours = window.total_seconds() / 3600
+    return {
+        'pending': depth['pending'],
+        'claimed': depth['claimed'],
+        'expired_claims': depth['expired_claims'],
+        'oldest_pending': depth['oldest'],
+        'window_hours': hours,
+        'graded': total,
+        'graded_per_hour': round(total / hours, 1) if hours else None,
+        'graders': [
+            {'grader': row['graded_by__username'], 'graded': row['graded'],
+             'per_hour': round(row['graded'] / hours, 1) if hours else None}
+            for row in graders
+        ],
+    }
@@ -0,0 +1,150 @@
+"""
+Resized WebP variants of profile pictures.
+
+When a UserProfile gets a new profile_picture, a fixed set of square WebP
+variants (AVATAR_VARIANTS) is rendered with Pillow and stored beside the
+original (profiles/jane.jpg -> profiles/variants/jane.jpg.thumb.webp, ...),
+keyed by the original's full name so jane.jpg and jane.png never share
+variants. The
+rendering is CPU-bound, so it runs in a ProcessPoolExecutor of
+LMS_IMAGE_WORKERS processes after the upload's transaction commits; the
+request thread only reads the original and hands the bytes over.
+LMS_IMAGE_WORKERS = 0 renders inline instead (tests, management commands).
+
+The names of the variants that exist for the current picture are kept in
+UserProfile.picture_variants, so the {% avatar %} template tag
+(core/templatetags/avatars.py) picks the smallest adequate variant without
+touching storage and falls back to the original until they are ready.
+"""
+import io
+import logging
+import posixpath
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections
+
+from .models import UserProfile
+from .roles import bump_profile_version
+
+
+logger = logging.getLogger(__name__)
+
+# Variant name: edge length in pixels (variants are square crops)
+AVATAR_VARIANTS = {
+    'thumb': 64,
+    'small': 160,
+    'medium': 400,
+}
+
+WEBP_QUALITY = 80
+
+# Variants live in this subdirectory of the original's directory
+VARIANT_DIR = 'variants'
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def variant_name(name, variant):
+    """profiles/jane.jpg -> profiles/variants/jane.jpg.thumb.webp"""
+    # A subdirectory uploads never land in, so an original can't be named like a variant
+    directory, filename = posixpath.split(name)
+    return posixpath.join(directory, VARIANT_DIR, f'{filename}.{variant}.webp')
+
+
+def render_variants(data, variants=None, quality=WEBP_QUALITY):
+    """
+    {variant: WebP bytes} for an image given as bytes.
+    Runs in a worker process, so it only deals in plain bytes and dicts.
+    """
+    from PIL import Image, ImageOps
+
+    variants = variants or AVATAR_VARIANTS
+    rendered = {}
+    with Image.open(io.BytesIO(data)) as image:
+        # JPEG decoders can downscale while decoding, which is much cheaper
+        image.draft('RGB', (max(variants.values()),) * 2)
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if 'transparency' in image.info or 'A' in image.mode else 'RGB')
+        for variant, edge in variants.items():
+            resized = ImageOps.fit(image, (edge, edge), Image.Resampling.LANCZOS)
+            buffer = io.BytesIO()
+            resized.save(buffer, 'WEBP', quality=quality, method=4)
+            rendered[variant] = buffer.getvalue()
+    return rendered
+
+
+def get_executor():
+    """The shared process pool, started on first use"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(max_workers=settings.LMS_IMAGE_WORKERS)
+    return _executor
+
+
+def store_variants(profile_id, user_id, name, rendered):
+    """
+    Save rendered variants next to the original and record them on the
+    profile, unless the picture was replaced while they were rendering.
+    """
+    storage = UserProfile._meta.get_field('profile_picture').storage
+    stored = []
+    for variant, data in rendered.items():
+        target = variant_name(name, variant)
+        if storage.exists(target):
+            storage.delete(target)
+        storage.save(target, ContentFile(data))
+        stored.append(variant)
+    updated = UserProfile.objects.filter(pk=profile_id, profile_picture=name).update(picture_variants=stored)
+    if updated:
+        bump_profile_version(user_id)  # sessions cache picture_variants
+    return stored
+
+
+def _store_finished(profile_id, user_id, name, future):
+    """Done-callback for a pool job; runs on a thread of this process"""
+    try:
+        store_variants(profile_id, user_id, name, future.result())
+    except Exception:
+        logger.exception('Could not build avatar variants for %s', name)
+    finally:
+        close_old_connections()
+
+
+def build_variants(profile, inline=False):
+    """
+    Render and store the variants for a profile's current picture.
+    Inline when asked to or when LMS_IMAGE_WORKERS is 0, otherwise on the
+    process pool (returns the pool's Future).
+    """
+    name = profile.profile_picture.name
+    if not name:
+        return None
+    with profile.profile_picture.open('rb') as original:
+        data = original.read()
+    if inline or not settings.LMS_IMAGE_WORKERS:
+        return store_variants(profile.pk, profile.user_id, name, render_variants(data))
+    future = get_executor().submit(render_variants, data)
+    future.add_done_callback(lambda future: _store_finished(profile.pk, profile.user_id, name, future))
+    return future
+
+
+def delete_variants(name):
+    """Remove the stored variants of a picture that is no longer used"""
+    storage = UserProfile._meta.get_field('profile_picture').storage
+    for variant in AVATAR_VARIANTS:
+        storage.delete(variant_name(name, variant))
+
+
+def pick_variant(variants, size):
+    """Smallest available variant at least `size` pixels wide, else the largest available"""
+    available = sorted((AVATAR_VARIANTS[variant], variant) for variant in variants if variant in AVATAR_VARIANTS)
+    for edge, variant in available:
+        if edge >= size:
+            return variant
+    return available[-1][1] if available else None
@@ -0,0 +1,259 @@
+"""
+Bulk CSV imports of enrollments and grades.
+
+Two file layouts are accepted:
+
+  enrollments: username, course_code, term
+  grades:      username, assignment, grade[, course_code]
+
+The file is read as a stream and each row is validated on its own; bad
+rows are reported with their line number and skipped, the rest of the
+file is still imported. Usernames, courses and assignments are resolved
+against in-memory maps that are each built with one query, so validation
+never queries per row.
+
+New rows are loaded with COPY on PostgreSQL (psycopg2 copy_expert) and
+bulk_create elsewhere; grades for existing submissions are applied with
+bulk_update. These paths bypass model signals, so the dashboard counters,
+cached per-student stats and course grades are brought up to date
+explicitly once the load has finished.
+"""
+import csv
+import io
+from collections import Counter
+from decimal import Decimal, InvalidOperation
+
+from django.db import connections, transaction
+from django.utils import timezone
+
+from .counters import ENROLLMENT_STATUS_COUNTER_KEYS, SUBMISSION_STATUS_COUNTER_KEYS, adjust_counter
+from .gradebook import recompute_course
+from .models import Assignment, Course, Enrollment, Submission, UserProfile
+from .stats import invalidate_student
+from .transcript import bump_transcript_versions
+
+
+BATCH_SIZE = 5000
+
+# kind: (required columns, optional columns)
+IMPORT_COLUMNS = {
+    'enrollments': (['username', 'course_code', 'term'], []),
+    'grades': (['username', 'assignment', 'grade'], ['course_code']),
+}
+
+
+class ImportFormatError(ValueError):
+    """The file as a whole cannot be imported (e.g. missing columns)"""
+
+
+class ImportReport:
+    """Outcome of an import: row counts and (line number, message) errors"""
+
+    def __init__(self, kind):
+        self.kind = kind
+        self.rows = 0
+        self.created = 0
+        self.updated = 0
+        self.skipped = 0
+        self.errors = []
+
+    def error(self, line, message):
+        self.errors.append((line, message))
+
+    def summary(self):
+        return (
+            f'{self.rows} row(s) read: {self.created} created, {self.updated} updated, '
+            f'{self.skipped} skipped, {len(self.errors)} error(s)'
+        )
+
+
+def read_rows(stream, kind):
+    """Yield (line number, row dict) from a text stream, checking the header first"""
+    required, optional = IMPORT_COLUMNS[kind]
+    reader = csv.DictReader(stream)
+    # Undecodable bytes and broken CSV only surface while reading; they fail the whole import
+    try:
+        headers = [header.strip().lower() for header in reader.fieldnames or []]
+        missing = [column for column in required if column not in headers]
+        if missing:
+            raise ImportFormatError(f'Missing column(s): {", ".join(missing)}. Expected: {", ".join(required + optional)}')
+        reader.fieldnames = headers
+        for row in reader:
+            yield reader.line_num, {key: (value or '').strip() for key, value in row.items() if key}
+    except UnicodeDecodeError:
+        raise ImportFormatError(f'Line {reader.line_num + 1}: the file is not UTF-8 text (save it as "CSV UTF-8")')
+    except csv.Error as error:
+        raise ImportFormatError(f'Line {reader.line_num}: malformed CSV ({error})')
+
+
+def student_map():
+    """{username: user_id} for every student (one query)"""
+    return dict(UserProfile.objects.filter(role='student').values_list('user__username', 'user_id'))
+
+
+def copy_insert(model, objs, using='default'):
+    """
+    Insert unsaved model instances with COPY on PostgreSQL, bulk_create elsewhere.
+    Column values are prepared by the model fields themselves, so defaults
+    and auto_now_add behave as they do for save().
+    """
+    connection = connections[using]
+    if not objs:
+        return
+    if connection.vendor != 'postgresql':
+        model.objects.using(using).bulk_create(objs, batch_size=BATCH_SIZE)
+        return
+    fields = [field for field in model._meta.concrete_fields if not field.primary_key]
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for obj in objs:
+        values = [field.get_db_prep_save(field.pre_save(obj, True), connection) for field in fields]
+        writer.writerow(['\\N' if value is None else value for value in values])
+    buffer.seek(0)
+    quote = connection.ops.quote_name
+    columns = ', '.join(quote(field.column) for field in fields)
+    with connection.cursor() as cursor:
+        cursor.copy_expert(
+            f"COPY {quote(model._meta.db_table)} ({columns}) FROM STDIN WITH (FORMAT csv, NULL '\\N')",
+            buffer,
+        )
+
+
+def import_enrollments(stream):
+    """Enroll students from a username, course_code, term CSV"""
+    report = ImportReport('enrollments')
+    students = student_map()
+    courses = {
+        code.upper(): (course_id, term)
+        for course_id, code, term in Course.objects.values_list('id', 'course_code', 'term')
+    }
+
+    pairs = {}
+    for line, row in read_rows(stream, 'enrollments'):
+        report.rows += 1
+        student_id = students.get(row['username'])
+        course = courses.get(row['course_code'].upper())
+        if student_id is None:
+            report.error(line, f'Unknown student "{row["username"]}"')
+        elif course is None:
+            report.error(line, f'Unknown course "{row["course_code"]}"')
+        elif row['term'] and row['term'] != course[1]:
+            report.error(line, f'{row["course_code"]} runs in "{course[1]}", not "{row["term"]}"')
+        elif (student_id, course[0]) in pairs:
+            report.skipped += 1  # repeated in the file
+        else:
+            pairs[(student_id, course[0])] = line
+
+    course_ids = {course_id for _, course_id in pairs}
+    existing = set(
+        Enrollment.objects.filter(course_id__in=course_ids).values_list('student_id', 'course_id')
+    )
+    new_pairs = [pair for pair in pairs if pair not in existing]
+    report.skipped += len(pairs) - len(new_pairs)
+
+    with transaction.atomic():
+        for start in range(0, len(new_pairs), BATCH_SIZE):
+            copy_insert(Enrollment, [
+                Enrollment(student_id=student_id, course_id=course_id)
+                for student_id, course_id in new_pairs[start:start + BATCH_SIZE]
+            ])
+        report.created = len(new_pairs)
+        adjust_counter('total_enrollments', report.created)
+        adjust_counter(ENROLLMENT_STATUS_COUNTER_KEYS['active'], report.created)
+    bump_transcript_versions({student_id for student_id, _ in new_pairs})
+    return report
+
+
+def import_grades(stream, graded_by=None):
+    """Grade submissions from a username, assignment, grade[, course_code] CSV"""
+    report = ImportReport('grades')
+    students = student_map()
+    assignments = {}
+    for assignment_id, name, course_code, course_id, max_points in Assignment.objects.values_list(
+        'id', 'assignment_name', 'module__course__course_code', 'module__course_id', 'max_points'
+    ):
+        assignments.setdefault(name.lower(), []).append((assignment_id, course_code.upper(), course_id, max_points))
+
+    grades = {}
+    for line, row in read_rows(stream, 'grades'):
+        report.rows += 1
+        student_id = students.get(row['username'])
+        candidates = assignments.get(row['assignment'].lower(), [])
+        if row.get('course_code'):
+            candidates = [item for item in candidates if item[1] == row['course_code'].upper()]
+        if student_id is None:
+            report.error(line, f'Unknown student "{row["username"]}"')
+            continue
+        if not candidates:
+            report.error(line, f'Unknown assignment "{row["assignment"]}"')
+            continue
+        if len(candidates) > 1:
+            report.error(line, f'"{row["assignment"]}" exists in several courses; add a course_code column')
+            continue
+        assignment_id, _, course_id, max_points = candidates[0]
+        try:
+            grade = Decimal(row['grade'])
+        except InvalidOperation:
+            grade = None
+        if grade is None or not grade.is_finite():
+            report.error(line, f'Grade "{row["grade"]}" is not a number')
+            continue
+        if not 0 <= grade <= max_points:
+            report.error(line, f'Grade {grade} is outside 0-{max_points}')
+            continue
+        grades[(student_id, assignment_id)] = (grade.quantize(Decimal('0.01')), course_id)
+
+    assignment_ids = {assignment_id for _, assignment_id in grades}
+    existing = {
+        (submission.student_id, submission.assignment_id): submission
+        for submission in Submission.objects.filter(assignment_id__in=assignment_ids)
+        .only('id', 'student_id', 'assignment_id', 'status', 'grade')
+        if (submission.student_id, submission.assignment_id) in grades
+    }
+
+    now = timezone.now()
+    graded_by_id = graded_by.pk if graded_by else None
+    to_create, to_update, previous_statuses = [], [], Counter()
+    for (student_id, assignment_id), (grade, _) in grades.items():
+        submission = existing.get((student_id, assignment_id))
+        if submission is None:
+            to_create.append(Submission(
+                student_id=student_id, assignment_id=assignment_id, grade=grade,
+                status='graded', graded_by_id=graded_by_id, graded_at=now,
+            ))
+        elif submission.status == 'graded' and submission.grade == grade:
+            report.skipped += 1
+        else:
+            previous_statuses[submission.status] += 1
+            submission.grade, submission.status = grade, 'graded'
+            submission.graded_by_id, submission.graded_at = graded_by_id, now
+            to_update.append(submission)
+
+    with transaction.atomic():
+        for start in range(0, len(to_create), BATCH_SIZE):
+            copy_insert(Submission, to_create[start:start + BATCH_SIZE])
+        Submission.objects.bulk_update(
+            to_update, ['grade', 'status', 'graded_by', 'graded_at'], batch_size=BATCH_SIZE
+        )
+        report.created, report.updated = len(to_create), len(to_update)
+
+        graded_key = SUBMISSION_STATUS_COUNTER_KEYS['graded']
+        adjust_counter('total_submissions', report.created)
+        adjust_counter(graded_key, report.created + report.updated)
+        for status, count in previous_statuses.items():
+            if status in SUBMISSION_STATUS_COUNTER_KEYS:
+                adjust_counter(SUBMISSION_STATUS_COUNTER_KEYS[status], -count)
+
+        changed = to_create + to_update
+        for course_id in {grades[(item.student_id, item.assignment_id)][1] for item in changed}:
+            recompute_course(course_id)
+    for student_id in {submission.student_id for submission in changed}:
+        invalidate_student(student_id)
+    return report
+
+
+def run_import(kind, stream, user=None):
+    """Import a CSV text stream of the given kind; `user` is recorded as the grader"""
+    if kind == 'grades':
+        return import_grades(stream, graded_by=user)
+    return import_enrollments(stream)
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+from lms_platform.core.images import build_variants
+from lms_platform.core.models import UserProfile
+
+
+class Command(BaseCommand):
+    help = 'Build resized profile picture variants for profiles that do not have them yet'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Rebuild variants for every profile picture, not only missing ones',
+        )
+
+    def handle(self, *args, **options):
+        profiles = UserProfile.objects.exclude(profile_picture='').exclude(profile_picture__isnull=True)
+        if not options['all']:
+            profiles = profiles.filter(picture_variants=[])
+
+        built = failed = 0
+        for profile in profiles.only('id', 'user_id', 'profile_picture').iterator():
+            try:
+                # Inline: this command already is the background job
+                build_variants(profile, inline=True)
+            except Exception as error:  # a missing or unreadable original should not stop the run
+                failed += 1
+                self.stderr.write(f'{profile.profile_picture.name}: {error}')
+            else:
+                built += 1
+
+        self.stdout.write(self.style.SUCCESS(f'Built variants for {built} profile picture(s), {failed} failed.'))
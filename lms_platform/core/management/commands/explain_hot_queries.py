@@ -0,0 +1,88 @@
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from lms_platform.core.grading_queue import CLAIM_CANDIDATES, claimable
+from lms_platform.core.models import Assignment, Enrollment, Submission
+
+
+# Plan fragments that mean a full table scan on each supported backend
+FULL_SCAN_MARKERS = {
+    'postgresql': ['Seq Scan'],
+    'sqlite': ['SCAN '],
+}
+
+
+class Command(BaseCommand):
+    help = 'Print EXPLAIN plans for the LMS hot queries and flag full table scans'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--student',
+            help='Username to use for per-student queries (defaults to the first student)',
+        )
+        parser.add_argument(
+            '--analyze',
+            action='store_true',
+            help='Run EXPLAIN ANALYZE on PostgreSQL to include actual timings',
+        )
+
+    def handle(self, *args, **options):
+        student = self.get_student(options['student'])
+        explain_options = {'analyze': True} if options['analyze'] and connection.vendor == 'postgresql' else {}
+
+        queries = self.hot_queries(student)
+        full_scans = 0
+        for name, queryset in queries:
+            plan = queryset.explain(**explain_options)
+            scans = [
+                line.strip() for line in plan.splitlines()
+                if any(marker in line for marker in FULL_SCAN_MARKERS.get(connection.vendor, []))
+                and 'USING' not in line  # SQLite "SCAN ... USING INDEX" is an index scan
+            ]
+            full_scans += bool(scans)
+
+            self.stdout.write(self.style.MIGRATE_HEADING(f'\n{name}'))
+            self.stdout.write(plan)
+            if scans:
+                self.stdout.write(self.style.WARNING(f'Full table scan: {"; ".join(scans)}'))
+            else:
+                self.stdout.write(self.style.SUCCESS('Uses indexes'))
+
+        summary = f'\n{full_scans} of {len(queries)} hot queries use a full table scan.'
+        self.stdout.write(self.style.WARNING(summary) if full_scans else self.style.SUCCESS(summary))
+
+    def get_student(self, username):
+        """Return the student to explain per-student queries for"""
+        students = User.objects.filter(userprofile__role='student')
+        if username:
+            students = students.filter(username=username)
+        student = students.order_by('id').first()
+        if student is None:
+            raise CommandError('No student found. Run setup_production first or pass --student.')
+        return student
+
+    def hot_queries(self, student):
+        """(label, queryset) pairs matching the dashboard and grading access paths"""
+        now = timezone.now()
+        week_ago = now - timedelta(days=7)
+        return [
+            ('Student dashboard: active enrollments',
+             Enrollment.objects.filter(student=student, status='active')),
+            ('Student dashboard: recent submissions',
+             Submission.objects.filter(student=student).order_by('-submission_date')[:5]),
+            ('Student dashboard: graded submissions',
+             Submission.objects.filter(student=student, status='graded')),
+            ('Student dashboard: recent assignments in enrolled courses',
+             Assignment.objects.filter(
+                 module__course__enrollments__student=student,
+                 module__course__enrollments__status='active',
+             ).order_by('-created_at')[:5]),
+            ('Admin dashboard: enrollments in the last 7 days',
+             Enrollment.objects.filter(enrollment_date__gte=week_ago)),
+            ('Grading queue: oldest claimable submissions',
+             claimable(now).values_list('pk', 'claimed_until')[:CLAIM_CANDIDATES]),
+        ]
@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+
+from lms_platform.core.exports import CHUNK_SIZE, EXPORTS, FORMATTERS, export_lines, export_queryset
+
+
+class Command(BaseCommand):
+    help = 'Stream enrollments (gradebook) or submissions as CSV or JSONL'
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=sorted(EXPORTS), help='What to export')
+        parser.add_argument(
+            '--format',
+            choices=sorted(FORMATTERS),
+            default='csv',
+            help='Output format (default: csv)',
+        )
+        parser.add_argument('--course', metavar='CODE', help='Only export this course')
+        parser.add_argument('--term', help='Only export courses in this term, e.g. "Fall 2025"')
+        parser.add_argument('--output', help='Write to this file instead of stdout')
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=CHUNK_SIZE,
+            help=f'Rows fetched per round trip (default: {CHUNK_SIZE})',
+        )
+
+    def handle(self, *args, **options):
+        queryset = export_queryset(options['kind'], course_code=options['course'], term=options['term'])
+        lines = export_lines(options['kind'], queryset, options['format'], chunk_size=options['chunk_size'])
+
+        if not options['output']:
+            for line in lines:
+                self.stdout.write(line, ending='')
+            return
+
+        rows = -1 if options['format'] == 'csv' else 0  # don't count the CSV header
+        with open(options['output'], 'w', newline='', encoding='utf-8') as output:
+            for line in lines:
+                output.write(line)
+                rows += 1
+        self.stdout.write(self.style.SUCCESS(f'Exported {max(rows, 0)} {options["kind"]} to {options["output"]}'))
@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from lms_platform.core.finalization import BATCH_SIZE, finalize_term
+from lms_platform.core.models import Course
+
+
+class Command(BaseCommand):
+    help = 'Lock in final grades for every active enrollment of a term (resumable)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('term', help='Course term to finalize, e.g. "Fall 2025"')
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=BATCH_SIZE,
+            help=f'Enrollments per transaction (default: {BATCH_SIZE})',
+        )
+        parser.add_argument(
+            '--pause',
+            type=float,
+            default=0,
+            help='Seconds to sleep between batches',
+        )
+        parser.add_argument(
+            '--restart',
+            action='store_true',
+            help='Ignore the saved checkpoint and start from the first enrollment',
+        )
+
+    def handle(self, *args, **options):
+        term = options['term']
+        if not Course.objects.filter(term=term).exists():
+            raise CommandError(f'No courses found for term "{term}".')
+
+        checkpoint = finalize_term(
+            term,
+            batch_size=options['batch_size'],
+            restart=options['restart'],
+            pause=options['pause'],
+            log=self.stdout.write,
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'{term} finalized: {checkpoint.processed} enrollment(s) completed.'
+        ))
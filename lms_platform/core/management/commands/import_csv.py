@@ -0,0 +1,33 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from lms_platform.core.imports import IMPORT_COLUMNS, ImportFormatError, run_import
+
+
+class Command(BaseCommand):
+    help = 'Bulk import enrollments (username, course_code, term) or grades (username, assignment, grade) from CSV'
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=sorted(IMPORT_COLUMNS), help='What the file contains')
+        parser.add_argument('path', help='CSV file with a header row')
+        parser.add_argument('--graded-by', metavar='USERNAME', help='Record this user as the grader (grades only)')
+        parser.add_argument('--max-errors', type=int, default=50, help='Row errors to print (default: 50)')
+
+    def handle(self, *args, **options):
+        grader = None
+        if options['graded_by']:
+            grader = User.objects.filter(username=options['graded_by']).first()
+            if grader is None:
+                raise CommandError(f'Unknown user "{options["graded_by"]}".')
+
+        try:
+            with open(options['path'], newline='', encoding='utf-8-sig') as stream:
+                report = run_import(options['kind'], stream, user=grader)
+        except (OSError, ImportFormatError) as error:
+            raise CommandError(str(error))
+
+        for line, message in report.errors[:options['max_errors']]:
+            self.stdout.write(self.style.WARNING(f'Line {line}: {message}'))
+        if len(report.errors) > options['max_errors']:
+            self.stdout.write(f'... and {len(report.errors) - options["max_errors"]} more error(s)')
+        self.stdout.write(self.style.SUCCESS(report.summary()))
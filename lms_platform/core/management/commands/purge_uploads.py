@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from lms_platform.core.uploads import purge_expired_uploads
+
+
+class Command(BaseCommand):
+    help = 'Delete unfinished chunked uploads that have been idle too long, with their part files'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--hours',
+            type=int,
+            help='Idle time before an upload is purged (default: LMS_UPLOAD_EXPIRY_HOURS)',
+        )
+
+    def handle(self, *args, **options):
+        purged = purge_expired_uploads(options['hours'])
+        self.stdout.write(self.style.SUCCESS(f'Purged {purged} expired upload(s).'))
@@ -0,0 +1,55 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from lms_platform.core.gradebook import recompute_course, recompute_course_vectorized
+from lms_platform.core.models import Course
+
+
+class Command(BaseCommand):
+    help = 'Recompute Enrollment.current_grade and gpa_points from graded submissions'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--course',
+            action='append',
+            dest='courses',
+            metavar='CODE',
+            help='Course code to recompute (repeatable; default: every course)',
+        )
+        parser.add_argument(
+            '--term',
+            help='Only recompute courses in this term, e.g. "Fall 2025"',
+        )
+        parser.add_argument(
+            '--engine',
+            choices=['sql', 'numpy'],
+            default='sql',
+            help='sql: CASE UPDATE from a GROUP BY (default); numpy: grades computed vectorized in Python, '
+                 'then a batched CASE UPDATE of only the rows that changed',
+        )
+
+    def handle(self, *args, **options):
+        courses = Course.objects.order_by('course_code')
+        if options['courses']:
+            courses = courses.filter(course_code__in=options['courses'])
+        if options['term']:
+            courses = courses.filter(term=options['term'])
+        courses = list(courses.only('id', 'course_code'))
+        if not courses:
+            raise CommandError('No matching courses found.')
+
+        recompute = recompute_course_vectorized if options['engine'] == 'numpy' else recompute_course
+        started = time.perf_counter()
+        total = 0
+        for course in courses:
+            with transaction.atomic():
+                updated = recompute(course)
+            total += updated
+            self.stdout.write(f'{course.course_code}: {updated} enrollment(s) updated')
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Recomputed {total} enrollment(s) across {len(courses)} course(s) in {elapsed:.2f}s.'
+        ))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from lms_platform.core.storage import reconcile_blobs
+
+
+class Command(BaseCommand):
+    help = 'Recount references to deduplicated submission files and delete unreferenced ones'
+
+    def handle(self, *args, **options):
+        self.stdout.write('Reconciling stored file references...')
+
+        drift = reconcile_blobs()
+
+        if not drift:
+            self.stdout.write(self.style.SUCCESS('All file reference counts are accurate.'))
+            return
+
+        for name, (stored, actual) in sorted(drift.items()):
+            if actual:
+                self.stdout.write(f'Corrected {name}: {stored} -> {actual}')
+            else:
+                self.stdout.write(f'Deleted unreferenced {name}')
+
+        self.stdout.write(self.style.SUCCESS(f'Reconciled {len(drift)} stored file(s).'))
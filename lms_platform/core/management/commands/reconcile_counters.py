@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from lms_platform.core.counters import reconcile_counters
+
+
+class Command(BaseCommand):
+    help = 'Recompute the admin dashboard counters from the real tables and fix any drift'
+
+    def handle(self, *args, **options):
+        self.stdout.write('Reconciling dashboard counters...')
+
+        drift = reconcile_counters()
+
+        if not drift:
+            self.stdout.write(self.style.SUCCESS('All counters are accurate.'))
+            return
+
+        for key, (stored, actual) in sorted(drift.items()):
+            if stored is None:
+                self.stdout.write(f'Seeded {key}: {actual}')
+            else:
+                self.stdout.write(f'Corrected {key}: {stored} -> {actual}')
+
+        self.stdout.write(self.style.SUCCESS(f'Reconciled {len(drift)} counter(s).'))
@@ -0,0 +1,97 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from lms_platform.core.benchmarks import SCALES, benchmark_gradebook, find_regressions, run_benchmarks
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the LMS hot paths on synthetic data and write a JSON report'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scales',
+            nargs='+',
+            choices=sorted(SCALES),
+            default=['small', 'medium'],
+            help='Dataset sizes to benchmark (default: small medium)',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=5,
+            help='Timed requests per target (default: 5)',
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Random seed for the synthetic data',
+        )
+        parser.add_argument(
+            '--output',
+            help='Write the JSON report to this file instead of stdout',
+        )
+        parser.add_argument(
+            '--baseline',
+            help='Previous JSON report to compare against; exits non-zero on regressions',
+        )
+        parser.add_argument(
+            '--gradebook',
+            type=int,
+            metavar='STUDENTS',
+            help='Also time the course grade recompute paths on a course with this many students, e.g. 20000',
+        )
+        parser.add_argument(
+            '--keepdb',
+            action='store_true',
+            help='Reuse the benchmark database between runs (skips regenerating data)',
+        )
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options['baseline']:
+            with open(options['baseline']) as baseline_file:
+                baseline = json.load(baseline_file)
+
+        # Benchmarks run against a throwaway test database, never the real one
+        setup_test_environment()
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=options['keepdb'])
+        try:
+            self.stderr.write(f'Benchmarking scales: {", ".join(options["scales"])}')
+            report = run_benchmarks(options['scales'], repeat=options['repeat'], seed=options['seed'])
+            if options['gradebook']:
+                self.stderr.write(f'Benchmarking gradebook recompute for {options["gradebook"]} students')
+                report['gradebook'] = benchmark_gradebook(options['gradebook'], seed=options['seed'])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=options['keepdb'])
+            teardown_test_environment()
+
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as output_file:
+                output_file.write(output + '\n')
+            self.stderr.write(self.style.SUCCESS(f'Report written to {options["output"]}'))
+        else:
+            self.stdout.write(output)
+
+        for scale, data in report['scales'].items():
+            for target, result in data['results'].items():
+                self.stderr.write(
+                    f'{scale:>6} {target:<36} {result["latency_ms"]["median"]:>9.2f}ms '
+                    f'{result["queries"]:>3} queries {result["peak_memory_kb"]:>9.1f}KB'
+                )
+
+        for engine, result in report.get('gradebook', {}).get('results', {}).items():
+            self.stderr.write(
+                f'gradebook {engine:<32} {result["seconds"] * 1000:>9.2f}ms {result["queries"]:>6} queries'
+            )
+
+        regressions = find_regressions(report, baseline)
+        if regressions:
+            for regression in regressions:
+                self.stderr.write(self.style.ERROR(regression))
+            raise CommandError(f'{len(regressions)} performance regression(s) found')
@@ -1,16 +1,79 @@
+import time
+
 from django.core.management.base import BaseCommand
 from django.contrib.auth.models import User
+from django.db import transaction
 from django.utils import timezone
 from datetime import timedelta
-from lms_platform.core.models import UserProfile, Course, Module, Assignment, Enrollment, Submission
+from lms_platform.core.counters import reconcile_counters
+from lms_platform.core.gradebook import recompute_course
+from lms_platform.core.models import Course
+from lms_platform.core.seeding import BATCH_SIZE, LoadDataGenerator, Seeder
 
 
 class Command(BaseCommand):
     help = 'Set up HR Learning & Development data with single demo employee account'
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scale',
+            type=int,
+            default=0,
+            help='Also generate N synthetic students (50 submissions each) for load testing',
+        )
+        parser.add_argument(
+            '--courses-per-student',
+            type=int,
+            default=5,
+            help='Courses each synthetic student enrolls in (default: 5)',
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Random seed for the synthetic data (same seed, same data)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=BATCH_SIZE,
+            help=f'Rows per bulk INSERT (default: {BATCH_SIZE})',
+        )
+
     def handle(self, *args, **options):
         self.stdout.write(self.style.SUCCESS('Starting HR Learning & Development data setup...'))
+        started = time.monotonic()
+        self.seeder = Seeder(batch_size=options['batch_size'], log=self.stdout.write)
+
+        # Everything is written in one transaction so a failed run leaves no partial data
+        with transaction.atomic():
+            self.seed_demo_data()
+
+            if options['scale']:
+                self.stdout.write(f'Generating load-test data for {options["scale"]} students...')
+                summary = LoadDataGenerator(
+                    scale=options['scale'],
+                    courses_per_student=options['courses_per_student'],
+                    seed=options['seed'],
+                    batch_size=options['batch_size'],
+                    log=self.stdout.write,
+                ).generate()
+                self.stdout.write(self.style.SUCCESS(f'Load-test data: {summary}'))
+
+            # Bulk writes bypass the counter and gradebook signals
+            reconcile_counters()
+            for course_id in Course.objects.values_list('id', flat=True):
+                recompute_course(course_id)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'HR Learning & Development data setup completed successfully '
+                f'in {time.monotonic() - started:.1f}s!'
+            )
+        )
 
+    def seed_demo_data(self):
+        """Curated demo users, courses and progress for the portfolio site"""
         # Create superuser
         self.create_superuser()
         
@@ -32,39 +95,19 @@ class Command(BaseCommand):
         # Create sample submissions for demo employee
         self.create_sample_submissions(demo_employee, assignments)
 
-        self.stdout.write(
-            self.style.SUCCESS('HR Learning & Development data setup completed successfully!')
-        )
-
     def create_superuser(self):
         """Create superuser if it doesn't exist"""
-        username = 'SuperKatie'
-        password = 'lms-password123'
-        
-        if User.objects.filter(username=username).exists():
-            self.stdout.write(f'Superuser "{username}" already exists.')
-            return
-        
-        superuser = User.objects.create_superuser(
-            username=username,
-            email='superkatie@hrlearning.com',
-            password=password,
-            first_name='Super',
-            last_name='Katie'
-        )
-        
-        # Create admin UserProfile
-        UserProfile.objects.create(
-            user=superuser,
-            role='admin',
-            first_name='Super',
-            last_name='Katie',
-            phone_number='555-0001'
-        )
-        
-        self.stdout.write(
-            self.style.SUCCESS(f'Created superuser: {username}')
-        )
+        self.seeder.seed_users([{
+            'username': 'SuperKatie',
+            'email': 'superkatie@hrlearning.com',
+            'password': 'lms-password123',
+            'first_name': 'Super',
+            'last_name': 'Katie',
+            'role': 'admin',
+            'phone': '555-0001',
+            'is_staff': True,
+            'is_superuser': True,
+        }])
 
     def create_sample_users(self):
         """Create sample users including ONE demo employee"""
@@ -109,38 +152,10 @@ class Command(BaseCommand):
             }
         ]
         
-        demo_employee = None
-        for user_data in users_data:
-            if User.objects.filter(username=user_data['username']).exists():
-                self.stdout.write(f'User "{user_data["username"]}" already exists.')
-                if user_data['role'] == 'student':
-                    demo_employee = User.objects.get(username=user_data['username'])
-                continue
-            
-            user = User.objects.create_user(
-                username=user_data['username'],
-                email=user_data['email'],
-                password=user_data['password'],
-                first_name=user_data['first_name'],
-                last_name=user_data['last_name']
-            )
-            
-            UserProfile.objects.create(
-                user=user,
-                role=user_data['role'],
-                first_name=user_data['first_name'],
-                last_name=user_data['last_name'],
-                phone_number=user_data['phone']
-            )
-            
-            if user_data['role'] == 'student':
-                demo_employee = user
-            
-            self.stdout.write(
-                self.style.SUCCESS(f'Created {user_data["role"]}: {user_data["username"]}')
-            )
+        users = self.seeder.seed_users(users_data)
         
-        return demo_employee
+        # The single student account is the demo employee
+        return next(users[row['username']] for row in users_data if row['role'] == 'student')
 
     def create_sample_courses(self):
         """Create sample HR training courses"""
@@ -176,43 +191,13 @@ class Command(BaseCommand):
         ]
         
         term = 'Q1 2025'
-        courses = []
         
-        for course_data in courses_data:
-            # Check if course already exists
-            if Course.objects.filter(course_code=course_data['course_code']).exists():
-                course = Course.objects.get(course_code=course_data['course_code'])
-                # Update course details
-                course.course_name = course_data['course_name']
-                course.description = course_data['description']
-                course.credits = course_data['credits']
-                course.max_enrollment = course_data['max_enrollment']
-                course.save()
-                self.stdout.write(f'Updated course: {course}')
-                courses.append(course)
-                continue
-            
-            # Get instructor user (trainer or fallback to superuser)
-            instructor = User.objects.filter(userprofile__role='instructor').first()
-            if not instructor:
-                instructor = User.objects.filter(is_superuser=True).first()
-            
-            course = Course.objects.create(
-                course_code=course_data['course_code'],
-                course_name=course_data['course_name'],
-                description=course_data['description'],
-                credits=course_data['credits'],
-                term=term,
-                instructor=instructor,
-                max_enrollment=course_data['max_enrollment']
-            )
-            
-            courses.append(course)
-            self.stdout.write(
-                self.style.SUCCESS(f'Created course: {course}')
-            )
+        # Get instructor user (trainer or fallback to superuser) for new courses
+        instructor = User.objects.filter(userprofile__role='instructor').order_by('id').first()
+        if not instructor:
+            instructor = User.objects.filter(is_superuser=True).first()
         
-        return courses
+        return self.seeder.seed_courses(courses_data, term=term, instructor=instructor)
 
     def create_sample_modules(self, courses):
         """Create sample modules for HR training courses"""
@@ -330,39 +315,23 @@ Learn how every employee contributes to a respectful and inclusive workplace.
             ]
         }
         
-        modules = []
-        for course in courses:
-            if course.course_code in modules_data:
-                for order, module_data in enumerate(modules_data[course.course_code], 1):
-                    # Check if module already exists
-                    if Module.objects.filter(course=course, order_number=order).exists():
-                        module = Module.objects.get(course=course, order_number=order)
-                        module.module_name = module_data['name']
-                        module.description = module_data['description']
-                        module.content = module_data['content']
-                        module.save()
-                        self.stdout.write(f'Updated module: {module.module_name}')
-                        modules.append(module)
-                        continue
-                    
-                    module = Module.objects.create(
-                        course=course,
-                        module_name=module_data['name'],
-                        description=module_data['description'],
-                        order_number=order,
-                        content=module_data['content']
-                    )
-                    
-                    modules.append(module)
-                    self.stdout.write(
-                        self.style.SUCCESS(f'Created module: {module.module_name}')
-                    )
-        
-        return modules
+        return self.seeder.seed_modules([
+            {
+                'course': course,
+                'order_number': order,
+                'module_name': module_data['name'],
+                'description': module_data['description'],
+                'content': module_data['content'],
+            }
+            for course in courses
+            for order, module_data in enumerate(modules_data.get(course.course_code, []), 1)
+        ])
 
     def create_sample_assignments(self, modules):
         """Create sample assignments for HR training modules"""
-        assignments = []
+        # Set due date to 2 weeks from now (only used for new assignments)
+        due_date = timezone.now() + timedelta(days=14)
+        assignments_data = []
         
         for module in modules:
             if 'Emergency Procedures' in module.module_name:
@@ -509,37 +478,17 @@ Good luck!
                 assignment_type = 'quiz'
                 max_points = 50
             
-            # Check if assignment already exists
-            if Assignment.objects.filter(module=module, assignment_name=assignment_name).exists():
-                assignment = Assignment.objects.get(module=module, assignment_name=assignment_name)
-                assignment.description = description
-                assignment.instructions = instructions
-                assignment.assignment_type = assignment_type
-                assignment.max_points = max_points
-                assignment.save()
-                self.stdout.write(f'Updated assignment: {assignment_name}')
-                assignments.append(assignment)
-                continue
-            
-            # Set due date to 2 weeks from now
-            due_date = timezone.now() + timedelta(days=14)
-            
-            assignment = Assignment.objects.create(
-                module=module,
-                assignment_name=assignment_name,
-                description=description,
-                due_date=due_date,
-                max_points=max_points,
-                assignment_type=assignment_type,
-                instructions=instructions
-            )
-            
-            assignments.append(assignment)
-            self.stdout.write(
-                self.style.SUCCESS(f'Created assignment: {assignment_name}')
-            )
+            assignments_data.append({
+                'module': module,
+                'assignment_name': assignment_name,
+                'description': description,
+                'due_date': due_date,
+                'max_points': max_points,
+                'assignment_type': assignment_type,
+                'instructions': instructions,
+            })
         
-        return assignments
+        return self.seeder.seed_assignments(assignments_data)
 
     def create_sample_enrollments(self, demo_employee, courses):
         """Create sample enrollments for demo employee"""
@@ -547,32 +496,18 @@ Good luck!
             self.stdout.write(self.style.ERROR('No demo employee found! Cannot create enrollments.'))
             return []
         
-        enrollments = []
-        
         # Enroll demo employee in first two courses (Safety and Compliance - typical required training)
         required_courses = courses[:2]  # SAFE101 and COMP201
         
-        for course in required_courses:
-            # Check if enrollment already exists
-            if Enrollment.objects.filter(student=demo_employee, course=course).exists():
-                enrollment = Enrollment.objects.get(student=demo_employee, course=course)
-                self.stdout.write(f'Enrollment for {demo_employee.username} in {course.course_code} already exists.')
-                enrollments.append(enrollment)
-                continue
-            
-            enrollment = Enrollment.objects.create(
-                student=demo_employee,
-                course=course,
-                current_grade=None,  # Will be calculated from submissions
-                status='active'
-            )
-            
-            enrollments.append(enrollment)
-            self.stdout.write(
-                self.style.SUCCESS(f'Created enrollment: {demo_employee.username} in {course.course_code}')
-            )
-        
-        return enrollments
+        return self.seeder.seed_enrollments([
+            {
+                'student': demo_employee,
+                'course': course,
+                'current_grade': None,  # Will be calculated from submissions
+                'status': 'active',
+            }
+            for course in required_courses
+        ])
 
     def create_sample_submissions(self, demo_employee, assignments):
         """Create sample submissions for demo employee"""
@@ -580,13 +515,10 @@ Good luck!
             self.stdout.write(self.style.ERROR('No demo employee found! Cannot create submissions.'))
             return
         
+        submissions_data = []
+        
         # Create submissions for first few assignments to show progress
         for assignment in assignments[:2]:  # Submit to first 2 assignments
-            # Check if submission already exists
-            if Submission.objects.filter(student=demo_employee, assignment=assignment).exists():
-                self.stdout.write(f'Submission for {demo_employee.username} on {assignment.assignment_name} already exists.')
-                continue
-            
             if 'Emergency Response' in assignment.assignment_name:
                 submission_content = '''
 **Part A: Multiple Choice Answers**
@@ -653,17 +585,15 @@ I feel confident in applying these concepts to my daily work and will reference
                 grade = 85.0
                 feedback = 'Good completion of the training requirements. Your responses demonstrate understanding of the key concepts. Continue to apply these principles in your daily work.'
             
-            submission = Submission.objects.create(
-                student=demo_employee,
-                assignment=assignment,
-                submission_content=submission_content,
-                grade=grade,
-                feedback=feedback,
-                graded_by=assignment.module.course.instructor,
-                graded_at=timezone.now(),
-                status='graded'
-            )
-            
-            self.stdout.write(
-                self.style.SUCCESS(f'Created submission: {demo_employee.username} - {assignment.assignment_name}')
-            )
\ No newline at end of file
+            submissions_data.append({
+                'student': demo_employee,
+                'assignment': assignment,
+                'submission_content': submission_content,
+                'grade': grade,
+                'feedback': feedback,
+                'graded_by': assignment.module.course.instructor,
+                'graded_at': timezone.now(),
+                'status': 'graded',
+            })
+        
+        self.seeder.seed_submissions(submissions_data)
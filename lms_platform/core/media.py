@@ -0,0 +1,200 @@
+"""
+Authorized serving of uploaded media.
+
+Every request under MEDIA_URL goes through protected_media() (views.py),
+which checks who may see the file before anything is sent:
+
+  submissions/...  the submitting student(s), the course instructor, and
+                   staff with the view_submission permission (graders)
+  profiles/...     any signed-in user (avatars appear on rosters)
+
+Anything else, including the storage's internal staging directories, is
+a 404, as is a file the user may not see, so private files are not
+acknowledged to outsiders.
+
+Once a request is authorized the bytes are sent by the cheapest available
+route (LMS_MEDIA_ACCEL): an X-Accel-Redirect to an internal nginx
+location, an X-Sendfile header for Apache/lighttpd, or, without a proxy,
+a FileResponse that honours ETag/If-None-Match, If-Modified-Since and
+single HTTP Range requests so large downloads can be resumed and
+seeked without re-sending the whole file.
+
+Submission files are whatever students uploaded, under a name and
+extension they chose, so they are always sent as attachments with a
+sandboxing Content-Security-Policy: an .html or .svg submission is
+downloaded, never rendered on the LMS origin where it could act with an
+instructor's session.
+"""
+import mimetypes
+import os
+import posixpath
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.db.models import Q
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import content_disposition_header, http_date, parse_http_date_safe
+
+from .models import Submission, UserProfile
+from .roles import get_role
+
+
+SINGLE_RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+# Keeps scripts in an untrusted file from running even if a browser renders it
+UNTRUSTED_CSP = "sandbox; default-src 'none'"
+
+# SHA-256 file names written by the content-addressed storage
+CONTENT_ADDRESSED = re.compile(r'^[0-9a-f]{64}$')
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def media_storage(name):
+    """The storage a media name belongs to, or None for names that are never served"""
+    if name.startswith('submissions/'):
+        return Submission._meta.get_field('file_upload').storage
+    if name.startswith('profiles/'):
+        return UserProfile._meta.get_field('profile_picture').storage
+    return None
+
+
+def can_view_media(request, name):
+    """Whether the requesting user may download this media file"""
+    user = request.user
+    if not user.is_authenticated:
+        return False
+    if name.startswith('profiles/'):
+        return True
+    if user.has_perm('core.view_submission') or get_role(request) == 'admin':
+        return True
+    # Identical files share one stored name, so any submission with it grants access
+    return Submission.objects.filter(file_upload=name).filter(
+        Q(student=user) | Q(assignment__module__course__instructor=user)
+    ).exists()
+
+
+def file_etag(name, stat):
+    """Strong ETag: the content hash for content-addressed names, else size and mtime"""
+    stem = os.path.splitext(posixpath.basename(name))[0]
+    if CONTENT_ADDRESSED.match(stem):
+        return f'"{stem}"'
+    return f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+
+
+def parse_range(header, size):
+    """
+    (start, end) inclusive for a single-range Range header, or None to
+    send the whole file (no header, several ranges or a malformed one,
+    which RFC 9110 allows servers to ignore). Raises RangeNotSatisfiable.
+    """
+    match = SINGLE_RANGE.match((header or '').strip())
+    if not match or match.groups() == ('', ''):
+        return None
+    first, last = match.groups()
+    if not first:
+        suffix = int(last)  # the last N bytes
+        if not suffix:
+            raise RangeNotSatisfiable
+        return max(size - suffix, 0), size - 1
+    start = int(first)
+    end = int(last) if last else size - 1
+    if end < start and last:
+        return None
+    if start >= size:
+        raise RangeNotSatisfiable
+    return start, min(end, size - 1)
+
+
+def read_range(handle, start, length, block_size=FileResponse.block_size):
+    """Yield `length` bytes of an open file from `start`, then close it"""
+    with handle:
+        handle.seek(start)
+        remaining = length
+        while remaining > 0:
+            data = handle.read(min(block_size, remaining))
+            if not data:
+                break
+            remaining -= len(data)
+            yield data
+
+
+def accelerated_response(name, path, content_type):
+    """Let the front proxy send the file; None when LMS_MEDIA_ACCEL is off"""
+    mode = settings.LMS_MEDIA_ACCEL
+    if not mode:
+        return None
+    response = HttpResponse(content_type=content_type)
+    if mode == 'x-accel-redirect':
+        response['X-Accel-Redirect'] = settings.LMS_MEDIA_ACCEL_PREFIX.rstrip('/') + '/' + quote(name)
+    elif mode == 'x-sendfile':
+        response['X-Sendfile'] = path
+    else:
+        raise ValueError(f'Unknown LMS_MEDIA_ACCEL mode {mode!r}')
+    return response
+
+
+def serve_media(request, name):
+    """The response for an authorized media request"""
+    name = posixpath.normpath(name).lstrip('/')
+    storage = media_storage(name)
+    if storage is None or any(part.startswith('.') for part in name.split('/')):
+        raise Http404
+    if not can_view_media(request, name):
+        raise Http404
+    try:
+        path = storage.path(name)
+        stat = os.stat(path)
+    except (SuspiciousFileOperation, FileNotFoundError, NotADirectoryError):
+        raise Http404
+
+    content_type = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+    response = accelerated_response(name, path, content_type)
+    if response is None:
+        response = file_response(request, path, stat, file_etag(name, stat), content_type)
+    if name.startswith('submissions/'):
+        response['Content-Disposition'] = content_disposition_header(True, posixpath.basename(name))
+        response['Content-Security-Policy'] = UNTRUSTED_CSP
+    response['Cache-Control'] = f'private, max-age={settings.LMS_MEDIA_MAX_AGE}'
+    response['X-Content-Type-Options'] = 'nosniff'
+    return response
+
+
+def file_response(request, path, stat, etag, content_type):
+    """FileResponse with conditional GET and single-range support"""
+    last_modified = int(stat.st_mtime)
+    not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if not_modified is not None:
+        not_modified['ETag'] = etag
+        return not_modified
+
+    size = stat.st_size
+    byte_range = None
+    if_range = request.headers.get('If-Range')
+    # A Range is only honoured if the client's copy is still the current one
+    if not if_range or if_range == etag or parse_http_date_safe(if_range) == last_modified:
+        try:
+            byte_range = parse_range(request.headers.get('Range'), size)
+        except RangeNotSatisfiable:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+
+    if byte_range is None:
+        response = FileResponse(open(path, 'rb'), content_type=content_type)
+    else:
+        start, end = byte_range
+        response = StreamingHttpResponse(
+            read_range(open(path, 'rb'), start, end - start + 1), status=206, content_type=content_type,
+        )
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Content-Length'] = end - start + 1
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    return response
@@ -0,0 +1,159 @@
+"""
+Middleware for the core app.
+"""
+import heapq
+import json
+import logging
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from .roles import resolve_profile
+
+
+query_logger = logging.getLogger('lms_platform.queries')
+
+
+class LMSRoleMiddleware:
+    """
+    Attach request.lms_profile and request.lms_role for authenticated users.
+    Must come after SessionMiddleware and AuthenticationMiddleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        profile = resolve_profile(request)
+        request.lms_profile = profile
+        request.lms_role = profile['role'] if profile else None
+        return self.get_response(request)
+
+
+class QueryRecorder:
+    """
+    connection.execute_wrapper callable that tracks query count, total SQL
+    time and the top_n slowest statements for one request.
+    """
+
+    def __init__(self, top_n=5):
+        self.top_n = top_n
+        self.count = 0
+        self.total_time = 0.0
+        self.slowest = []  # min-heap of (duration, sql)
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - started
+            self.count += 1
+            self.total_time += duration
+            if self.top_n:
+                entry = (duration, sql)
+                if len(self.slowest) < self.top_n:
+                    heapq.heappush(self.slowest, entry)
+                elif duration > self.slowest[0][0]:
+                    heapq.heapreplace(self.slowest, entry)
+
+    def slowest_statements(self):
+        """Slowest statements first, as (milliseconds, sql) pairs"""
+        return [(duration * 1000, sql) for duration, sql in sorted(self.slowest, reverse=True)]
+
+
+class QueryInstrumentationMiddleware:
+    """
+    Record query count, SQL time and the slowest statements of each request.
+
+    LMS_QUERY_INSTRUMENTATION controls reporting:
+      'off'   - nothing is recorded
+      'staff' - staff users opt in per request with ?_lms_queries=1 or the
+                X-LMS-Query-Stats: 1 header
+      'all'   - every request is reported
+    Reported requests get a Server-Timing header (visible in browser dev
+    tools) and a JSON log line on the "lms_platform.queries" logger. SQL
+    text only goes into the header for staff users; everyone else gets the
+    timings alone, and the statements stay in the log line. Any
+    request above LMS_QUERY_COUNT_WARNING queries is logged as a warning
+    regardless, to surface N+1 regressions in production.
+
+    Streaming responses (the CSV/JSONL exports) run most of their queries
+    while the body is iterated, after this middleware has returned, so
+    their numbers would be misleadingly low: they get no Server-Timing
+    header, and their log line is marked "streamed" (view queries only).
+
+    Place it before SessionMiddleware so session and user lookups count too.
+    """
+
+    QUERY_PARAM = '_lms_queries'
+    HEADER = 'HTTP_X_LMS_QUERY_STATS'
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.mode = settings.LMS_QUERY_INSTRUMENTATION
+        if self.mode == 'off':
+            raise MiddlewareNotUsed
+
+    def __call__(self, request):
+        recorder = QueryRecorder(top_n=settings.LMS_QUERY_TOP_N)
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            response = self.get_response(request)
+        elapsed = time.perf_counter() - started
+
+        if self.is_reported(request):
+            if not response.streaming:
+                response['Server-Timing'] = self.server_timing(recorder, elapsed, show_sql=self.is_staff(request))
+            query_logger.info(self.log_line(request, response, recorder, elapsed))
+        elif recorder.count > settings.LMS_QUERY_COUNT_WARNING:
+            query_logger.warning(self.log_line(request, response, recorder, elapsed))
+        return response
+
+    def is_reported(self, request):
+        if self.mode == 'all':
+            return True
+        requested = request.GET.get(self.QUERY_PARAM) == '1' or request.META.get(self.HEADER) == '1'
+        return requested and self.is_staff(request)
+
+    def is_staff(self, request):
+        user = getattr(request, 'user', None)
+        return user is not None and user.is_staff
+
+    def server_timing(self, recorder, elapsed, show_sql=True):
+        """Server-Timing header value: total, db and one entry per slow statement"""
+        metrics = [
+            f'total;dur={elapsed * 1000:.1f}',
+            f'db;dur={recorder.total_time * 1000:.1f};desc="{recorder.count} queries"',
+        ]
+        for number, (duration, sql) in enumerate(recorder.slowest_statements(), 1):
+            # Statements reveal schema and data; only staff see them in the response
+            description = f';desc="{self.summarize_sql(sql)}"' if show_sql else ''
+            metrics.append(f'sql-{number};dur={duration:.1f}{description}')
+        return ', '.join(metrics)
+
+    def log_line(self, request, response, recorder, elapsed):
+        return json.dumps({
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'streamed': response.streaming,
+            'duration_ms': round(elapsed * 1000, 1),
+            'query_count': recorder.count,
+            'sql_ms': round(recorder.total_time * 1000, 1),
+            'slowest': [
+                {'ms': round(duration, 2), 'sql': sql}
+                for duration, sql in recorder.slowest_statements()
+            ],
+        })
+
+    @staticmethod
+    def summarize_sql(sql, length=80):
+        """Single-line, quote-free SQL prefix that is safe inside a header"""
+        summary = ' '.join(sql.split()).replace('"', '').replace('\\', '')
+        return summary if len(summary) <= length else summary[:length - 3] + '...'
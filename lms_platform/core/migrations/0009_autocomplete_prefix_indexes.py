@@ -0,0 +1,56 @@
+# Generated by Django 5.2.18 on 2026-10-16 22:32
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+# Admin autocomplete matches UPPER(column) LIKE 'TERM%' (PrefixAutocompleteMixin).
+# text_pattern_ops lets PostgreSQL use the index for LIKE under any collation;
+# Django has no portable way to declare an operator class, so these are raw SQL.
+PREFIX_INDEXES = [
+    # (index name, app label, model, column)
+    ('core_course_code_upper_like', 'core', 'Course', 'course_code'),
+    ('core_module_name_upper_like', 'core', 'Module', 'module_name'),
+    ('core_assign_name_upper_like', 'core', 'Assignment', 'assignment_name'),
+    ('core_user_username_upper_like', *settings.AUTH_USER_MODEL.split('.'), 'username'),
+]
+
+
+def create_prefix_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    quote = schema_editor.quote_name
+    for name, app_label, model_name, column in PREFIX_INDEXES:
+        table = apps.get_model(app_label, model_name)._meta.db_table
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {quote(name)} ON {quote(table)} (UPPER({quote(column)}) text_pattern_ops)'
+        )
+
+
+def drop_prefix_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, *_ in PREFIX_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {schema_editor.quote_name(name)}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_access_path_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='assignment',
+            name='assignment_name',
+            field=models.CharField(max_length=200),
+        ),
+        migrations.AlterField(
+            model_name='module',
+            name='module_name',
+            field=models.CharField(max_length=200),
+        ),
+        migrations.RunPython(create_prefix_indexes, drop_prefix_indexes),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:19
+
+import lms_platform.core.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_submission_claims'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StoredBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('sha256', models.CharField(db_index=True, max_length=64)),
+                ('size', models.BigIntegerField()),
+                ('ref_count', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='submission',
+            name='file_upload',
+            field=models.FileField(blank=True, null=True, storage=lms_platform.core.storage.get_submission_storage, upload_to='submissions/'),
+        ),
+    ]
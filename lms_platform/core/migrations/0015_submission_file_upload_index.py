@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:42
+
+import lms_platform.core.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_userprofile_picture_variants'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='submission',
+            name='file_upload',
+            field=models.FileField(blank=True, db_index=True, null=True, storage=lms_platform.core.storage.get_submission_storage, upload_to='submissions/'),
+        ),
+    ]
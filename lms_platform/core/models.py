@@ -1,6 +1,10 @@
+import uuid
+
 from django.db import models
 from django.contrib.auth.models import User
 
+from .storage import get_submission_storage
+
 class UserProfile(models.Model):
     """
     Extends Django's built-in User model with LMS-specific profile information.
@@ -20,6 +24,7 @@ class UserProfile(models.Model):
     last_name = models.CharField(max_length=50)
     phone_number = models.CharField(max_length=15, blank=True)
     profile_picture = models.ImageField(upload_to='profiles/', blank=True, null=True)
+    picture_variants = models.JSONField(default=list, blank=True, editable=False)  # Resized variants built for profile_picture (see core/images.py)
     
     def __str__(self):
         return f"{self.first_name} {self.last_name} ({self.role})"
@@ -101,6 +106,11 @@ class Assignment(models.Model):
     
     class Meta:
         ordering = ['due_date']
+        indexes = [
+            # Newest/upcoming assignments within a course's modules
+            models.Index(fields=['module', 'created_at'], name='core_assign_module_created_idx'),
+            models.Index(fields=['module', 'due_date'], name='core_assign_module_due_idx'),
+        ]
 
 class Enrollment(models.Model):
     """
@@ -128,6 +138,12 @@ class Enrollment(models.Model):
     
     class Meta:
         unique_together = ['student', 'course']  # Student can only enroll once per course
+        indexes = [
+            # Student dashboard: a student's active enrollments
+            models.Index(fields=['student', 'status'], name='core_enroll_student_status_idx'),
+            # Admin dashboard: enrollments in the last N days
+            models.Index(fields=['enrollment_date'], name='core_enroll_date_idx'),
+        ]
 
 class Submission(models.Model):
     """
@@ -146,16 +162,123 @@ class Submission(models.Model):
     assignment = models.ForeignKey(Assignment, on_delete=models.CASCADE, related_name='submissions')
     submission_date = models.DateTimeField(auto_now_add=True)
     submission_content = models.TextField(blank=True)  # Text response
-    file_upload = models.FileField(upload_to='submissions/', blank=True, null=True)  # File uploads
+    # Deduplicated by content (see core/storage.py); indexed because every download
+    # is authorized by looking up the submissions that reference the file (core/media.py)
+    file_upload = models.FileField(upload_to='submissions/', storage=get_submission_storage, blank=True, null=True, db_index=True)
     grade = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True)  # Points received
     feedback = models.TextField(blank=True)  # Instructor comments
     graded_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='graded_submissions')
     graded_at = models.DateTimeField(null=True, blank=True)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='submitted')
+    # Grading queue lease (see core/grading_queue.py)
+    claimed_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='claimed_submissions')
+    claimed_until = models.DateTimeField(null=True, blank=True)
     
     def __str__(self):
         return f"{self.student.username} - {self.assignment.assignment_name}"
     
     class Meta:
         unique_together = ['student', 'assignment']  # One submission per student per assignment
-        ordering = ['-submission_date']
\ No newline at end of file
+        ordering = ['-submission_date']
+        indexes = [
+            # A student's latest submissions, optionally narrowed by status
+            models.Index(fields=['student', '-submission_date'], name='core_sub_student_date_idx'),
+            models.Index(fields=['student', 'status'], name='core_sub_student_status_idx'),
+            # Grading queue: only pending rows are indexed (partial index), in
+            # claimable()'s (submission_date, id) order so no sort is needed
+            models.Index(
+                fields=['submission_date', 'id'],
+                condition=models.Q(status='submitted'),
+                name='core_sub_pending_idx',
+            ),
+        ]
+
+class StatCounter(models.Model):
+    """
+    Pre-aggregated row count used by the admin dashboard.
+    Each row holds one named counter (e.g. "total_submissions") that is kept
+    up to date by signal handlers in core/signals.py and periodically
+    reconciled against the real tables by the reconcile_counters command.
+    """
+
+    key = models.CharField(max_length=50, unique=True)  # e.g., "graded_submissions"
+    value = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.key}: {self.value}"
+
+
+class JobCheckpoint(models.Model):
+    """
+    Progress of a long-running batch job (e.g. "finalize_term:Fall 2025").
+    cursor is the last primary key the job has fully processed; it is saved
+    in the same transaction as each batch so an interrupted job resumes
+    exactly where it stopped.
+    """
+
+    job_name = models.CharField(max_length=100, unique=True)
+    cursor = models.BigIntegerField(default=0)  # Last processed id
+    processed = models.BigIntegerField(default=0)  # Rows changed so far
+    started_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.job_name} at {self.cursor}"
+
+
+class StoredBlob(models.Model):
+    """
+    One content-addressed file in media storage (see core/storage.py).
+    ref_count is the number of rows whose file field points at name; the
+    file is deleted when it drops to zero. A row at zero is kept until the
+    file is gone, so writers and the deleter always lock the same row.
+    """
+
+    name = models.CharField(max_length=255, unique=True)  # e.g., "submissions/ab/cd/abcd....pdf"
+    sha256 = models.CharField(max_length=64, db_index=True)
+    size = models.BigIntegerField()
+    ref_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.ref_count} refs)"
+
+    @classmethod
+    def lock(cls, name, sha256, size):
+        """The blob's row, created if needed and locked until the transaction ends"""
+        while True:
+            blob, _ = cls.objects.get_or_create(name=name, defaults={'sha256': sha256, 'size': size})
+            try:
+                return cls.objects.select_for_update().get(pk=blob.pk)
+            except cls.DoesNotExist:
+                continue  # deleted by _delete_unreferenced() while we waited for the lock
+
+    def acquire(self):
+        """Record one more reference to this (locked) blob"""
+        StoredBlob.objects.filter(pk=self.pk).update(ref_count=models.F('ref_count') + 1)
+
+
+class UploadSession(models.Model):
+    """
+    A resumable, chunked upload of a submission file (see core/uploads.py).
+    Chunks are appended to a part file in the upload temp area; offset is
+    how many bytes of it have been received and made durable.
+    """
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)  # Also the client's upload token
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='upload_sessions')
+    assignment = models.ForeignKey('Assignment', on_delete=models.CASCADE, related_name='upload_sessions')
+    filename = models.CharField(max_length=255)
+    size = models.BigIntegerField()  # Total bytes the client announced
+    sha256 = models.CharField(max_length=64)  # Expected digest, checked on completion
+    chunk_size = models.PositiveIntegerField()
+    offset = models.BigIntegerField(default=0)  # Bytes received so far
+    submission = models.ForeignKey('Submission', on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.filename} ({self.offset}/{self.size})"
@@ -0,0 +1,47 @@
+"""
+Paginators for very large admin changelists.
+"""
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import QuerySet
+from django.utils.functional import cached_property
+
+
+def estimate_row_count(queryset):
+    """
+    Planner estimate of the row count for an unfiltered queryset on PostgreSQL.
+    Returns None when no cheap estimate is available (other databases,
+    filtered or distinct querysets, or tables that were never analyzed).
+    """
+    if not isinstance(queryset, QuerySet):
+        return None
+    connection = connections[queryset.db]
+    query = queryset.query
+    if connection.vendor != 'postgresql' or query.where or query.distinct or query.is_sliced:
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+            [connection.ops.quote_name(queryset.model._meta.db_table)],
+        )
+        row = cursor.fetchone()
+    # reltuples is -1 (PostgreSQL 14+) or 0 until the table has been analyzed
+    if row is None or row[0] <= 0:
+        return None
+    return row[0]
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator that skips the exact COUNT(*) for big unfiltered tables.
+    Uses pg_class.reltuples when it reports at least exact_count_threshold
+    rows; small tables, filtered changelists and SQLite get an exact count.
+    """
+    exact_count_threshold = 10000
+
+    @cached_property
+    def count(self):
+        estimate = estimate_row_count(self.object_list)
+        if estimate is not None and estimate >= self.exact_count_threshold:
+            return estimate
+        return super().count
@@ -0,0 +1,143 @@
+"""
+Request-scoped role resolution for LMS users.
+
+The user's role and display name are copied into the session at login and
+re-used on every request, so role checks no longer need a UserProfile query.
+A per-user version stamp in the cache is bumped whenever the profile changes
+(see core/signals.py); a session whose stamp no longer matches is refreshed
+from the database on its next request.
+
+The stamp is a digest of the session summary itself, so a process with a
+cold cache derives the same stamp every other process has and the session
+stays valid, instead of minting a stamp of its own and forcing a reload
+(and a session write) on every request that lands on a different worker.
+Changes only propagate between workers when the cache is shared (Redis,
+Memcached or the database cache); with the per-process LocMemCache another
+worker notices a change once its own cached stamp is recomputed.
+"""
+import hashlib
+import json
+from functools import wraps
+
+from django.contrib.auth.decorators import login_required
+from django.core.cache import cache
+from django.http import HttpResponseForbidden
+
+from .models import UserProfile
+
+
+SESSION_PROFILE_KEY = 'lms_profile'
+SESSION_VERSION_KEY = 'lms_profile_version'
+VERSION_CACHE_PREFIX = 'lms:profile_version'
+
+
+# UserProfile fields profile_summary() reads
+SUMMARY_FIELDS = ('role', 'first_name', 'last_name', 'profile_picture', 'picture_variants')
+
+# Stands in for "profile not loaded yet" (None means the user has no profile)
+NOT_LOADED = object()
+
+
+def profile_stamp(summary):
+    """Version stamp for a profile summary; equal summaries get equal stamps in every process"""
+    return hashlib.sha256(json.dumps(summary, sort_keys=True).encode()).hexdigest()[:32]
+
+
+def load_profile(user_id):
+    return UserProfile.objects.filter(user_id=user_id).only(*SUMMARY_FIELDS).first()
+
+
+def get_profile_version(user_id, profile=NOT_LOADED):
+    """
+    Current version stamp for a user's profile. A cold cache is filled with
+    the stamp of `profile` when given (already loaded), else of the stored row.
+    """
+    key = f'{VERSION_CACHE_PREFIX}:{user_id}'
+    version = cache.get(key)
+    if version is None:
+        summary = profile_summary(load_profile(user_id) if profile is NOT_LOADED else profile)
+        cache.add(key, profile_stamp(summary), None)
+        version = cache.get(key)
+    return version
+
+
+def bump_profile_version(user_id):
+    """Invalidate every session's cached copy of this user's profile"""
+    cache.set(f'{VERSION_CACHE_PREFIX}:{user_id}', profile_stamp(profile_summary(load_profile(user_id))), None)
+
+
+def profile_summary(profile):
+    """The small, session-safe subset of a UserProfile that pages need"""
+    if profile is None:
+        return None
+    return {
+        'role': profile.role,
+        'first_name': profile.first_name,
+        'last_name': profile.last_name,
+        'profile_picture': profile.profile_picture.name or '',
+        'picture_variants': profile.picture_variants,
+    }
+
+
+def remember_profile(request, profile):
+    """Store the profile summary in the session (call right after login)"""
+    summary = profile_summary(profile)
+    request.session[SESSION_PROFILE_KEY] = summary
+    request.session[SESSION_VERSION_KEY] = get_profile_version(request.user.pk, profile)
+    request.lms_profile = summary
+    request.lms_role = summary['role'] if summary else None
+    return summary
+
+
+def resolve_profile(request):
+    """
+    Return the profile summary for request.user, or None.
+    Served from the session while its version stamp is current; otherwise
+    reloaded with one query and written back to the session.
+    """
+    user = request.user
+    if not user.is_authenticated:
+        return None
+    session = request.session
+    version = cache.get(f'{VERSION_CACHE_PREFIX}:{user.pk}')
+    profile = NOT_LOADED
+    if version is None:
+        # Cold cache: the row gives the stamp and, should the session be stale, the summary
+        profile = load_profile(user.pk)
+        version = get_profile_version(user.pk, profile)
+    if SESSION_PROFILE_KEY in session and session.get(SESSION_VERSION_KEY) == version:
+        return session[SESSION_PROFILE_KEY]
+    if profile is NOT_LOADED:
+        profile = load_profile(user.pk)
+    return remember_profile(request, profile)
+
+
+def get_role(request):
+    """Role of the current user, using request.lms_role when the middleware ran"""
+    if not hasattr(request, 'lms_role'):
+        profile = resolve_profile(request)
+        request.lms_profile = profile
+        request.lms_role = profile['role'] if profile else None
+    return request.lms_role
+
+
+def role_required(*roles):
+    """
+    Decorator for views that only users with one of the given roles may see.
+    Anonymous users are sent to the login page; wrong roles get a 403.
+    Usage: @role_required('student')
+    """
+    labels = ', '.join(f'{dict(UserProfile.ROLE_CHOICES)[role]}s' for role in roles)
+
+    def decorator(view_func):
+        @wraps(view_func)
+        @login_required
+        def wrapper(request, *args, **kwargs):
+            role = get_role(request)
+            if role is None:
+                return HttpResponseForbidden("Profile not found.")
+            if role not in roles:
+                return HttpResponseForbidden(f"Access denied. {labels} only.")
+            return view_func(request, *args, **kwargs)
+        return wrapper
+    return decorator
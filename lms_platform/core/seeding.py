@@ -0,0 +1,357 @@
+"""
+Bulk, idempotent data seeding.
+
+Used by the setup_production management command for the curated demo data
+and for synthetic load-test data (--scale). Every model is written with
+bulk_create (ignore_conflicts / update_conflicts against its unique key)
+after looking up the keys that already exist with one query per model, so
+re-running a seed only writes what is missing.
+
+Bulk writes bypass model signals, so callers should reconcile the dashboard
+counters (core/counters.py) once seeding has finished.
+"""
+import random
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.utils import timezone
+
+from .models import UserProfile, Course, Module, Assignment, Enrollment, Submission
+
+
+BATCH_SIZE = 2000
+
+
+class Seeder:
+    """
+    Writes rows in bulk and reports what was created.
+    Each seed_* method takes plain dicts and returns the saved objects.
+    """
+
+    def __init__(self, batch_size=BATCH_SIZE, log=None):
+        self.batch_size = batch_size
+        self.log = log or (lambda message: None)
+        self._password_hashes = {}
+
+    def hash_password(self, password):
+        """Hash each distinct password once instead of once per user"""
+        if password not in self._password_hashes:
+            self._password_hashes[password] = make_password(password)
+        return self._password_hashes[password]
+
+    def seed_users(self, users_data):
+        """
+        Create missing users and profiles; existing users are left untouched.
+        users_data rows: username, email, first_name, last_name, role, phone,
+        password and optionally is_staff / is_superuser.
+        Returns {username: User}.
+        """
+        usernames = [row['username'] for row in users_data]
+        existing = set(User.objects.filter(username__in=usernames).values_list('username', flat=True))
+        new_users = [
+            User(
+                username=row['username'],
+                email=row['email'],
+                first_name=row['first_name'],
+                last_name=row['last_name'],
+                password=self.hash_password(row['password']),
+                is_staff=row.get('is_staff', False),
+                is_superuser=row.get('is_superuser', False),
+            )
+            for row in users_data if row['username'] not in existing
+        ]
+        User.objects.bulk_create(new_users, batch_size=self.batch_size, ignore_conflicts=True)
+        users = User.objects.in_bulk(usernames, field_name='username')
+
+        with_profiles = set(
+            UserProfile.objects.filter(user__in=users.values()).values_list('user_id', flat=True)
+        )
+        UserProfile.objects.bulk_create(
+            [
+                UserProfile(
+                    user=users[row['username']],
+                    role=row['role'],
+                    first_name=row['first_name'],
+                    last_name=row['last_name'],
+                    phone_number=row.get('phone', ''),
+                )
+                for row in users_data if users[row['username']].pk not in with_profiles
+            ],
+            batch_size=self.batch_size,
+            ignore_conflicts=True,
+        )
+        self.log(f'Users: {len(new_users)} created, {len(existing)} already existed')
+        return users
+
+    def seed_courses(self, courses_data, term, instructor):
+        """
+        Upsert courses on course_code. Existing courses get their name,
+        description, credits and capacity refreshed; term and instructor
+        (which a row may override) are only set on creation.
+        Returns courses in input order.
+        """
+        codes = [row['course_code'] for row in courses_data]
+        existing = set(Course.objects.filter(course_code__in=codes).values_list('course_code', flat=True))
+        Course.objects.bulk_create(
+            [Course(**{'term': term, 'instructor': instructor, **row}) for row in courses_data],
+            batch_size=self.batch_size,
+            update_conflicts=True,
+            unique_fields=['course_code'],
+            update_fields=['course_name', 'description', 'credits', 'max_enrollment', 'updated_at'],
+        )
+        courses = Course.objects.in_bulk(codes, field_name='course_code')
+        self.log(f'Courses: {len(codes) - len(existing)} created, {len(existing)} updated')
+        return [courses[code] for code in codes]
+
+    def seed_modules(self, modules_data):
+        """
+        Upsert modules on (course, order_number).
+        modules_data rows: course, order_number, module_name, description, content.
+        Returns modules in input order.
+        """
+        course_ids = {row['course'].pk for row in modules_data}
+        existing = set(
+            Module.objects.filter(course_id__in=course_ids).values_list('course_id', 'order_number')
+        )
+        Module.objects.bulk_create(
+            [Module(**row) for row in modules_data],
+            batch_size=self.batch_size,
+            update_conflicts=True,
+            unique_fields=['course', 'order_number'],
+            update_fields=['module_name', 'description', 'content', 'updated_at'],
+        )
+        modules = {
+            (module.course_id, module.order_number): module
+            for module in Module.objects.filter(course_id__in=course_ids).select_related('course')
+        }
+        keys = [(row['course'].pk, row['order_number']) for row in modules_data]
+        created = len(set(keys) - existing)
+        self.log(f'Modules: {created} created, {len(keys) - created} updated')
+        return [modules[key] for key in keys]
+
+    def seed_assignments(self, assignments_data):
+        """
+        Create or refresh assignments keyed on (module, assignment_name).
+        There is no unique constraint to upsert against, so existing rows are
+        found with one query and refreshed with a single bulk_update.
+        Returns assignments in input order.
+        """
+        module_ids = {row['module'].pk for row in assignments_data}
+        existing = {
+            (assignment.module_id, assignment.assignment_name): assignment
+            for assignment in Assignment.objects.filter(module_id__in=module_ids)
+        }
+        refreshed_fields = ['description', 'instructions', 'assignment_type', 'max_points']
+        to_create, to_update, assignments = [], [], []
+        for row in assignments_data:
+            assignment = existing.get((row['module'].pk, row['assignment_name']))
+            if assignment is None:
+                assignment = Assignment(**row)
+                to_create.append(assignment)
+            else:
+                for field in refreshed_fields:
+                    setattr(assignment, field, row[field])
+                assignment.updated_at = timezone.now()
+                to_update.append(assignment)
+            assignments.append(assignment)
+        Assignment.objects.bulk_create(to_create, batch_size=self.batch_size)
+        Assignment.objects.bulk_update(to_update, refreshed_fields + ['updated_at'], batch_size=self.batch_size)
+        if to_create and to_create[0].pk is None:
+            # Backends that cannot return ids from bulk inserts
+            saved = {
+                (assignment.module_id, assignment.assignment_name): assignment
+                for assignment in Assignment.objects.filter(module_id__in=module_ids)
+            }
+            assignments = [saved[(a.module_id, a.assignment_name)] for a in assignments]
+        self.log(f'Assignments: {len(to_create)} created, {len(to_update)} updated')
+        return assignments
+
+    def seed_enrollments(self, enrollments_data):
+        """Create missing enrollments; rows are Enrollment field dicts"""
+        return self._create_missing(Enrollment, enrollments_data, ('student', 'course'))
+
+    def seed_submissions(self, submissions_data):
+        """Create missing submissions; rows are Submission field dicts"""
+        return self._create_missing(Submission, submissions_data, ('student', 'assignment'))
+
+    def _create_missing(self, model, rows, key_fields):
+        """bulk_create rows whose unique key is not in the table yet"""
+        if not rows:
+            return 0
+        student_ids = {row['student'].pk for row in rows}
+        key_columns = [f'{field}_id' for field in key_fields]
+        existing = set(model.objects.filter(student_id__in=student_ids).values_list(*key_columns))
+        new_rows = [
+            model(**row) for row in rows
+            if tuple(row[field].pk for field in key_fields) not in existing
+        ]
+        model.objects.bulk_create(new_rows, batch_size=self.batch_size, ignore_conflicts=True)
+        name = model._meta.verbose_name_plural.capitalize()
+        self.log(f'{name}: {len(new_rows)} created, {len(rows) - len(new_rows)} already existed')
+        return len(new_rows)
+
+
+class LoadDataGenerator:
+    """
+    Deterministic synthetic dataset for load testing.
+
+    scale is the number of students. Each student enrolls in
+    courses_per_student courses and submits every assignment of those
+    courses, so the defaults give 50 submissions per student
+    (100,000 students -> 5,000,000 submissions). The same seed always
+    produces the same data. Students are written in chunks; a student that
+    already exists is skipped together with their enrollments and
+    submissions, which were written in the same transaction.
+    """
+
+    PREFIX = 'loadtest'
+    TERM = 'Load Test'
+    PASSWORD = 'training123'
+
+    def __init__(self, scale, courses_per_student=5, modules_per_course=2,
+                 assignments_per_module=5, seed=0, batch_size=BATCH_SIZE, log=None):
+        self.scale = scale
+        self.courses_per_student = courses_per_student
+        self.modules_per_course = modules_per_course
+        self.assignments_per_module = assignments_per_module
+        self.seed = seed
+        self.batch_size = batch_size
+        self.log = log or (lambda message: None)
+        self.seeder = Seeder(batch_size=batch_size)
+
+    @property
+    def course_count(self):
+        return max(self.courses_per_student * 2, self.scale // 250)
+
+    @property
+    def instructor_count(self):
+        return max(1, self.course_count // 4)
+
+    def generate(self):
+        """Write the whole dataset and return a summary of row counts"""
+        instructors = self.seeder.seed_users([
+            self._user_row(f'{self.PREFIX}_instructor_{number:05d}', 'instructor')
+            for number in range(self.instructor_count)
+        ])
+        instructor_list = [instructors[username] for username in sorted(instructors)]
+        courses = self._seed_catalog(instructor_list)
+        assignments_by_course = {}
+        for assignment in Assignment.objects.filter(module__course__in=courses).select_related('module'):
+            assignments_by_course.setdefault(assignment.module.course_id, []).append(assignment)
+
+        created_students = 0
+        for start in range(0, self.scale, self.batch_size):
+            numbers = range(start, min(start + self.batch_size, self.scale))
+            created_students += self._seed_student_chunk(numbers, courses, assignments_by_course)
+            self.log(f'Students {numbers.stop}/{self.scale} written')
+
+        return {
+            'students': self.scale,
+            'students_created': created_students,
+            'instructors': len(instructor_list),
+            'courses': len(courses),
+            'assignments': sum(len(items) for items in assignments_by_course.values()),
+        }
+
+    def _user_row(self, username, role):
+        first, _, last = username.partition('_')
+        return {
+            'username': username,
+            'email': f'{username}@example.com',
+            'first_name': first.title(),
+            'last_name': last.replace('_', ' ').title(),
+            'role': role,
+            'phone': '',
+            'password': self.PASSWORD,
+        }
+
+    def _seed_catalog(self, instructors):
+        """Courses, modules and assignments shared by all synthetic students"""
+        courses = self.seeder.seed_courses(
+            [
+                {
+                    'course_code': f'LT{number:05d}',
+                    'course_name': f'Load Test Course {number}',
+                    'description': 'Synthetic course for load testing.',
+                    'credits': 1 + number % 4,
+                    'max_enrollment': self.scale,
+                    'instructor': instructors[number % len(instructors)],
+                }
+                for number in range(self.course_count)
+            ],
+            term=self.TERM,
+            instructor=instructors[0],
+        )
+        modules = self.seeder.seed_modules([
+            {
+                'course': course,
+                'order_number': order,
+                'module_name': f'Module {order}',
+                'description': 'Synthetic module',
+                'content': '',
+            }
+            for course in courses for order in range(1, self.modules_per_course + 1)
+        ])
+        types = [choice[0] for choice in Assignment.ASSIGNMENT_TYPES]
+        due_date = timezone.now() + timedelta(days=14)
+        self.seeder.seed_assignments([
+            {
+                'module': module,
+                'assignment_name': f'{module.course.course_code} M{module.order_number} A{number}',
+                'description': 'Synthetic assignment',
+                'due_date': due_date,
+                'max_points': 100,
+                'assignment_type': types[number % len(types)],
+                'instructions': '',
+            }
+            for module in modules for number in range(1, self.assignments_per_module + 1)
+        ])
+        return courses
+
+    def _seed_student_chunk(self, numbers, courses, assignments_by_course):
+        """Write one chunk of students with their enrollments and submissions"""
+        usernames = [f'{self.PREFIX}_student_{number:07d}' for number in numbers]
+        existing = set(User.objects.filter(username__in=usernames).values_list('username', flat=True))
+        new_numbers = [n for n, username in zip(numbers, usernames) if username not in existing]
+        if not new_numbers:
+            return 0
+
+        password = self.seeder.hash_password(self.PASSWORD)
+        new_usernames = [f'{self.PREFIX}_student_{number:07d}' for number in new_numbers]
+        User.objects.bulk_create(
+            [User(username=username, email=f'{username}@example.com', password=password)
+             for username in new_usernames],
+            batch_size=self.batch_size,
+        )
+        students = User.objects.in_bulk(new_usernames, field_name='username')
+        UserProfile.objects.bulk_create(
+            [UserProfile(user=students[username], role='student', first_name='Load',
+                         last_name=f'Student {number}')
+             for number, username in zip(new_numbers, new_usernames)],
+            batch_size=self.batch_size,
+        )
+
+        now = timezone.now()
+        enrollments, submissions = [], []
+        for number, username in zip(new_numbers, new_usernames):
+            student = students[username]
+            rng = random.Random(f'{self.seed}:{number}')  # per-student stream keeps data deterministic
+            for course in rng.sample(courses, min(self.courses_per_student, len(courses))):
+                enrollments.append(Enrollment(student=student, course=course))
+                for assignment in assignments_by_course.get(course.pk, []):
+                    status = rng.choices(['graded', 'submitted', 'late'], weights=[70, 25, 5])[0]
+                    graded = status == 'graded'
+                    submissions.append(Submission(
+                        student=student,
+                        assignment=assignment,
+                        submission_content='Synthetic submission',
+                        grade=Decimal(rng.randint(50, assignment.max_points)) if graded else None,
+                        graded_by_id=course.instructor_id if graded else None,
+                        graded_at=now if graded else None,
+                        status=status,
+                    ))
+        Enrollment.objects.bulk_create(enrollments, batch_size=self.batch_size, ignore_conflicts=True)
+        Submission.objects.bulk_create(submissions, batch_size=self.batch_size, ignore_conflicts=True)
+        return len(new_numbers)
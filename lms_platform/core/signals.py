@@ -0,0 +1,216 @@
+"""
+Signal handlers for the core app.
+Connected in CoreConfig.ready().
+"""
+from django.core.files import File
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save, pre_delete, pre_save
+
+from .counters import TRACKED_MODELS, adjust_counters, counter_keys_for
+from .gradebook import recompute_for_assignment, recompute_for_submission
+from .images import build_variants, delete_variants
+from .models import Assignment, Enrollment, Submission, UserProfile
+from .roles import bump_profile_version
+from .stats import invalidate_student
+from .transcript import bump_transcript_versions
+
+
+# Fields counter_keys_for() reads
+COUNTER_FIELDS = {'role', 'status'}
+
+
+def saves_counter_fields(update_fields):
+    return update_fields is None or bool(COUNTER_FIELDS & set(update_fields))
+
+
+def remember_counter_keys(sender, instance, **kwargs):
+    """Remember which counters a loaded row belongs to so later saves can diff them"""
+    if instance.pk and instance.get_deferred_fields() & COUNTER_FIELDS:
+        return  # reading a deferred role/status here would cost a query per row; see load_counter_keys()
+    instance._counter_keys = counter_keys_for(instance) if instance.pk else []
+
+
+def load_counter_keys(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Read the stored role/status of a row loaded without it, before the save or delete changes it"""
+    if raw or instance.pk is None or hasattr(instance, '_counter_keys') or not saves_counter_fields(update_fields):
+        return
+    fields = [field.attname for field in sender._meta.concrete_fields if field.name in COUNTER_FIELDS]
+    stored = sender._base_manager.filter(pk=instance.pk).only(*fields).first()
+    instance._counter_keys = counter_keys_for(stored) if stored is not None else []
+
+
+def update_counters_on_save(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    """Keep dashboard counters in step with creates and role/status changes"""
+    if raw or not saves_counter_fields(update_fields):  # loaddata, or role/status not written
+        return
+    new_keys = counter_keys_for(instance)
+    if created:
+        adjust_counters(increments=new_keys)
+    else:
+        adjust_counters(increments=new_keys, decrements=instance._counter_keys)
+    instance._counter_keys = new_keys
+
+
+def update_counters_on_delete(sender, instance, **kwargs):
+    """Decrement dashboard counters for deleted rows (including cascades)"""
+    adjust_counters(decrements=instance._counter_keys)
+
+
+for model in TRACKED_MODELS:
+    post_init.connect(remember_counter_keys, sender=model, dispatch_uid=f'counters_init_{model.__name__}')
+    pre_save.connect(load_counter_keys, sender=model, dispatch_uid=f'counters_pre_save_{model.__name__}')
+    pre_delete.connect(load_counter_keys, sender=model, dispatch_uid=f'counters_pre_delete_{model.__name__}')
+    post_save.connect(update_counters_on_save, sender=model, dispatch_uid=f'counters_save_{model.__name__}')
+    post_delete.connect(update_counters_on_delete, sender=model, dispatch_uid=f'counters_delete_{model.__name__}')
+
+
+def invalidate_student_stats(sender, instance, **kwargs):
+    """Drop the student's cached dashboard totals when a submission changes"""
+    invalidate_student(instance.student_id)
+
+
+post_save.connect(invalidate_student_stats, sender=Submission, dispatch_uid='stats_submission_save')
+post_delete.connect(invalidate_student_stats, sender=Submission, dispatch_uid='stats_submission_delete')
+
+
+def remember_grade(sender, instance, **kwargs):
+    """Remember the loaded grade so saves that don't change it skip the recompute"""
+    instance._loaded_grade = instance.__dict__.get('grade')
+
+
+def update_grade_on_save(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    """Recompute the enrollment's course grade when a submission's grade changes"""
+    if raw or 'grade' not in instance.__dict__:
+        return
+    if update_fields is not None and 'grade' not in update_fields:
+        return
+    previous = None if created else getattr(instance, '_loaded_grade', None)
+    if instance.grade != previous:
+        recompute_for_submission(instance)
+    instance._loaded_grade = instance.grade
+
+
+def update_grade_on_delete(sender, instance, **kwargs):
+    """Drop a deleted submission's points from the course grade"""
+    if instance.__dict__.get('grade') is not None:
+        recompute_for_submission(instance)
+
+
+post_init.connect(remember_grade, sender=Submission, dispatch_uid='gradebook_submission_init')
+post_save.connect(update_grade_on_save, sender=Submission, dispatch_uid='gradebook_submission_save')
+post_delete.connect(update_grade_on_delete, sender=Submission, dispatch_uid='gradebook_submission_delete')
+
+
+def remember_max_points(sender, instance, **kwargs):
+    """Remember the loaded max_points so only real changes trigger a course rebuild"""
+    instance._loaded_max_points = instance.__dict__.get('max_points')
+
+
+def update_grades_on_max_points_change(sender, instance, created, raw=False, **kwargs):
+    """Changing an assignment's max_points rescales every grade in its course"""
+    if raw or created or 'max_points' not in instance.__dict__:
+        return
+    previous = getattr(instance, '_loaded_max_points', None)
+    if previous is not None and previous != instance.max_points:
+        recompute_for_assignment(instance)
+    instance._loaded_max_points = instance.max_points
+
+
+post_init.connect(remember_max_points, sender=Assignment, dispatch_uid='gradebook_assignment_init')
+post_save.connect(update_grades_on_max_points_change, sender=Assignment, dispatch_uid='gradebook_assignment_save')
+
+
+def invalidate_session_profiles(sender, instance, **kwargs):
+    """Force sessions to reload the user's role after a profile change"""
+    bump_profile_version(instance.user_id)
+
+
+post_save.connect(invalidate_session_profiles, sender=UserProfile, dispatch_uid='roles_profile_save')
+post_delete.connect(invalidate_session_profiles, sender=UserProfile, dispatch_uid='roles_profile_delete')
+
+
+def invalidate_transcript(sender, instance, **kwargs):
+    """Any enrollment change may alter the student's transcript"""
+    bump_transcript_versions([instance.student_id])
+
+
+post_save.connect(invalidate_transcript, sender=Enrollment, dispatch_uid='transcript_enrollment_save')
+post_delete.connect(invalidate_transcript, sender=Enrollment, dispatch_uid='transcript_enrollment_delete')
+
+
+def remember_file(sender, instance, **kwargs):
+    """Remember the loaded file name so a replaced upload releases its blob"""
+    value = instance.__dict__.get('file_upload')
+    instance._loaded_file = getattr(value, 'name', value)
+
+
+def note_new_file(sender, instance, raw=False, **kwargs):
+    """Note whether this save stores a newly assigned file (the field stores it after this signal)"""
+    value = instance.__dict__.get('file_upload')
+    instance._storing_file = isinstance(value, File) and not getattr(value, '_committed', False)
+
+
+def release_replaced_file(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    """Drop the reference to the previous file when a submission's upload changes"""
+    storing = getattr(instance, '_storing_file', False)
+    instance._storing_file = False
+    if raw or 'file_upload' not in instance.__dict__:
+        return
+    if update_fields is not None and 'file_upload' not in update_fields:
+        return
+    previous = None if created else getattr(instance, '_loaded_file', None)
+    # Re-uploading identical content yields the same name but still took a new reference
+    if previous and (previous != instance.file_upload.name or storing):
+        instance.file_upload.storage.release(previous)
+    instance._loaded_file = instance.file_upload.name
+
+
+def release_deleted_file(sender, instance, **kwargs):
+    """Drop a deleted submission's reference to its stored file"""
+    name = getattr(instance, '_loaded_file', None)
+    if name:
+        instance.file_upload.storage.release(name)
+
+
+post_init.connect(remember_file, sender=Submission, dispatch_uid='storage_submission_init')
+pre_save.connect(note_new_file, sender=Submission, dispatch_uid='storage_submission_pre_save')
+post_save.connect(release_replaced_file, sender=Submission, dispatch_uid='storage_submission_save')
+post_delete.connect(release_deleted_file, sender=Submission, dispatch_uid='storage_submission_delete')
+
+
+def remember_picture(sender, instance, **kwargs):
+    """Remember the loaded profile picture so a new upload can be detected"""
+    value = instance.__dict__.get('profile_picture')
+    instance._loaded_picture = getattr(value, 'name', value) or ''
+
+
+def reset_picture_variants(sender, instance, raw=False, **kwargs):
+    """A new picture starts without variants until they have been built"""
+    if raw or 'profile_picture' not in instance.__dict__:
+        return
+    value = instance.__dict__['profile_picture']
+    replaced = isinstance(value, File) and not getattr(value, '_committed', False)
+    if replaced or (getattr(value, 'name', value) or '') != getattr(instance, '_loaded_picture', ''):
+        instance.picture_variants = []
+
+
+def build_picture_variants(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    """Resize a newly uploaded profile picture once the upload has committed"""
+    if raw or 'profile_picture' not in instance.__dict__:
+        return
+    if update_fields is not None and 'profile_picture' not in update_fields:
+        return
+    previous = getattr(instance, '_loaded_picture', '')
+    current = instance.profile_picture.name or ''
+    if current == previous and not created:
+        return
+    if previous and previous != current:
+        transaction.on_commit(lambda: delete_variants(previous))
+    if current:
+        transaction.on_commit(lambda: build_variants(instance))
+    instance._loaded_picture = current
+
+
+post_init.connect(remember_picture, sender=UserProfile, dispatch_uid='images_profile_init')
+pre_save.connect(reset_picture_variants, sender=UserProfile, dispatch_uid='images_profile_pre_save')
+post_save.connect(build_picture_variants, sender=UserProfile, dispatch_uid='images_profile_save')
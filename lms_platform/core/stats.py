@@ -0,0 +1,96 @@
+"""
+Grouped aggregate statistics shared by the admin and student dashboards.
+
+Each breakdown is a single GROUP BY query per model (role, enrollment
+status, submission status) instead of one COUNT per value. Results are
+cached for LMS_STATS_CACHE_TIMEOUT seconds; pass use_cache=False when an
+exact, fresh value is required (e.g. counter reconciliation).
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, F, FloatField, Q, Sum
+from django.db.models.functions import Cast
+from django.utils import timezone
+
+from .models import UserProfile, Enrollment, Submission
+
+
+CACHE_PREFIX = 'lms:stats'
+
+
+def _cached(key, compute, use_cache=True):
+    """Return a cached statistic, computing and storing it on a miss"""
+    if not use_cache:
+        return compute()
+    cache_key = f'{CACHE_PREFIX}:{key}'
+    value = cache.get(cache_key)
+    if value is None:
+        value = compute()
+        cache.set(cache_key, value, settings.LMS_STATS_CACHE_TIMEOUT)
+    return value
+
+
+def _breakdown(queryset, field):
+    """Count rows per value of field with one GROUP BY"""
+    rows = queryset.order_by().values(field).annotate(count=Count('id'))
+    return {row[field]: row['count'] for row in rows}
+
+
+def role_breakdown(use_cache=True):
+    """Number of UserProfiles per role, e.g. {'student': 120, 'instructor': 4}"""
+    return _cached('roles', lambda: _breakdown(UserProfile.objects.all(), 'role'), use_cache)
+
+
+def enrollment_status_breakdown(use_cache=True):
+    """Number of enrollments per status"""
+    return _cached('enrollment_status', lambda: _breakdown(Enrollment.objects.all(), 'status'), use_cache)
+
+
+def submission_status_breakdown(use_cache=True):
+    """Number of submissions per status"""
+    return _cached('submission_status', lambda: _breakdown(Submission.objects.all(), 'status'), use_cache)
+
+
+def recent_activity(days=7, use_cache=True):
+    """Enrollments and submissions created in the last `days` days"""
+    def compute():
+        since = timezone.now() - timedelta(days=days)
+        return {
+            'recent_enrollments': Enrollment.objects.filter(enrollment_date__gte=since).count(),
+            'recent_submissions': Submission.objects.filter(submission_date__gte=since).count(),
+        }
+    return _cached(f'activity:{days}', compute, use_cache)
+
+
+def student_submission_summary(student, use_cache=True):
+    """
+    Per-status submission counts and summed grade percentage for one student.
+    One GROUP BY status query; cached per student and invalidated by the
+    Submission signal handlers via invalidate_student().
+    """
+    def compute():
+        rows = (
+            Submission.objects.filter(student=student)
+            .order_by()
+            .values('status')
+            .annotate(
+                count=Count('id'),
+                grade_points=Sum(
+                    Cast('grade', FloatField()) * 100.0 / F('assignment__max_points'),
+                    filter=Q(grade__isnull=False),
+                    output_field=FloatField(),
+                ),
+            )
+        )
+        return {
+            'by_status': {row['status']: row['count'] for row in rows},
+            'grade_points': {row['status']: row['grade_points'] or 0 for row in rows},
+        }
+    return _cached(f'student:{student.pk}:submissions', compute, use_cache)
+
+
+def invalidate_student(student_id):
+    """Drop cached per-student statistics after their submissions change"""
+    cache.delete(f'{CACHE_PREFIX}:student:{student_id}:submissions')
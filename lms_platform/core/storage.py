@@ -0,0 +1,222 @@
+"""
+Content-addressed, deduplicated file storage.
+
+Files are named after the SHA-256 of their content
+(submissions/ab/cd/abcd...ef.pdf), so the same handout uploaded by a
+whole cohort is kept on disk once. Uploads are streamed in CHUNK_SIZE
+pieces into a staging file inside MEDIA_ROOT while they are hashed; when
+the blob already exists the staged copy is dropped, otherwise it is
+renamed into place (same filesystem, so no second write). Uploads Django
+already spooled to a temporary file are only read to hash them and are
+moved into place only when the blob is new; files that carry a verified
+`sha256` attribute (completed chunked uploads) are not hashed again.
+
+Every stored name has a StoredBlob row counting the model rows that
+reference it. delete()/release() decrement the count and the file is
+removed once the transaction that dropped the last reference commits.
+Submission deletes and file replacements release their blob through
+signals (core/signals.py); reconcile_blobs() recounts references from
+the database to correct drift from bulk operations.
+
+Writing a blob and deleting it both happen under a lock on its StoredBlob
+row: _save() creates and locks the row before checking for the file, and
+the last release leaves the row at zero references until the file is
+unlinked under the same lock. An upload racing the deletion of identical
+content therefore either keeps the file alive or writes it again, never
+ends up referencing a file that is about to disappear. A transaction that
+rolls back after _save() leaves a file without a row; reconcile_blobs()
+removes such files once they are older than ORPHAN_GRACE.
+"""
+import hashlib
+import os
+import posixpath
+import re
+import tempfile
+import time
+from datetime import timedelta
+
+from django.core.files.move import file_move_safe
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.db.models import Count, F
+from django.utils.deconstruct import deconstructible
+
+
+# Bytes read per chunk while hashing and staging uploads
+CHUNK_SIZE = 64 * 1024
+
+# Staging area for uploads being hashed, relative to the storage location
+STAGING_DIR = '.staging'
+
+# Longest file extension kept on blob names (keeps names within max_length)
+MAX_EXTENSION_LENGTH = 10
+
+# <sha256><extension>, the file names blob_name() produces
+BLOB_FILENAME = re.compile(r'^[0-9a-f]{64}(\.[^.]*)?$')
+
+# Files without a StoredBlob row younger than this may belong to an upload
+# whose transaction has not committed yet, so reconcile_blobs() keeps them
+ORPHAN_GRACE = timedelta(hours=1)
+
+
+@deconstructible(path='lms_platform.core.storage.ContentAddressedStorage')
+class ContentAddressedStorage(FileSystemStorage):
+    """FileSystemStorage that stores each distinct file content once"""
+
+    def get_available_name(self, name, max_length=None):
+        # The final name comes from the content in _save(); identical names are the point
+        return name
+
+    def blob_name(self, name, digest):
+        """submissions/report.PDF + digest -> submissions/ab/cd/<digest>.pdf"""
+        extension = os.path.splitext(name)[1].lower()
+        if len(extension) > MAX_EXTENSION_LENGTH:
+            extension = ''
+        return posixpath.join(posixpath.dirname(name), digest[:2], digest[2:4], digest + extension)
+
+    def _stage(self, content):
+        """Copy an upload into the staging area while hashing it: (path, digest, size)"""
+        staging = self.path(STAGING_DIR)
+        os.makedirs(staging, exist_ok=True)
+        sha256, size = hashlib.sha256(), 0
+        with tempfile.NamedTemporaryFile(dir=staging, delete=False) as staged:
+            try:
+                for chunk in content.chunks(CHUNK_SIZE):
+                    if isinstance(chunk, str):
+                        chunk = chunk.encode()
+                    sha256.update(chunk)
+                    staged.write(chunk)
+                    size += len(chunk)
+            except BaseException:
+                staged.close()
+                os.unlink(staged.name)
+                raise
+        return staged.name, sha256.hexdigest(), size
+
+    def _save(self, name, content):
+        from .models import StoredBlob  # models.py imports this module for the field
+
+        if getattr(content, 'sha256', None) and hasattr(content, 'temporary_file_path'):
+            # Already on disk and verified by the caller (e.g. a chunked upload)
+            staged, digest, size = None, content.sha256, content.size
+        elif hasattr(content, 'temporary_file_path'):
+            # Already on disk: hash it in place and move it only if the blob is new
+            staged = None
+            sha256, size = hashlib.sha256(), 0
+            for chunk in content.chunks(CHUNK_SIZE):
+                sha256.update(chunk)
+                size += len(chunk)
+            digest = sha256.hexdigest()
+        else:
+            staged, digest, size = self._stage(content)
+
+        name = self.blob_name(name, digest)
+        path = self.path(name)
+        try:
+            with transaction.atomic():
+                # Held until the caller's transaction ends; _delete_unreferenced() takes it too
+                blob = StoredBlob.lock(name, digest, size)
+                if not os.path.exists(path):
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    if staged:
+                        os.replace(staged, path)
+                        staged = None
+                    else:
+                        file_move_safe(content.temporary_file_path(), path, allow_overwrite=True)
+                    if self.file_permissions_mode is not None:
+                        os.chmod(path, self.file_permissions_mode)
+                blob.acquire()
+        finally:
+            if staged:
+                os.unlink(staged)
+        return name
+
+    def release(self, name):
+        """
+        Drop one reference to a stored blob; the file is deleted after the
+        last reference's transaction commits. Names without a StoredBlob
+        row (files stored before deduplication) are left alone.
+        """
+        from .models import StoredBlob
+
+        with transaction.atomic():
+            blob = StoredBlob.objects.select_for_update().filter(name=name).first()
+            if blob is None:
+                return False
+            if not blob.ref_count:
+                return True  # already released, deletion pending
+            StoredBlob.objects.filter(pk=blob.pk).update(ref_count=F('ref_count') - 1)
+            if blob.ref_count == 1:
+                transaction.on_commit(lambda: self._delete_unreferenced(name))
+        return True
+
+    def delete(self, name):
+        if not name:
+            raise ValueError('The name must be given to delete().')
+        if not self.release(name):
+            super().delete(name)
+
+    def _delete_unreferenced(self, name):
+        from .models import StoredBlob
+
+        with transaction.atomic():
+            # A new upload of the same content may have re-acquired it meanwhile
+            blob = StoredBlob.objects.select_for_update().filter(name=name, ref_count=0).first()
+            if blob is not None:
+                super().delete(name)
+                blob.delete()
+
+
+submission_storage = ContentAddressedStorage()
+
+
+def get_submission_storage():
+    """Storage for Submission.file_upload (a callable keeps it out of migrations)"""
+    return submission_storage
+
+
+def reconcile_blobs(grace=ORPHAN_GRACE):
+    """
+    Recount StoredBlob references from Submission.file_upload, delete blobs
+    nothing references any more, delete blob files older than `grace` that
+    have no row (left by rolled-back uploads) and return
+    {name: (stored, actual)} for every count that drifted.
+    """
+    from .models import StoredBlob, Submission
+
+    actual = dict(
+        Submission.objects.exclude(file_upload='').exclude(file_upload__isnull=True)
+        .order_by().values_list('file_upload').annotate(references=Count('id'))
+    )
+    drift = {}
+    with transaction.atomic():
+        for blob in StoredBlob.objects.select_for_update().iterator():
+            references = actual.get(blob.name, 0)
+            if references == blob.ref_count and references:
+                continue
+            drift[blob.name] = (blob.ref_count, references)
+            StoredBlob.objects.filter(pk=blob.pk).update(ref_count=references)
+            if not references:
+                transaction.on_commit(lambda name=blob.name: submission_storage._delete_unreferenced(name))
+
+    tracked = set(StoredBlob.objects.values_list('name', flat=True)) | set(actual)
+    for name in blob_files(Submission._meta.get_field('file_upload').upload_to.strip('/')):
+        if name in tracked:
+            continue
+        try:
+            age = time.time() - os.path.getmtime(submission_storage.path(name))
+        except FileNotFoundError:
+            continue
+        if age > grace.total_seconds() and not StoredBlob.objects.filter(name=name).exists():
+            submission_storage.delete(name)
+            drift[name] = (0, 0)
+    return drift
+
+
+def blob_files(directory):
+    """Storage names of the content-addressed files under a directory"""
+    for dirpath, _, filenames in os.walk(submission_storage.path(directory)):
+        for filename in filenames:
+            if BLOB_FILENAME.match(filename):
+                relative = os.path.relpath(os.path.join(dirpath, filename), submission_storage.location)
+                yield relative.replace(os.sep, '/')
@@ -0,0 +1,49 @@
+"""
+Profile picture tags that serve a resized variant instead of the original.
+
+    {% load avatars %}
+    {% avatar profile 40 %}          <img> with 1x/2x variants
+    {% avatar_url profile 160 %}     just the URL
+
+`profile` is a UserProfile or the session summary (request.lms_profile).
+"""
+from django import template
+from django.utils.html import format_html
+
+from lms_platform.core.images import pick_variant, variant_name
+from lms_platform.core.models import UserProfile
+
+
+register = template.Library()
+
+
+def _picture(profile):
+    """(stored name, built variants) of a UserProfile or profile summary dict"""
+    if not profile:
+        return '', []
+    if isinstance(profile, dict):
+        return profile.get('profile_picture') or '', profile.get('picture_variants') or []
+    return profile.profile_picture.name or '', profile.picture_variants or []
+
+
+@register.simple_tag
+def avatar_url(profile, size=64):
+    """URL of the smallest variant at least `size` pixels wide; the original until variants exist"""
+    name, variants = _picture(profile)
+    if not name:
+        return ''
+    variant = pick_variant(variants, int(size))
+    storage = UserProfile._meta.get_field('profile_picture').storage
+    return storage.url(variant_name(name, variant) if variant else name)
+
+
+@register.simple_tag
+def avatar(profile, size=64, css_class='avatar'):
+    """A `size` pixel <img> with a 2x source for high-density screens ('' without a picture)"""
+    url = avatar_url(profile, size)
+    if not url:
+        return ''
+    return format_html(
+        '<img src="{}" srcset="{} 1x, {} 2x" width="{}" height="{}" alt="" class="{}" loading="lazy">',
+        url, url, avatar_url(profile, int(size) * 2), size, size, css_class,
+    )
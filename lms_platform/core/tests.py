@@ -0,0 +1,1600 @@
+import csv
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+from datetime import timedelta
+from decimal import Decimal
+from io import BytesIO, StringIO
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.management import CommandError, call_command
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile, TemporaryUploadedFile
+from django.db import connection, connections, transaction
+from django.template import Context, Template
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .benchmarks import benchmark_gradebook, find_regressions, run_scale
+from .counters import compute_counters, get_counters, reconcile_counters
+from .dashboard import build_student_dashboard
+from .exports import export_lines
+from .finalization import finalize_term
+from .grading_queue import LeaseLost, claim_next, complete, queue_metrics, release
+from .imports import import_grades
+from .images import AVATAR_VARIANTS, build_variants, render_variants, variant_name
+from .gradebook import (
+    compute_course_grades, gpa_points_for, recompute_course, vectorized_course_grades, weighted_grade,
+)
+from .paginators import EstimatedCountPaginator, estimate_row_count
+from .seeding import LoadDataGenerator
+from .storage import reconcile_blobs, submission_storage
+from .transcript import build_transcript, get_transcript
+from .uploads import part_path, purge_expired_uploads
+from .stats import role_breakdown, submission_status_breakdown
+from .models import (
+    UserProfile, Course, Module, Assignment, Enrollment, Submission, JobCheckpoint, StoredBlob, UploadSession,
+)
+
+
+def create_user(username, role):
+    """Create a user with a matching UserProfile"""
+    user = User.objects.create_user(username=username, password='training123')
+    UserProfile.objects.create(user=user, role=role, first_name=username.title(), last_name='Test')
+    return user
+
+
+def create_course(code, instructor, assignments=2):
+    """Create a course with one module and a few assignments"""
+    course = Course.objects.create(
+        course_code=code,
+        course_name=f'{code} Course',
+        description='Test course',
+        credits=3,
+        term='Q1 2025',
+        instructor=instructor,
+        max_enrollment=100,
+    )
+    module = Module.objects.create(
+        course=course, module_name='Module 1', description='', order_number=1, content=''
+    )
+    for number in range(assignments):
+        Assignment.objects.create(
+            module=module,
+            assignment_name=f'{code} Assignment {number}',
+            description='',
+            due_date=timezone.now() + timedelta(days=7),
+            max_points=100,
+            assignment_type='homework',
+            instructions='',
+        )
+    return course
+
+
+class StudentDashboardQueryTests(TestCase):
+    """The dashboard read model must cost the same number of queries for any course load"""
+
+    def setUp(self):
+        cache.clear()
+        self.instructor = create_user('trainer', 'instructor')
+        self.student = create_user('employee', 'student')
+
+    def enroll_in_new_courses(self, count):
+        start = Course.objects.count()
+        for number in range(start, start + count):
+            course = create_course(f'C{number:03d}', self.instructor)
+            Enrollment.objects.create(student=self.student, course=course)
+            assignment = course.modules.first().assignments.first()
+            Submission.objects.create(
+                student=self.student, assignment=assignment, grade=90, status='graded'
+            )
+
+    def count_dashboard_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            build_student_dashboard(self.student)
+        return len(queries)
+
+    def test_query_count_is_constant_as_enrollments_grow(self):
+        self.enroll_in_new_courses(1)
+        baseline = self.count_dashboard_queries()
+        self.enroll_in_new_courses(10)
+        self.assertEqual(self.count_dashboard_queries(), baseline)
+        self.assertLessEqual(baseline, 5)
+
+    def test_context_contents(self):
+        self.enroll_in_new_courses(3)
+        context = build_student_dashboard(self.student)
+        self.assertEqual(context['total_courses'], 3)
+        self.assertEqual(context['total_submissions'], 3)
+        self.assertEqual(context['graded_submissions'], 3)
+        self.assertEqual(context['total_grade_points'], 270)
+        self.assertEqual(context['enrollments'][0].instructor_name, 'Trainer Test')
+
+    def test_recent_assignments_carry_own_submission(self):
+        self.enroll_in_new_courses(1)
+        other = create_user('colleague', 'student')
+        assignment = Assignment.objects.first()
+        Enrollment.objects.create(student=other, course=assignment.module.course)
+        Submission.objects.filter(student=self.student).delete()
+        # Another student's submission must not leak into this student's status column
+        Submission.objects.create(student=other, assignment=assignment, status='graded')
+        context = build_student_dashboard(self.student)
+        self.assertTrue(context['recent_assignments'])
+        for item in context['recent_assignments']:
+            self.assertIsNone(item.student_submission)
+
+    def test_dashboard_view_query_count_is_constant(self):
+        self.client.force_login(self.student)
+        self.client.get(reverse('student_dashboard'))  # caches the profile in the session
+        self.enroll_in_new_courses(1)
+        with CaptureQueriesContext(connection) as baseline:
+            self.client.get(reverse('student_dashboard'))
+        self.enroll_in_new_courses(10)
+        with CaptureQueriesContext(connection) as grown:
+            self.client.get(reverse('student_dashboard'))
+        self.assertEqual(len(grown), len(baseline))
+
+    def test_dashboard_view_renders(self):
+        self.enroll_in_new_courses(2)
+        self.client.force_login(self.student)
+        response = self.client.get(reverse('student_dashboard'))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'C000')
+
+
+class DashboardCounterTests(TestCase):
+    """Signal-maintained counters must match a full recount"""
+
+    def setUp(self):
+        get_counters()  # seed the counter rows
+        self.instructor = create_user('trainer', 'instructor')
+        self.student = create_user('employee', 'student')
+        self.course = create_course('SAFE101', self.instructor)
+
+    def test_counters_follow_creates_status_changes_and_deletes(self):
+        enrollment = Enrollment.objects.create(student=self.student, course=self.course)
+        submission = Submission.objects.create(
+            student=self.student, assignment=Assignment.objects.first()
+        )
+        self.assertEqual(get_counters(), compute_counters())
+
+        submission = Submission.objects.get(pk=submission.pk)
+        submission.status = 'graded'
+        submission.save()
+        enrollment.status = 'completed'
+        enrollment.save()
+        counters = get_counters()
+        self.assertEqual(counters['graded_submissions'], 1)
+        self.assertEqual(counters['pending_submissions'], 0)
+        self.assertEqual(counters['active_enrollments'], 0)
+        self.assertEqual(counters, compute_counters())
+
+        # Cascades from the course delete fire post_delete per row
+        self.course.delete()
+        self.assertEqual(get_counters(), compute_counters())
+
+    def test_rows_loaded_without_their_status_still_count_transitions(self):
+        submission = Submission.objects.create(student=self.student, assignment=Assignment.objects.first())
+        deferred = Submission.objects.only('id').get(pk=submission.pk)
+        deferred.status = 'graded'
+        deferred.save()
+        counters = get_counters()
+        self.assertEqual((counters['pending_submissions'], counters['graded_submissions']), (0, 1))
+        self.assertEqual(counters, compute_counters())
+
+        # Saves that don't write the status leave the counters alone
+        deferred = Submission.objects.defer('status').get(pk=submission.pk)
+        deferred.feedback = 'Nice'
+        deferred.save(update_fields=['feedback'])
+        self.assertEqual(get_counters(), compute_counters())
+
+        profile = UserProfile.objects.only('id').get(user=self.student)
+        profile.role = 'instructor'
+        profile.save()
+        self.assertEqual(get_counters(), compute_counters())
+
+        Submission.objects.defer('status').get(pk=submission.pk).delete()
+        self.assertEqual(get_counters(), compute_counters())
+
+    def test_reconcile_fixes_drift_from_bulk_updates(self):
+        Enrollment.objects.create(student=self.student, course=self.course)
+        Enrollment.objects.update(status='dropped')  # bypasses signals
+        self.assertEqual(reconcile_counters(), {'active_enrollments': (1, 0)})
+        self.assertEqual(get_counters(), compute_counters())
+
+
+class DashboardStatsTests(TestCase):
+    """Grouped aggregates back both dashboards"""
+
+    def setUp(self):
+        cache.clear()
+        self.instructor = create_user('trainer', 'instructor')
+        self.student = create_user('employee', 'student')
+        self.course = create_course('SAFE101', self.instructor)
+
+    def test_breakdowns_use_one_query_and_cache(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(role_breakdown(), {'instructor': 1, 'student': 1})
+        with self.assertNumQueries(0):
+            role_breakdown()
+
+    def test_student_totals_refresh_after_submission(self):
+        self.assertEqual(build_student_dashboard(self.student)['total_submissions'], 0)
+        Submission.objects.create(student=self.student, assignment=Assignment.objects.first())
+        self.assertEqual(build_student_dashboard(self.student)['total_submissions'], 1)
+        self.assertEqual(submission_status_breakdown(use_cache=False), {'submitted': 1})
+
+    def test_admin_index_renders_from_counters_and_stats(self):
+        admin_user = User.objects.create_superuser('root', 'root@example.com', 'pw')
+        self.client.force_login(admin_user)
+        self.client.get(reverse('admin:index'))  # seeds counters and warms the cache
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('admin:index'))
+        self.assertContains(response, 'Total Users')
+        self.assertEqual(response.context['students_count'], 1)
+        self.assertLessEqual(len(queries), 4)
+
+
+class RoleResolutionTests(TestCase):
+    """Role checks are served from the session until the profile changes"""
+
+    def setUp(self):
+        cache.clear()
+        self.student = create_user('employee', 'student')
+
+    def login_student(self):
+        response = self.client.post(
+            reverse('student_login'), {'username': 'employee', 'password': 'training123'}
+        )
+        self.assertRedirects(response, reverse('student_dashboard'), fetch_redirect_response=False)
+
+    def profile_queries(self, queries):
+        return [q for q in queries if q["sql"].startswith('SELECT "core_userprofile"')]
+
+    def test_dashboard_skips_profile_query_after_login(self):
+        self.login_student()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('student_dashboard'))
+        self.assertContains(response, 'Welcome back, Employee!')
+        self.assertEqual(self.profile_queries(queries), [])
+
+    def test_profile_change_invalidates_session_role(self):
+        self.login_student()
+        profile = self.student.userprofile
+        profile.role = 'instructor'
+        profile.save()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('student_dashboard'))
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(len(self.profile_queries(queries)), 1)
+
+    def test_cold_cache_keeps_sessions_valid(self):
+        self.login_student()
+        stamp = self.client.session['lms_profile_version']
+        # Another worker process, or a restarted cache, derives the same stamp
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('student_dashboard'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(self.profile_queries(queries)), 1)
+        self.assertEqual(self.client.session['lms_profile_version'], stamp)
+        self.assertFalse([q for q in queries.captured_queries if q['sql'].startswith('UPDATE "django_session"')])
+
+    def test_user_without_profile_is_forbidden(self):
+        user = User.objects.create_user(username='nobody', password='pw')
+        self.client.force_login(user)
+        self.assertEqual(self.client.get(reverse('student_dashboard')).status_code, 403)
+
+
+class AdminUserFieldTests(TestCase):
+    """Student/instructor pickers in the admin must not load every user"""
+
+    def setUp(self):
+        self.admin_user = User.objects.create_superuser('root', 'root@example.com', 'pw')
+        self.instructor = create_user('trainer', 'instructor')
+        for number in range(3):
+            create_user(f'employee{number}', 'student')
+        create_user('emp_trainer', 'instructor')
+        self.client.force_login(self.admin_user)
+
+    def test_enrollment_form_uses_autocomplete_for_students(self):
+        response = self.client.get(reverse('admin:core_enrollment_add'))
+        self.assertContains(response, 'data-ajax--url')
+        self.assertNotContains(response, '>employee1<')
+
+    def test_student_autocomplete_filters_role_and_prefix(self):
+        response = self.client.get(reverse('admin:autocomplete'), {
+            'app_label': 'core', 'model_name': 'enrollment', 'field_name': 'student', 'term': 'emp',
+        })
+        usernames = [result['text'] for result in response.json()['results']]
+        self.assertEqual(usernames, ['employee0', 'employee1', 'employee2'])
+
+    def test_course_autocomplete_is_prefix_search_and_paginated(self):
+        for number in range(25):
+            create_course(f'SAFE{number:03d}', self.instructor, assignments=0)
+        create_course('COMP201', self.instructor, assignments=0)
+        params = {'app_label': 'core', 'model_name': 'enrollment', 'field_name': 'course', 'term': 'safe'}
+        first_page = self.client.get(reverse('admin:autocomplete'), params).json()
+        self.assertEqual(len(first_page['results']), 20)
+        self.assertTrue(first_page['pagination']['more'])
+        self.assertTrue(first_page['results'][0]['text'].startswith('SAFE000'))
+        second_page = self.client.get(reverse('admin:autocomplete'), {**params, 'page': 2}).json()
+        self.assertEqual(len(second_page['results']), 5)
+        self.assertFalse(second_page['pagination']['more'])
+
+    def test_autocomplete_prefix_ignores_case(self):
+        course = create_course('CASE101', self.instructor, assignments=0)
+        for number, name in enumerate(('Intro to Safety', 'INTERMEDIATE Safety', 'Advanced Safety')):
+            Module.objects.create(course=course, module_name=name, order_number=number + 10)
+        params = {'app_label': 'core', 'model_name': 'assignment', 'field_name': 'module'}
+        for term in ('int', 'INT', 'iNt'):
+            with CaptureQueriesContext(connection) as queries:
+                results = self.client.get(reverse('admin:autocomplete'), {**params, 'term': term}).json()['results']
+            self.assertEqual([result['text'] for result in results], [
+                'CASE101 - INTERMEDIATE Safety', 'CASE101 - Intro to Safety',
+            ], term)
+            self.assertTrue([q for q in queries if 'UPPER("core_module"."module_name") LIKE' in q['sql']])
+        # Course codes are not normalised on save, so a lowercase code must still match
+        create_course('math101', self.instructor, assignments=0)
+        for term in ('MATH', 'math'):
+            with CaptureQueriesContext(connection) as queries:
+                courses = self.client.get(reverse('admin:autocomplete'), {
+                    'app_label': 'core', 'model_name': 'enrollment', 'field_name': 'course', 'term': term,
+                }).json()['results']
+            self.assertEqual([course['text'][:7] for course in courses], ['math101'], term)
+            self.assertTrue([q for q in queries if 'UPPER("core_course"."course_code") LIKE' in q['sql']])
+        users = self.client.get(reverse('admin:autocomplete'), {
+            'app_label': 'core', 'model_name': 'enrollment', 'field_name': 'student', 'term': 'EMP',
+        }).json()['results']
+        self.assertEqual(len(users), 3)
+
+    def test_enrollment_form_renders_no_course_options(self):
+        create_course('SAFE101', self.instructor, assignments=0)
+        response = self.client.get(reverse('admin:core_enrollment_add'))
+        self.assertNotContains(response, 'SAFE101')
+
+    def test_instructor_choices_are_a_single_join(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('admin:core_course_add'))
+        choices = [label for _, label in response.context['adminform'].form.fields['instructor'].choices]
+        self.assertCountEqual(choices[1:], ['emp_trainer', 'trainer'])
+        # No separate profile scan and no giant id__in list
+        self.assertFalse([q for q in queries if 'FROM "core_userprofile" WHERE "core_userprofile"."role"' in q['sql']])
+        self.assertFalse([q for q in queries if '"auth_user"."id" IN (' in q['sql']])
+
+
+class AdminChangelistQueryTests(TestCase):
+    """Every LMS changelist renders a 100-row page in a bounded number of queries"""
+
+    ROWS = 100
+    MAX_QUERIES = 8
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin_user = User.objects.create_superuser('root', 'root@example.com', 'pw')
+        instructor = create_user('trainer', 'instructor')
+        users = User.objects.bulk_create(
+            [User(username=f'employee{number:03d}') for number in range(cls.ROWS)]
+        )
+        UserProfile.objects.bulk_create(
+            [UserProfile(user=user, role='student', first_name='E', last_name='T') for user in users]
+        )
+        courses = Course.objects.bulk_create([
+            Course(course_code=f'C{number:03d}', course_name='Course', description='', credits=1,
+                   term='Q1 2025', instructor=instructor, max_enrollment=10)
+            for number in range(cls.ROWS)
+        ])
+        modules = Module.objects.bulk_create([
+            Module(course=course, module_name='Module 1', description='', order_number=1, content='')
+            for course in courses
+        ])
+        assignments = Assignment.objects.bulk_create([
+            Assignment(module=module, assignment_name='Quiz', description='', due_date=timezone.now(),
+                       max_points=100, assignment_type='quiz', instructions='')
+            for module in modules
+        ])
+        Enrollment.objects.bulk_create(
+            [Enrollment(student=user, course=course) for user, course in zip(users, courses)]
+        )
+        Submission.objects.bulk_create([
+            Submission(student=user, assignment=assignment, graded_by=instructor, grade=80, status='graded')
+            for user, assignment in zip(users, assignments)
+        ])
+
+    def test_changelists_have_bounded_query_counts(self):
+        self.client.force_login(self.admin_user)
+        for model in (UserProfile, Course, Module, Assignment, Enrollment, Submission, User):
+            url = reverse(f'admin:{model._meta.app_label}_{model._meta.model_name}_changelist')
+            self.client.get(url)  # warm session and per-user caches
+            with self.subTest(model=model.__name__):
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertGreaterEqual(len(response.context['cl'].result_list), self.ROWS)
+                self.assertLessEqual(len(queries), self.MAX_QUERIES)
+
+
+class EstimatedCountPaginatorTests(TestCase):
+    """Estimated counts only apply where the planner can provide them"""
+
+    def test_falls_back_to_exact_count(self):
+        create_user('employee', 'student')
+        queryset = UserProfile.objects.order_by('id')
+        if connection.vendor != 'postgresql':
+            self.assertIsNone(estimate_row_count(queryset))
+        self.assertIsNone(estimate_row_count(queryset.filter(role='student')))
+        self.assertEqual(EstimatedCountPaginator(queryset, 10).count, 1)
+
+    def postgres_estimate(self, reltuples):
+        """Pretend to be PostgreSQL with a pg_class.reltuples of `reltuples`"""
+        database = connections['default']
+        cursor = mock.MagicMock()
+        cursor.__enter__.return_value.fetchone.return_value = (reltuples,)
+        vendor = mock.patch.object(database, 'vendor', 'postgresql')
+        return vendor, mock.patch.object(database, 'cursor', return_value=cursor), cursor
+
+    def test_uses_planner_estimate_for_large_unfiltered_tables(self):
+        queryset = UserProfile.objects.order_by('id')
+        vendor, cursor_patch, cursor = self.postgres_estimate(250000)
+        with vendor, cursor_patch:
+            self.assertEqual(estimate_row_count(queryset), 250000)
+            self.assertEqual(EstimatedCountPaginator(queryset, 10).count, 250000)
+        sql, params = cursor.__enter__.return_value.execute.call_args[0]
+        self.assertIn('pg_class', sql)
+        self.assertEqual(params, ['"core_userprofile"'])
+
+    def test_filtered_and_unanalyzed_querysets_skip_the_estimate(self):
+        queryset = UserProfile.objects.order_by('id')
+        vendor, cursor_patch, cursor = self.postgres_estimate(250000)
+        with vendor, cursor_patch:
+            self.assertIsNone(estimate_row_count(queryset.filter(role='student')))
+            self.assertIsNone(estimate_row_count(queryset.distinct()))
+            self.assertIsNone(estimate_row_count(queryset[:5]))
+        cursor.__enter__.return_value.execute.assert_not_called()
+        vendor, cursor_patch, _ = self.postgres_estimate(-1)
+        with vendor, cursor_patch:
+            self.assertIsNone(estimate_row_count(queryset))
+
+    def test_small_estimates_get_an_exact_count(self):
+        create_user('employee', 'student')
+        with mock.patch('lms_platform.core.paginators.estimate_row_count', return_value=50):
+            self.assertEqual(EstimatedCountPaginator(UserProfile.objects.order_by('id'), 10).count, 1)
+
+
+class SeedingTests(TestCase):
+    """setup_production is bulk, idempotent and keeps counters accurate"""
+
+    def run_setup(self, *args):
+        call_command('setup_production', *args, stdout=StringIO())
+
+    def test_setup_production_is_idempotent(self):
+        self.run_setup('--scale', '20')
+        counts = [model.objects.count() for model in (User, Course, Assignment, Enrollment, Submission)]
+        self.run_setup('--scale', '20')
+        self.assertEqual(
+            [model.objects.count() for model in (User, Course, Assignment, Enrollment, Submission)], counts
+        )
+        self.assertEqual(get_counters(), compute_counters())
+        self.assertTrue(User.objects.get(username='demo_employee').check_password('training123'))
+
+    def test_load_data_is_deterministic(self):
+        LoadDataGenerator(scale=10, seed=7).generate()
+        first = list(Submission.objects.order_by('student__username', 'assignment__assignment_name')
+                     .values_list('status', 'grade'))
+        Submission.objects.all().delete()
+        User.objects.filter(username__startswith='loadtest_student').delete()
+        LoadDataGenerator(scale=10, seed=7).generate()
+        second = list(Submission.objects.order_by('student__username', 'assignment__assignment_name')
+                      .values_list('status', 'grade'))
+        self.assertEqual(first, second)
+        self.assertEqual(len(first), 10 * 5 * 10)
+
+
+class BenchmarkSuiteTests(TestCase):
+    """The benchmark suite runs end to end and every hot path stays within its query budget"""
+
+    def test_hot_paths_within_query_budgets(self):
+        cache.clear()
+        result = run_scale(20, repeat=1)
+        self.assertIn('student_dashboard', result['results'])
+        self.assertIn('admin_changelist_submission', result['results'])
+        for target, measurement in result['results'].items():
+            with self.subTest(target=target):
+                self.assertLess(measurement['status'], 400)
+                self.assertTrue(measurement['within_budget'], measurement)
+        self.assertEqual(find_regressions({'scales': {'tiny': result}}, baseline=None), [])
+
+
+class QueryInstrumentationTests(TestCase):
+    """Staff can opt in to per-request query stats"""
+
+    def setUp(self):
+        self.admin_user = User.objects.create_superuser('root', 'root@example.com', 'pw')
+        self.student = create_user('employee', 'student')
+
+    def test_staff_opt_in_adds_server_timing_and_log(self):
+        self.client.force_login(self.admin_user)
+        with self.assertLogs('lms_platform.queries', level='INFO') as logs:
+            response = self.client.get(reverse('admin:index'), {'_lms_queries': '1'})
+        self.assertRegex(response['Server-Timing'], r'db;dur=[0-9.]+;desc="\d+ queries"')
+        self.assertIn('sql-1;dur=', response['Server-Timing'])
+        self.assertIn('"query_count"', logs.output[0])
+
+    def test_not_reported_without_opt_in_or_for_students(self):
+        self.client.force_login(self.student)
+        response = self.client.get(reverse('student_dashboard'), {'_lms_queries': '1'})
+        self.assertFalse(response.has_header('Server-Timing'))
+        self.client.force_login(self.admin_user)
+        self.assertFalse(self.client.get(reverse('admin:index')).has_header('Server-Timing'))
+
+    @override_settings(LMS_QUERY_INSTRUMENTATION='all')
+    def test_sql_text_is_only_sent_to_staff(self):
+        with self.assertLogs('lms_platform.queries', level='INFO') as logs:
+            response = self.client.post(reverse('student_login'), {'username': 'nobody', 'password': 'x'})
+        self.assertIn('sql-1;dur=', response['Server-Timing'])
+        self.assertEqual(response['Server-Timing'].count('desc='), 1)  # only the db query count
+        self.assertIn('"sql"', logs.output[0])  # the log line keeps the statements
+        self.client.force_login(self.admin_user)
+        with self.assertLogs('lms_platform.queries', level='INFO'):
+            response = self.client.get(reverse('admin:index'))
+        self.assertRegex(response['Server-Timing'], r'sql-1;dur=[0-9.]+;desc="')
+
+
+    def test_streamed_responses_get_no_server_timing(self):
+        course = create_course('STR101', create_user('trainer', 'instructor'), assignments=0)
+        enrollment = Enrollment.objects.create(student=self.student, course=course)
+        self.client.force_login(self.admin_user)
+        with self.assertLogs('lms_platform.queries', level='INFO') as logs:
+            response = self.client.post(
+                reverse('admin:core_enrollment_changelist'),
+                {'action': 'export_csv', '_selected_action': [enrollment.pk]},
+                headers={'X-LMS-Query-Stats': '1'},
+            )
+        self.assertTrue(response.streaming)
+        self.assertFalse(response.has_header('Server-Timing'))
+        self.assertIn('"streamed": true', logs.output[0])
+
+
+class ExplainHotQueriesTests(TestCase):
+    """The hot-query report explains every access path migration 0008 indexes"""
+
+    def test_every_hot_query_gets_a_plan(self):
+        from .grading_queue import pending_submissions
+        from .management.commands.explain_hot_queries import Command
+
+        student = create_user('employee', 'student')
+        course = create_course('EXP101', create_user('trainer', 'instructor'), assignments=2)
+        Enrollment.objects.create(student=student, course=course)
+        for assignment in Assignment.objects.filter(module__course=course):
+            Submission.objects.create(student=student, assignment=assignment)
+        out = StringIO()
+        call_command('explain_hot_queries', stdout=out)
+        report = out.getvalue()
+
+        sections = [section.strip() for section in report.split('\n\n')]
+        for label, _ in Command().hot_queries(student):
+            section = next((section for section in sections if section.startswith(label)), None)
+            self.assertIsNotNone(section, label)
+            self.assertGreater(len(section.splitlines()), 2, label)  # label, plan line(s), verdict
+        self.assertIn('hot queries use a full table scan', report)
+        if connection.vendor == 'sqlite':
+            queue = next(section for section in sections if section.startswith('Grading queue'))
+            self.assertIn('core_sub_pending_idx', queue)
+
+        # The partial index only helps if its condition is exactly the queue's filter
+        index = next(index for index in Submission._meta.indexes if index.name == 'core_sub_pending_idx')
+        self.assertEqual(str(Submission.objects.filter(index.condition).query), str(pending_submissions().query))
+
+
+class GradebookTests(TestCase):
+    """Course grades are weighted by assignment type and kept current on Enrollment"""
+
+    def setUp(self):
+        self.instructor = create_user('teacher', 'instructor')
+        self.student = create_user('employee', 'student')
+        self.course = create_course('GRD101', self.instructor, assignments=2)
+        self.homework = list(Assignment.objects.filter(module__course=self.course))
+        self.exam = Assignment.objects.create(
+            module=self.homework[0].module,
+            assignment_name='GRD101 Final',
+            description='',
+            due_date=timezone.now(),
+            max_points=50,
+            assignment_type='exam',
+            instructions='',
+        )
+        self.enrollment = Enrollment.objects.create(student=self.student, course=self.course)
+
+    def grade(self, assignment, points):
+        return Submission.objects.create(
+            student=self.student, assignment=assignment, status='graded', grade=points
+        )
+
+    def test_weighted_grade_rescales_missing_types(self):
+        weights = {'homework': 20, 'exam': 35}
+        self.assertEqual(weighted_grade({'homework': (90, 100)}, weights), Decimal('90.00'))
+        self.assertEqual(weighted_grade({'homework': (90, 100), 'exam': (35, 50)}, weights), Decimal('77.27'))
+        self.assertIsNone(weighted_grade({}, weights))
+        self.assertEqual(gpa_points_for(Decimal('93')), Decimal('4.00'))
+        self.assertEqual(gpa_points_for(Decimal('59.99')), Decimal('0.00'))
+
+    def test_grading_a_submission_updates_the_enrollment(self):
+        self.grade(self.homework[0], 80)
+        submission = self.grade(self.homework[1], 100)
+        self.enrollment.refresh_from_db()
+        self.assertEqual(self.enrollment.current_grade, Decimal('90.00'))
+        self.assertEqual(self.enrollment.gpa_points, Decimal('3.70'))
+
+        self.grade(self.exam, 25)
+        self.enrollment.refresh_from_db()
+        self.assertEqual(self.enrollment.current_grade, Decimal('64.55'))
+
+        Submission.objects.filter(assignment=self.exam).get().delete()
+        submission.delete()
+        self.enrollment.refresh_from_db()
+        self.assertEqual(self.enrollment.current_grade, Decimal('80.00'))
+
+    def test_ungraded_saves_skip_the_recompute(self):
+        submission = self.grade(self.homework[0], 80)
+        submission.feedback = 'Nice work'
+        with CaptureQueriesContext(connection) as queries:
+            submission.save()
+        self.assertFalse(any('core_enrollment' in query['sql'] for query in queries))
+
+    def test_recompute_course_uses_constant_queries(self):
+        students = [self.student] + [create_user(f'learner{n}', 'student') for n in range(5)]
+        for student in students[1:]:
+            Enrollment.objects.create(student=student, course=self.course)
+        Submission.objects.bulk_create([
+            Submission(student=student, assignment=assignment, status='graded', grade=70 + n)
+            for n, student in enumerate(students)
+            for assignment in self.homework
+        ])
+        with self.assertNumQueries(3):
+            self.assertEqual(recompute_course(self.course), len(students))
+        grades = dict(Enrollment.objects.filter(course=self.course).values_list('student__username', 'current_grade'))
+        self.assertEqual(grades['employee'], Decimal('70.00'))
+        self.assertEqual(grades['learner4'], Decimal('75.00'))
+
+    def test_recompute_grades_command(self):
+        Submission.objects.bulk_create([Submission(student=self.student, assignment=self.exam, status='graded', grade=45)])
+        out = StringIO()
+        call_command('recompute_grades', '--course', 'GRD101', stdout=out)
+        self.assertIn('1 enrollment(s)', out.getvalue())
+        self.enrollment.refresh_from_db()
+        self.assertEqual(self.enrollment.current_grade, Decimal('90.00'))
+
+
+class VectorizedGradebookTests(TestCase):
+    """The NumPy recompute path agrees with the SQL path and handles max_points changes"""
+
+    def setUp(self):
+        self.course = create_course('VEC101', create_user('teacher', 'instructor'), assignments=0)
+        module = self.course.modules.get()
+        self.assignments = [
+            Assignment.objects.create(
+                module=module,
+                assignment_name=f'VEC101 {assignment_type}',
+                description='',
+                due_date=timezone.now(),
+                max_points=max_points,
+                assignment_type=assignment_type,
+                instructions='',
+            )
+            for assignment_type, max_points in [('homework', 10), ('quiz', 20), ('exam', 50), ('project', 40)]
+        ]
+        self.students = [create_user(f'learner{n}', 'student') for n in range(6)]
+        Enrollment.objects.bulk_create([Enrollment(student=student, course=self.course) for student in self.students])
+        Submission.objects.bulk_create([
+            Submission(student=student, assignment=assignment, status='graded',
+                       grade=assignment.max_points * (50 + 5 * n + 7 * index) // 100)
+            for n, student in enumerate(self.students)
+            for index, assignment in enumerate(self.assignments[:n % 4 + 1])
+        ])
+
+    def test_matches_sql_path(self):
+        self.assertEqual(vectorized_course_grades(self.course.pk), compute_course_grades(self.course.pk))
+
+    def test_max_points_change_recomputes_course(self):
+        recompute_course(self.course)
+        homework = self.assignments[0]
+        homework.max_points = 20
+        homework.save()
+        grades = dict(Enrollment.objects.filter(course=self.course).values_list('student_id', 'current_grade'))
+        expected = {student_id: grade for student_id, (grade, _) in compute_course_grades(self.course.pk).items()}
+        self.assertEqual(grades, expected)
+        self.assertEqual(grades[self.students[0].pk], Decimal('25.00'))
+
+    def test_benchmark_paths_agree(self):
+        report = benchmark_gradebook(students=30, assignments=4)
+        results = report['results']
+        self.assertEqual({result['enrollments_updated'] for result in results.values()}, {30})
+        self.assertLess(results['numpy']['queries'], results['naive']['queries'])
+
+
+class FinalizeTermTests(TestCase):
+    """Term finalization runs in checkpointed batches and can resume"""
+
+    def setUp(self):
+        instructor = create_user('teacher', 'instructor')
+        self.course = create_course('FIN101', instructor, assignments=0)
+        other = create_course('FIN201', instructor, assignments=0)
+        Course.objects.filter(pk=other.pk).update(term='Q2 2025')
+        grades = [Decimal('95'), Decimal('88.5'), Decimal('61'), None, Decimal('40')]
+        for number, grade in enumerate(grades):
+            student = create_user(f'learner{number}', 'student')
+            Enrollment.objects.create(student=student, course=self.course, current_grade=grade)
+            Enrollment.objects.create(student=student, course=other, current_grade=grade)
+        Enrollment.objects.filter(course=self.course, student__username='learner4').update(status='dropped')
+        get_counters()
+
+    def test_finalizes_active_enrollments_of_the_term(self):
+        checkpoint = finalize_term('Q1 2025', batch_size=2)
+        self.assertEqual(checkpoint.processed, 4)
+        self.assertIsNotNone(checkpoint.completed_at)
+        rows = dict(Enrollment.objects.filter(course=self.course).values_list('student__username', 'gpa_points'))
+        self.assertEqual(rows, {
+            'learner0': Decimal('4.00'), 'learner1': Decimal('3.30'), 'learner2': Decimal('0.70'),
+            'learner3': None, 'learner4': None,
+        })
+        self.assertEqual(
+            set(Enrollment.objects.filter(course=self.course).values_list('status', flat=True)),
+            {'completed', 'dropped'},
+        )
+        self.assertFalse(Enrollment.objects.filter(course__term='Q2 2025').exclude(status='active').exists())
+        self.assertEqual(
+            Enrollment.objects.get(course=self.course, student__username='learner1').final_grade, Decimal('88.5')
+        )
+        self.assertEqual(get_counters(), compute_counters())
+
+    def test_resumes_after_interruption(self):
+        with mock.patch('lms_platform.core.finalization.adjust_counter', side_effect=[None, RuntimeError]):
+            with self.assertRaises(RuntimeError):
+                finalize_term('Q1 2025', batch_size=2)
+        checkpoint = JobCheckpoint.objects.get(job_name='finalize_term:Q1 2025')
+        self.assertEqual(checkpoint.processed, 2)
+        self.assertIsNone(checkpoint.completed_at)
+        self.assertEqual(Enrollment.objects.filter(course=self.course, status='completed').count(), 2)
+
+        out = StringIO()
+        call_command('finalize_term', 'Q1 2025', '--batch-size', '2', stdout=out)
+        self.assertIn('Resuming after enrollment', out.getvalue())
+        self.assertIn('4 enrollment(s) completed', out.getvalue())
+        self.assertFalse(Enrollment.objects.filter(course=self.course, status='active').exists())
+
+
+class TranscriptTests(TestCase):
+    """Transcripts weight GPA by credits and are cached until enrollments change"""
+
+    def setUp(self):
+        cache.clear()
+        instructor = create_user('teacher', 'instructor')
+        self.student = create_user('employee', 'student')
+        rows = [('TR101', 'Q1 2025', 3, '95.00', '4.00'), ('TR102', 'Q1 2025', 1, '72.00', '1.70'),
+                ('TR201', 'Q2 2025', 4, '84.00', '3.00'), ('TR202', 'Q2 2025', 2, None, None)]
+        for code, term, credits, final_grade, gpa_points in rows:
+            course = create_course(code, instructor, assignments=0)
+            Course.objects.filter(pk=course.pk).update(term=term, credits=credits)
+            Enrollment.objects.create(
+                student=self.student, course=course, status='completed',
+                final_grade=final_grade, gpa_points=gpa_points,
+            )
+        active = create_course('TR301', instructor, assignments=0)
+        Enrollment.objects.create(student=self.student, course=active, current_grade=50, gpa_points='0.00')
+
+    def test_term_and_cumulative_gpa(self):
+        with self.assertNumQueries(2):
+            transcript = build_transcript(self.student.pk)
+        terms = {term['term']: term for term in transcript['terms']}
+        self.assertEqual(list(terms), ['Q1 2025', 'Q2 2025'])
+        self.assertEqual(terms['Q1 2025']['gpa'], Decimal('3.43'))  # (4.0*3 + 1.7*1) / 4
+        self.assertEqual(terms['Q2 2025']['gpa'], Decimal('3.00'))
+        self.assertEqual(len(terms['Q2 2025']['courses']), 2)
+        self.assertEqual(transcript['total_credits'], 8)
+        self.assertEqual(transcript['cumulative_gpa'], Decimal('3.21'))  # 25.7 / 8
+
+    def test_cached_until_enrollments_change(self):
+        get_transcript(self.student.pk)
+        with self.assertNumQueries(0):
+            get_transcript(self.student.pk)
+        enrollment = Enrollment.objects.get(course__course_code='TR102')
+        enrollment.gpa_points = Decimal('4.00')
+        enrollment.save()
+        self.assertEqual(get_transcript(self.student.pk)['cumulative_gpa'], Decimal('3.50'))
+
+    def test_transcript_page(self):
+        self.client.force_login(self.student)
+        response = self.client.get(reverse('student_transcript'))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'TR201')
+        self.assertContains(response, '3.21')
+        self.assertNotContains(response, 'TR301')
+
+
+class ExportTests(TestCase):
+    """Exports stream joined rows as CSV/JSONL from the admin and the command line"""
+
+    def setUp(self):
+        self.admin_user = User.objects.create_superuser('root', 'root@example.com', 'pw')
+        instructor = create_user('teacher', 'instructor')
+        self.course = create_course('EXP101', instructor, assignments=2)
+        other = create_course('EXP201', instructor, assignments=1)
+        for number in range(3):
+            student = create_user(f'learner{number}', 'student')
+            for course in (self.course, other):
+                Enrollment.objects.create(student=student, course=course, current_grade=80 + number)
+                for assignment in Assignment.objects.filter(module__course=course):
+                    Submission.objects.create(student=student, assignment=assignment, status='graded', grade=90)
+
+    def test_admin_action_streams_csv(self):
+        self.client.force_login(self.admin_user)
+        selected = Enrollment.objects.filter(course=self.course).values_list('pk', flat=True)
+        with self.assertNumQueries(1):
+            lines = list(export_lines('enrollments', Enrollment.objects.filter(pk__in=selected).order_by('-pk'), 'csv'))
+        response = self.client.post(reverse('admin:core_enrollment_changelist'), {
+            'action': 'export_csv',
+            '_selected_action': [str(pk) for pk in selected],
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertIn('attachment; filename="enrollments-', response['Content-Disposition'])
+        content = b''.join(response.streaming_content).decode()
+        self.assertEqual(content, ''.join(lines))
+        rows = list(csv.DictReader(content.splitlines()))
+        self.assertEqual(len(rows), 3)
+        self.assertEqual({row['course_code'] for row in rows}, {'EXP101'})
+        self.assertEqual(rows[0]['student'], 'learner2')  # changelist order
+
+    def test_command_exports_jsonl_for_a_term(self):
+        Course.objects.filter(course_code='EXP201').update(term='Q2 2025')
+        out = StringIO()
+        call_command('export_grades', 'submissions', '--format', 'jsonl', '--term', 'Q2 2025', stdout=out)
+        rows = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual(len(rows), 3)
+        self.assertEqual({row['course_code'] for row in rows}, {'EXP201'})
+        self.assertEqual(rows[0]['grade'], '90.00')
+
+
+class CSVImportTests(TestCase):
+    """CSV imports validate row by row and keep counters and grades in step"""
+
+    def setUp(self):
+        self.admin_user = User.objects.create_superuser('root', 'root@example.com', 'pw')
+        self.instructor = create_user('teacher', 'instructor')
+        self.course = create_course('IMP101', self.instructor, assignments=2)
+        create_course('IMP201', self.instructor, assignments=0)
+        self.students = [create_user(f'learner{n}', 'student') for n in range(3)]
+        Enrollment.objects.create(student=self.students[0], course=self.course)
+        get_counters()
+
+    def test_admin_upload_enrolls_students(self):
+        self.client.force_login(self.admin_user)
+        upload = SimpleUploadedFile('cohort.csv', (
+            'username,course_code,term\n'
+            'learner0,IMP101,Q1 2025\n'   # already enrolled
+            'learner1,imp101,Q1 2025\n'
+            'learner1,IMP201,\n'
+            'learner2,IMP201,Q2 2025\n'   # wrong term
+            'nobody,IMP101,Q1 2025\n'
+            'teacher,IMP101,Q1 2025\n'    # not a student
+            'learner2,IMP999,Q1 2025\n'
+        ).encode())
+        url = reverse('admin:core_enrollment_import')
+        with self.assertNumQueries(14):  # constant: one lookup query per map, not per row
+            response = self.client.post(url, {'file': upload})
+        self.assertEqual(response.status_code, 200)
+        report = response.context['report']
+        self.assertEqual((report.rows, report.created, report.skipped), (7, 2, 1))
+        self.assertEqual([line for line, _ in report.errors], [5, 6, 7, 8])
+        self.assertContains(response, 'runs in &quot;Q1 2025&quot;')
+        self.assertEqual(Enrollment.objects.filter(student=self.students[1]).count(), 2)
+        self.assertEqual(get_counters(), compute_counters())
+
+    def test_import_needs_add_and_change_permission(self):
+        from .admin import EnrollmentAdmin
+
+        self.client.force_login(self.admin_user)
+        url = reverse('admin:core_enrollment_import')
+        upload = SimpleUploadedFile('cohort.csv', b'username,course_code\nlearner1,IMP101\n')
+        for permission in ('has_add_permission', 'has_change_permission'):
+            with mock.patch.object(EnrollmentAdmin, permission, return_value=False):
+                self.assertEqual(self.client.get(url).status_code, 403)
+                self.assertEqual(self.client.post(url, {'file': upload}).status_code, 403)
+        self.assertFalse(Enrollment.objects.filter(student=self.students[1]).exists())
+
+    def test_grades_import_updates_submissions_and_course_grade(self):
+        homework = list(Assignment.objects.filter(module__course=self.course).order_by('id'))
+        Submission.objects.create(student=self.students[0], assignment=homework[0])
+        get_counters()
+        out = StringIO()
+        path = self.write_csv(
+            'username,assignment,grade\n'
+            f'learner0,{homework[0].assignment_name},80\n'
+            f'learner0,{homework[1].assignment_name.lower()},90.5\n'
+            f'learner1,{homework[0].assignment_name},101\n'
+            f'learner1,{homework[1].assignment_name},abc\n'
+            'learner1,No Such Assignment,50\n'
+        )
+        call_command('import_csv', 'grades', path, '--graded-by', 'teacher', stdout=out)
+        self.assertIn('5 row(s) read: 1 created, 1 updated, 0 skipped, 3 error(s)', out.getvalue())
+        self.assertIn('Line 4: Grade 101 is outside 0-100', out.getvalue())
+        graded = Submission.objects.get(student=self.students[0], assignment=homework[0])
+        self.assertEqual((graded.status, graded.grade, graded.graded_by), ('graded', Decimal('80.00'), self.instructor))
+        enrollment = Enrollment.objects.get(student=self.students[0], course=self.course)
+        self.assertEqual(enrollment.current_grade, Decimal('85.25'))
+        self.assertEqual(get_counters(), compute_counters())
+
+    def test_missing_columns_are_rejected(self):
+        with self.assertRaisesMessage(ValueError, 'Missing column(s): grade'):
+            import_grades(StringIO('username,assignment\nlearner0,x\n'))
+
+    def test_malformed_files_fail_the_import_cleanly(self):
+        latin1 = 'username,course_code,term\nlearner1,IMP101,\nlearnér2,IMP201,\n'.encode('latin-1')
+        self.client.force_login(self.admin_user)
+        response = self.client.post(reverse('admin:core_enrollment_import'), {
+            'file': SimpleUploadedFile('cohort.csv', latin1),
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('not UTF-8', response.context['form'].errors['file'][0])
+        self.assertFalse(Enrollment.objects.filter(student=self.students[1]).exists())
+
+        path = self.write_csv('')
+        with open(path, 'wb') as handle:
+            handle.write(latin1)
+        with self.assertRaisesMessage(CommandError, 'not UTF-8'):
+            call_command('import_csv', 'enrollments', path, stdout=StringIO())
+        path = self.write_csv('username,course_code,term\nlearner1,"' + 'x' * 200000 + '",\n')
+        with self.assertRaisesMessage(CommandError, 'malformed CSV'):
+            call_command('import_csv', 'enrollments', path, stdout=StringIO())
+
+    def write_csv(self, content):
+        handle = tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False)
+        with handle:
+            handle.write(content)
+        self.addCleanup(os.remove, handle.name)
+        return handle.name
+
+
+class BulkGradingTests(TestCase):
+    """Instructors grade an assignment's pending submissions in one POST"""
+
+    def setUp(self):
+        self.admin_user = User.objects.create_superuser('root', 'root@example.com', 'pw')
+        self.course = create_course('BLK101', create_user('teacher', 'instructor'), assignments=1)
+        self.assignment = Assignment.objects.get(module__course=self.course)
+        self.students = [create_user(f'learner{n}', 'student') for n in range(4)]
+        for student in self.students:
+            Enrollment.objects.create(student=student, course=self.course)
+            Submission.objects.create(student=student, assignment=self.assignment, submission_content='Answer')
+        self.submissions = list(Submission.objects.filter(assignment=self.assignment).order_by('submission_date'))
+        get_counters()
+        self.client.force_login(self.admin_user)
+        self.url = reverse('admin:core_submission_bulk_grade') + f'?assignment={self.assignment.pk}'
+
+    def post(self, grades):
+        data = {'form-TOTAL_FORMS': len(grades), 'form-INITIAL_FORMS': len(grades)}
+        for index, (submission, grade) in enumerate(zip(self.submissions, grades)):
+            data.update({
+                f'form-{index}-submission': submission.pk,
+                f'form-{index}-grade': grade,
+                f'form-{index}-feedback': f'Feedback {index}',
+            })
+        return self.client.post(self.url, data)
+
+    def test_picker_and_grading_screen(self):
+        response = self.client.get(reverse('admin:core_submission_bulk_grade'))
+        self.assertContains(response, 'BLK101')
+        self.assertEqual(response.context['assignments'][0]['pending'], 4)
+        response = self.client.get(self.url)
+        self.assertEqual(len(response.context['rows']), 4)
+        self.assertContains(response, 'learner3')
+
+    def test_grades_are_saved_in_bulk(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.post(['90', '70.5', '', '100'])
+        self.assertRedirects(response, self.url, fetch_redirect_response=False)
+        self.assertEqual(sum(query['sql'].startswith('UPDATE "core_submission"') for query in queries), 1)
+        graded = {s.student.username: s for s in Submission.objects.filter(status='graded').select_related('student')}
+        self.assertEqual(sorted(graded), ['learner0', 'learner1', 'learner3'])
+        self.assertEqual(graded['learner1'].grade, Decimal('70.50'))
+        self.assertEqual(graded['learner1'].feedback, 'Feedback 1')
+        self.assertEqual(graded['learner1'].graded_by, self.admin_user)
+        self.assertIsNotNone(graded['learner1'].graded_at)
+        self.assertEqual(Enrollment.objects.get(student=self.students[3]).current_grade, Decimal('100.00'))
+        self.assertEqual(get_counters(), compute_counters())
+
+    def test_grades_above_max_points_are_rejected(self):
+        response = self.post(['90', '101', '', ''])
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context['formset'].errors[1])
+        self.assertFalse(Submission.objects.filter(status='graded').exists())
+
+
+class GradingQueueTests(TestCase):
+    """Graders claim distinct pending submissions under a lease"""
+
+    def setUp(self):
+        self.graders = [User.objects.create_superuser(f'grader{n}', f'grader{n}@example.com', 'pw') for n in range(2)]
+        self.course = create_course('QUE101', create_user('teacher', 'instructor'), assignments=1)
+        self.assignment = Assignment.objects.get(module__course=self.course)
+        self.students = [create_user(f'queued{n}', 'student') for n in range(3)]
+        for student in self.students:
+            Enrollment.objects.create(student=student, course=self.course)
+            Submission.objects.create(student=student, assignment=self.assignment, submission_content='Answer')
+        get_counters()
+
+    def test_graders_claim_different_submissions(self):
+        first = claim_next(self.graders[0])
+        second = claim_next(self.graders[1])
+        self.assertNotEqual(first.pk, second.pk)
+        self.assertEqual(first.claimed_by, self.graders[0])
+        # Asking again renews the claim already held instead of taking another
+        self.assertEqual(claim_next(self.graders[0]).pk, first.pk)
+        self.assertEqual(Submission.objects.filter(claimed_by__isnull=False).count(), 2)
+
+    def test_skip_moves_the_claim(self):
+        first = claim_next(self.graders[0])
+        second = claim_next(self.graders[0], exclude=[first.pk])
+        self.assertNotEqual(first.pk, second.pk)
+        self.assertEqual(list(Submission.objects.filter(claimed_by=self.graders[0]).values_list('pk', flat=True)), [second.pk])
+
+    def test_empty_queue(self):
+        for grader in self.graders + [self.students[0]]:
+            claim_next(grader)
+        self.assertIsNone(claim_next(User.objects.create_user('late', password='pw')))
+
+    def test_expired_lease_can_be_reclaimed(self):
+        first = claim_next(self.graders[0], assignment_id=self.assignment.pk)
+        Submission.objects.filter(pk=first.pk).update(claimed_until=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(queue_metrics()['expired_claims'], 1)
+        taken = claim_next(self.graders[1])
+        self.assertEqual(taken.pk, first.pk)
+        with self.assertRaises(LeaseLost):
+            complete(first.pk, self.graders[0], Decimal('80'))
+        self.assertIsNone(Submission.objects.get(pk=first.pk).grade)
+
+    def test_complete_grades_and_keeps_bookkeeping(self):
+        submission = claim_next(self.graders[0])
+        complete(submission.pk, self.graders[0], Decimal('88'), 'Good')
+        submission.refresh_from_db()
+        self.assertEqual((submission.status, submission.grade, submission.claimed_by), ('graded', Decimal('88.00'), None))
+        self.assertEqual(Enrollment.objects.get(student=submission.student).current_grade, Decimal('88.00'))
+        self.assertEqual(get_counters(), compute_counters())
+        metrics = queue_metrics()
+        self.assertEqual((metrics['pending'], metrics['graded']), (2, 1))
+        self.assertEqual(metrics['graders'][0]['grader'], 'grader0')
+
+    def test_release(self):
+        submission = claim_next(self.graders[0])
+        self.assertFalse(release(submission.pk, self.graders[1]))
+        self.assertTrue(release(submission.pk, self.graders[0]))
+        self.assertEqual(claim_next(self.graders[1]).pk, submission.pk)
+
+    def test_admin_grade_next(self):
+        self.client.force_login(self.graders[0])
+        url = reverse('admin:core_submission_grade_next')
+        response = self.client.get(url)
+        submission = response.context['submission']
+        self.assertContains(response, submission.student.username)
+        response = self.client.post(url, {'submission': submission.pk, 'grade': '75', 'feedback': 'Ok'})
+        self.assertRedirects(response, url, fetch_redirect_response=False)
+        self.assertEqual(Submission.objects.get(pk=submission.pk).grade, Decimal('75.00'))
+        response = self.client.get(url)
+        self.assertNotEqual(response.context['submission'].pk, submission.pk)
+        self.assertEqual(response.context['metrics']['graded'], 1)
+        response = self.client.post(url, {'submission': response.context['submission'].pk, 'grade': '150'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context['form'].errors)
+
+    def test_demo_user_browses_the_queue_without_claiming(self):
+        demo = User.objects.create_user('PortfolioDemo', password='pw', is_staff=True)
+        self.client.force_login(demo)
+        url = reverse('admin:core_submission_grade_next')
+        response = self.client.get(url)
+        submission = response.context['submission']
+        self.assertIsNotNone(submission)
+        self.assertNotContains(response, 'Reserved for you')
+        self.client.post(url, {'submission': submission.pk, 'action': 'skip'})
+        self.client.post(url, {'submission': submission.pk, 'grade': '75'})
+        self.assertFalse(Submission.objects.filter(claimed_by__isnull=False).exists())
+        self.assertFalse(Submission.objects.filter(status='graded').exists())
+        # Real graders still get the oldest submission
+        self.assertEqual(claim_next(self.graders[0]).pk, submission.pk)
+
+    def test_admin_grade_next_rejects_bad_ids(self):
+        self.client.force_login(self.graders[0])
+        url = reverse('admin:core_submission_grade_next')
+        for data in ({}, {'submission': ''}, {'submission': 'abc', 'action': 'skip'}, {'submission': '1x', 'action': 'release'}):
+            self.assertEqual(self.client.post(url, data).status_code, 400, data)
+        self.assertEqual(self.client.get(url, {'assignment': 'abc'}).status_code, 400)
+
+    def test_admin_skip_of_the_last_submission_releases_it(self):
+        Submission.objects.exclude(pk=Submission.objects.order_by('pk').first().pk).update(status='graded')
+        self.client.force_login(self.graders[0])
+        url = reverse('admin:core_submission_grade_next')
+        submission = self.client.get(url).context['submission']
+        self.client.post(url, {'submission': submission.pk, 'action': 'skip'})
+        self.assertIsNone(Submission.objects.get(pk=submission.pk).claimed_by)
+
+
+class ContentAddressedStorageTests(TestCase):
+    """Identical submission files are stored once and reference counted"""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        course = create_course('CAS101', create_user('teacher', 'instructor'), assignments=1)
+        self.assignment = Assignment.objects.get(module__course=course)
+        self.students = [create_user(f'uploader{n}', 'student') for n in range(3)]
+
+    def submit(self, student, upload):
+        return Submission.objects.create(student=student, assignment=self.assignment, file_upload=upload)
+
+    def stored_files(self):
+        return sorted(
+            os.path.relpath(os.path.join(root, name), self.media_root)
+            for root, _, names in os.walk(self.media_root) for name in names
+        )
+
+    def test_identical_uploads_share_one_blob(self):
+        content = b'Group project handout' * 10000
+        digest = hashlib.sha256(content).hexdigest()
+        first = self.submit(self.students[0], SimpleUploadedFile('Handout.PDF', content))
+        second = self.submit(self.students[1], SimpleUploadedFile('copy.pdf', content))
+        other = self.submit(self.students[2], SimpleUploadedFile('other.pdf', b'different'))
+
+        self.assertEqual(first.file_upload.name, f'submissions/{digest[:2]}/{digest[2:4]}/{digest}.pdf')
+        self.assertEqual(second.file_upload.name, first.file_upload.name)
+        self.assertNotEqual(other.file_upload.name, first.file_upload.name)
+        self.assertEqual(len(self.stored_files()), 2)
+        blob = StoredBlob.objects.get(name=first.file_upload.name)
+        self.assertEqual((blob.sha256, blob.size, blob.ref_count), (digest, len(content), 2))
+        with submission_storage.open(first.file_upload.name) as stored:
+            self.assertEqual(stored.read(), content)
+
+    def test_file_is_deleted_with_its_last_reference(self):
+        content = b'shared'
+        first = self.submit(self.students[0], SimpleUploadedFile('a.txt', content))
+        second = self.submit(self.students[1], SimpleUploadedFile('b.txt', content))
+        name = first.file_upload.name
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertTrue(submission_storage.exists(name))
+        self.assertEqual(StoredBlob.objects.get(name=name).ref_count, 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            Submission.objects.filter(pk=second.pk).delete()
+        self.assertFalse(submission_storage.exists(name))
+        self.assertFalse(StoredBlob.objects.exists())
+
+    def test_replacing_a_file_releases_the_old_blob(self):
+        submission = self.submit(self.students[0], SimpleUploadedFile('draft.txt', b'draft'))
+        old_name = submission.file_upload.name
+        submission = Submission.objects.get(pk=submission.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            submission.file_upload = SimpleUploadedFile('final.txt', b'final')
+            submission.save()
+        self.assertFalse(submission_storage.exists(old_name))
+        self.assertEqual(list(StoredBlob.objects.values_list('name', flat=True)), [submission.file_upload.name])
+
+    def test_temporary_uploads_are_moved_only_when_new(self):
+        names = []
+        for student in self.students[:2]:
+            upload = TemporaryUploadedFile('big.bin', 'application/octet-stream', 0, None)
+            upload.write(b'x' * 200000)
+            upload.seek(0)
+            names.append(self.submit(student, upload).file_upload.name)
+            upload.close()
+        self.assertEqual(names[0], names[1])
+        self.assertEqual(self.stored_files(), [names[0]])
+
+    def test_reconcile_blobs(self):
+        submission = self.submit(self.students[0], SimpleUploadedFile('a.txt', b'content'))
+        orphan = self.submit(self.students[1], SimpleUploadedFile('b.txt', b'orphan'))
+        StoredBlob.objects.filter(name=submission.file_upload.name).update(ref_count=5)
+        Submission.objects.filter(pk=orphan.pk).update(file_upload='')
+        with self.captureOnCommitCallbacks(execute=True):
+            drift = reconcile_blobs()
+        self.assertEqual(drift, {submission.file_upload.name: (5, 1), orphan.file_upload.name: (1, 0)})
+        self.assertFalse(submission_storage.exists(orphan.file_upload.name))
+        self.assertEqual(reconcile_blobs(), {})
+
+    def test_reupload_during_pending_delete_keeps_the_file(self):
+        submission = self.submit(self.students[0], SimpleUploadedFile('a.txt', b'recycled'))
+        name = submission.file_upload.name
+        with self.captureOnCommitCallbacks() as callbacks:
+            submission.delete()
+        # The last release leaves the row at zero until the file is gone
+        self.assertEqual(StoredBlob.objects.get(name=name).ref_count, 0)
+        again = self.submit(self.students[1], SimpleUploadedFile('b.txt', b'recycled'))
+        self.assertEqual((again.file_upload.name, StoredBlob.objects.get(name=name).ref_count), (name, 1))
+        for callback in callbacks:
+            callback()
+        self.assertTrue(submission_storage.exists(name))
+
+    def test_missing_file_is_written_again_on_upload(self):
+        submission = self.submit(self.students[0], SimpleUploadedFile('a.txt', b'lost'))
+        name = submission.file_upload.name
+        with self.captureOnCommitCallbacks():
+            submission.delete()
+        # The pending delete got as far as unlinking before the upload took the row lock
+        os.unlink(submission_storage.path(name))
+        self.submit(self.students[1], SimpleUploadedFile('b.txt', b'lost'))
+        with submission_storage.open(name) as stored:
+            self.assertEqual(stored.read(), b'lost')
+
+    def test_reconcile_removes_files_without_a_row(self):
+        kept = self.submit(self.students[0], SimpleUploadedFile('a.txt', b'kept'))
+        with transaction.atomic():
+            rolled_back = self.submit(self.students[1], SimpleUploadedFile('b.txt', b'rolled back'))
+            transaction.set_rollback(True)
+        name = rolled_back.file_upload.name
+        self.assertTrue(submission_storage.exists(name))
+        self.assertFalse(StoredBlob.objects.filter(name=name).exists())
+        # Recent files may belong to an upload that has not committed yet
+        self.assertEqual(reconcile_blobs(), {})
+        old = time.time() - 2 * 3600
+        os.utime(submission_storage.path(name), (old, old))
+        os.utime(submission_storage.path(kept.file_upload.name), (old, old))
+        self.assertEqual(reconcile_blobs(), {name: (0, 0)})
+        self.assertFalse(submission_storage.exists(name))
+        self.assertTrue(submission_storage.exists(kept.file_upload.name))
+
+
+@override_settings(LMS_UPLOAD_CHUNK_SIZE=1000)
+class ChunkedUploadTests(TestCase):
+    """Large submission files arrive in resumable, fixed-size chunks"""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        course = create_course('UPL101', create_user('teacher', 'instructor'), assignments=1)
+        self.assignment = Assignment.objects.get(module__course=course)
+        self.student = create_user('uploader', 'student')
+        Enrollment.objects.create(student=self.student, course=course)
+        self.client.force_login(self.student)
+        self.content = os.urandom(2500)
+
+    def start(self, content=None, sha256=None):
+        content = self.content if content is None else content
+        response = self.client.post(reverse('upload_start'), {
+            'assignment': self.assignment.pk,
+            'filename': 'project.zip',
+            'size': len(content),
+            'sha256': sha256 or hashlib.sha256(content).hexdigest(),
+        })
+        self.assertEqual(response.status_code, 201)
+        return response.json()
+
+    def put(self, upload_id, offset, data):
+        return self.client.put(
+            reverse('upload_chunk', args=[upload_id]), data,
+            content_type='application/octet-stream', HTTP_UPLOAD_OFFSET=str(offset),
+        )
+
+    def complete(self, upload_id):
+        return self.client.post(reverse('upload_complete', args=[upload_id]))
+
+    def test_resumed_upload_is_verified_and_attached(self):
+        upload = self.start()
+        self.assertEqual((upload['chunk_size'], upload['offset']), (1000, 0))
+        self.assertEqual(self.put(upload['upload_id'], 0, self.content[:1000]).json()['offset'], 1000)
+
+        # The client lost track: a replayed or skipped chunk is refused with the offset to resume from
+        response = self.put(upload['upload_id'], 0, self.content[:1000])
+        self.assertEqual((response.status_code, response.json()['offset']), (409, 1000))
+        self.assertEqual(self.put(upload['upload_id'], 2000, self.content[2000:]).status_code, 409)
+        self.assertEqual(self.complete(upload['upload_id']).status_code, 409)
+
+        status = self.client.get(reverse('upload_chunk', args=[upload['upload_id']])).json()
+        for offset in range(status['offset'], len(self.content), 1000):
+            self.assertEqual(self.put(upload['upload_id'], offset, self.content[offset:offset + 1000]).status_code, 200)
+        response = self.complete(upload['upload_id'])
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()['complete'])
+
+        submission = Submission.objects.get(student=self.student, assignment=self.assignment)
+        self.assertEqual(response.json()['submission_id'], submission.pk)
+        self.assertEqual(submission.status, 'submitted')
+        with submission.file_upload.open('rb') as stored:
+            self.assertEqual(stored.read(), self.content)
+        self.assertTrue(submission.file_upload.name.endswith(hashlib.sha256(self.content).hexdigest() + '.zip'))
+        self.assertFalse(os.path.exists(part_path(UploadSession.objects.get())))
+
+    def test_chunks_must_have_the_fixed_size(self):
+        upload = self.start()
+        response = self.put(upload['upload_id'], 0, self.content[:999])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['offset'], 0)
+
+    def test_start_rejects_a_malformed_assignment_id(self):
+        for assignment in ('abc', ''):
+            response = self.client.post(reverse('upload_start'), {
+                'assignment': assignment, 'filename': 'x.zip', 'size': 1, 'sha256': '0' * 64,
+            })
+            self.assertEqual(response.status_code, 400, assignment)
+            self.assertIn('error', response.json())
+        response = self.client.post(reverse('upload_start'), {'filename': 'x.zip', 'size': 1, 'sha256': '0' * 64})
+        self.assertEqual(response.status_code, 400)
+
+    def test_digest_mismatch_resets_the_upload(self):
+        upload = self.start(content=b'a' * 10, sha256='0' * 64)
+        self.put(upload['upload_id'], 0, b'a' * 10)
+        response = self.complete(upload['upload_id'])
+        self.assertEqual((response.status_code, response.json()['offset']), (422, 0))
+        self.assertFalse(Submission.objects.exists())
+
+    def test_existing_content_is_not_stored_twice(self):
+        for _ in range(2):
+            upload = self.start(content=b'same file')
+            self.put(upload['upload_id'], 0, b'same file')
+            self.assertEqual(self.complete(upload['upload_id']).status_code, 200)
+        self.assertEqual(StoredBlob.objects.get().ref_count, 1)
+        self.assertEqual(Submission.objects.count(), 1)
+
+    def test_only_enrolled_students_and_owners(self):
+        other = create_user('outsider', 'student')
+        self.client.force_login(other)
+        response = self.client.post(reverse('upload_start'), {
+            'assignment': self.assignment.pk, 'filename': 'x.zip', 'size': 1, 'sha256': '0' * 64,
+        })
+        self.assertEqual(response.status_code, 403)
+        self.client.force_login(self.student)
+        upload = self.start()
+        self.client.force_login(other)
+        self.assertEqual(self.put(upload['upload_id'], 0, self.content[:1000]).status_code, 404)
+
+    def test_purge_expired_uploads(self):
+        upload = self.start()
+        session = UploadSession.objects.get(pk=upload['upload_id'])
+        UploadSession.objects.filter(pk=session.pk).update(updated_at=timezone.now() - timedelta(days=2))
+        self.assertEqual(purge_expired_uploads(), 1)
+        self.assertFalse(os.path.exists(part_path(session)))
+        self.assertFalse(UploadSession.objects.exists())
+
+
+@override_settings(LMS_IMAGE_WORKERS=0)
+class ProfilePictureVariantTests(TestCase):
+    """Uploaded profile pictures get small WebP variants for lists and headers"""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.user = create_user('pictured', 'student')
+        self.profile = UserProfile.objects.get(user=self.user)
+
+    def image(self, size=(900, 600), color='navy'):
+        from PIL import Image
+
+        buffer = BytesIO()
+        Image.new('RGB', size, color).save(buffer, 'JPEG')
+        return ContentFile(buffer.getvalue(), name='portrait.jpg')
+
+    def upload(self, **kwargs):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.profile.profile_picture = self.image(**kwargs)
+            self.profile.save()
+        self.profile.refresh_from_db()
+
+    def test_variants_are_built_after_upload(self):
+        from PIL import Image
+
+        self.upload()
+        storage = self.profile.profile_picture.storage
+        self.assertEqual(sorted(self.profile.picture_variants), sorted(AVATAR_VARIANTS))
+        for variant, edge in AVATAR_VARIANTS.items():
+            with storage.open(variant_name(self.profile.profile_picture.name, variant)) as stored:
+                with Image.open(stored) as image:
+                    self.assertEqual((image.format, image.size), ('WEBP', (edge, edge)))
+
+    def test_replacing_the_picture_rebuilds_variants(self):
+        self.upload()
+        old_thumb = variant_name(self.profile.profile_picture.name, 'thumb')
+        self.upload(color='red')
+        storage = self.profile.profile_picture.storage
+        self.assertFalse(storage.exists(old_thumb))
+        self.assertTrue(storage.exists(variant_name(self.profile.profile_picture.name, 'thumb')))
+        # Saving other fields leaves the variants alone
+        self.profile.phone_number = '555'
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            self.profile.save()
+        self.assertEqual(callbacks, [])
+
+    def test_avatar_tag_picks_the_smallest_adequate_variant(self):
+        template = Template('{% load avatars %}{% avatar_url profile 40 %}|{% avatar profile 100 %}')
+        self.assertEqual(template.render(Context({'profile': self.profile})), '|')
+        UserProfile.objects.filter(pk=self.profile.pk).update(profile_picture='profiles/p.jpg')
+        self.profile.refresh_from_db()
+        # Variants not built yet: the original is served
+        self.assertTrue(template.render(Context({'profile': self.profile})).startswith('/media/profiles/p.jpg|'))
+        self.profile.picture_variants = list(AVATAR_VARIANTS)
+        rendered = template.render(Context({'profile': self.profile}))
+        self.assertTrue(rendered.startswith('/media/profiles/variants/p.jpg.thumb.webp|'))
+        self.assertIn('src="/media/profiles/variants/p.jpg.small.webp"', rendered)
+        self.assertIn('/media/profiles/variants/p.jpg.medium.webp 2x', rendered)
+
+    def test_pictures_differing_only_by_extension_keep_their_own_variants(self):
+        from PIL import Image
+
+        other = UserProfile.objects.get(user=create_user('lookalike', 'student'))
+        for profile, name, color in ((self.profile, 'avatar.jpg', 'navy'), (other, 'avatar.png', 'red')):
+            buffer = BytesIO()
+            Image.new('RGB', (300, 300), color).save(buffer, 'JPEG' if name.endswith('jpg') else 'PNG')
+            with self.captureOnCommitCallbacks(execute=True):
+                profile.profile_picture = ContentFile(buffer.getvalue(), name=name)
+                profile.save()
+        self.assertEqual(self.profile.profile_picture.name, 'profiles/avatar.jpg')
+        self.assertEqual(other.profile_picture.name, 'profiles/avatar.png')
+        storage = self.profile.profile_picture.storage
+
+        def thumb_color(profile):
+            with storage.open(variant_name(profile.profile_picture.name, 'thumb')) as stored:
+                with Image.open(stored) as image:
+                    return image.convert('RGB').getpixel((32, 32))
+
+        self.assertGreater(thumb_color(self.profile)[2], 100)  # navy
+        self.assertGreater(thumb_color(other)[0], 200)  # red
+        # Replacing one picture leaves the other's variants in place
+        with self.captureOnCommitCallbacks(execute=True):
+            other.profile_picture = ContentFile(buffer.getvalue(), name='new.png')
+            other.save()
+        self.assertTrue(storage.exists(variant_name('profiles/avatar.jpg', 'thumb')))
+        self.assertFalse(storage.exists(variant_name('profiles/avatar.png', 'thumb')))
+
+    def test_variants_render_in_a_worker_process(self):
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(max_workers=1) as pool:
+            rendered = pool.submit(render_variants, self.image().read()).result()
+        self.assertEqual(set(rendered), set(AVATAR_VARIANTS))
+        self.upload()
+        with override_settings(LMS_IMAGE_WORKERS=1), mock.patch('lms_platform.core.images.get_executor') as executor:
+            build_variants(self.profile)
+        executor.return_value.submit.assert_called_once()
+
+    def test_admin_list_uses_the_thumbnail(self):
+        self.upload()
+        admin_user = User.objects.create_superuser('root', 'root@example.com', 'pw')
+        self.client.force_login(admin_user)
+        response = self.client.get(reverse('admin:core_userprofile_changelist'))
+        self.assertContains(response, variant_name(self.profile.profile_picture.name, 'thumb'))
+        self.assertNotContains(response, f'src="/media/{self.profile.profile_picture.name}"')
+
+    def test_backfill_command(self):
+        self.upload()
+        UserProfile.objects.filter(pk=self.profile.pk).update(picture_variants=[])
+        output = StringIO()
+        call_command('build_avatar_variants', stdout=output)
+        self.assertIn('Built variants for 1 profile picture(s), 0 failed.', output.getvalue())
+        self.profile.refresh_from_db()
+        self.assertEqual(sorted(self.profile.picture_variants), sorted(AVATAR_VARIANTS))
+
+
+class ProtectedMediaTests(TestCase):
+    """Uploaded files are only served to users allowed to see them"""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.instructor = create_user('lecturer', 'instructor')
+        course = create_course('MED101', self.instructor, assignments=1)
+        self.owner = create_user('owner', 'student')
+        self.other = create_user('classmate', 'student')
+        self.content = b'0123456789' * 100
+        submission = Submission.objects.create(
+            student=self.owner, assignment=Assignment.objects.get(module__course=course),
+            file_upload=SimpleUploadedFile('essay.txt', self.content),
+        )
+        self.name = submission.file_upload.name
+        self.url = submission.file_upload.url
+        self.etag = f'"{hashlib.sha256(self.content).hexdigest()}"'
+
+    def get(self, user=None, url=None, headers=None):
+        if user:
+            self.client.force_login(user)
+        return self.client.get(url or self.url, headers=headers)
+
+    def test_access_rules(self):
+        self.assertEqual(self.get().status_code, 404)
+        self.assertEqual(self.get(self.other).status_code, 404)
+        for user in (self.owner, self.instructor, User.objects.create_superuser('root', 'root@example.com', 'pw')):
+            response = self.get(user)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(b''.join(response.streaming_content), self.content)
+        self.assertEqual(response['ETag'], self.etag)
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertTrue(response['Cache-Control'].startswith('private'))
+
+    def test_authorization_lookup_uses_an_index(self):
+        plan = Submission.objects.filter(file_upload=self.name).explain()
+        if connection.vendor == 'sqlite':
+            self.assertRegex(plan, r'USING (COVERING )?INDEX \w*file_upload\w*')
+
+    def test_internal_and_unknown_paths_are_not_served(self):
+        os.makedirs(os.path.join(self.media_root, '.uploads'))
+        with open(os.path.join(self.media_root, '.uploads', 'x.part'), 'wb') as part:
+            part.write(b'secret')
+        for path in ('.uploads/x.part', 'submissions/../.uploads/x.part', 'other/file.txt', 'submissions/missing.txt'):
+            self.assertEqual(self.get(self.owner, url=f'/media/{path}').status_code, 404, path)
+
+    def test_profile_pictures_need_a_login(self):
+        profile = UserProfile.objects.get(user=self.owner)
+        profile.profile_picture = SimpleUploadedFile('me.png', b'not really a png')
+        with mock.patch('lms_platform.core.signals.build_variants'):
+            profile.save()
+        self.assertEqual(self.get(url=profile.profile_picture.url).status_code, 404)
+        self.assertEqual(self.get(self.other, url=profile.profile_picture.url)['Content-Type'], 'image/png')
+
+    def test_conditional_requests(self):
+        self.assertEqual(self.get(self.owner, headers={'If-None-Match': self.etag}).status_code, 304)
+        self.assertEqual(self.get(self.owner, headers={'If-None-Match': '"stale"'}).status_code, 200)
+
+    def test_range_requests(self):
+        response = self.get(self.owner, headers={'Range': 'bytes=2-5'})
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b''.join(response.streaming_content), b'2345')
+        self.assertEqual((response['Content-Range'], response['Content-Length']), ('bytes 2-5/1000', '4'))
+
+        response = self.get(headers={'Range': 'bytes=-3'})
+        self.assertEqual(b''.join(response.streaming_content), b'789')
+        response = self.get(headers={'Range': 'bytes=995-'})
+        self.assertEqual(response['Content-Range'], 'bytes 995-999/1000')
+
+        response = self.get(headers={'Range': 'bytes=1000-'})
+        self.assertEqual((response.status_code, response['Content-Range']), (416, 'bytes */1000'))
+        # Several ranges, or a stale If-Range, get the whole file
+        self.assertEqual(self.get(headers={'Range': 'bytes=0-1,5-6'}).status_code, 200)
+        self.assertEqual(self.get(headers={'Range': 'bytes=0-1', 'If-Range': '"stale"'}).status_code, 200)
+        self.assertEqual(self.get(headers={'Range': 'bytes=0-1', 'If-Range': self.etag}).status_code, 206)
+
+    def test_proxy_handoff(self):
+        with override_settings(LMS_MEDIA_ACCEL='x-accel-redirect'):
+            response = self.get(self.owner)
+        self.assertEqual(response['X-Accel-Redirect'], f'/protected-media/{self.name}')
+        self.assertEqual(response.content, b'')
+        with override_settings(LMS_MEDIA_ACCEL='x-sendfile'):
+            response = self.get(self.owner)
+        self.assertEqual(response['X-Sendfile'], os.path.join(self.media_root, self.name))
+        with override_settings(LMS_MEDIA_ACCEL='x-sendfile'):
+            self.assertEqual(self.get(self.other).status_code, 404)
+
+    def test_submissions_are_downloaded_not_rendered(self):
+        submission = Submission.objects.create(
+            student=self.other, assignment=Submission.objects.get(file_upload=self.name).assignment,
+            file_upload=SimpleUploadedFile('essay.html', b'<script>alert(document.cookie)</script>'),
+        )
+        url = submission.file_upload.url
+        for request_headers, status in ((None, 200), ({'Range': 'bytes=0-7'}, 206)):
+            response = self.get(self.instructor, url=url, headers=request_headers)
+            self.assertEqual(response.status_code, status)
+            self.assertTrue(response['Content-Disposition'].startswith('attachment'))
+            self.assertIn('sandbox', response['Content-Security-Policy'])
+            self.assertEqual(response['X-Content-Type-Options'], 'nosniff')
+        with override_settings(LMS_MEDIA_ACCEL='x-accel-redirect'):
+            response = self.get(url=url)
+        self.assertTrue(response['Content-Disposition'].startswith('attachment'))
+        self.assertIn('sandbox', response['Content-Security-Policy'])
+        # Avatars are still shown inline
+        profile = UserProfile.objects.get(user=self.owner)
+        profile.profile_picture = SimpleUploadedFile('me.png', b'not really a png')
+        with mock.patch('lms_platform.core.signals.build_variants'):
+            profile.save()
+        self.assertFalse(self.get(url=profile.profile_picture.url)['Content-Disposition'].startswith('attachment'))
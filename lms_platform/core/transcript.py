@@ -0,0 +1,114 @@
+"""
+Student transcripts: finalized courses with per-term and cumulative GPA.
+
+GPA is credit weighted: sum(gpa_points * credits) / sum(credits) over
+completed enrollments that have gpa_points. The per-term totals come from
+one query grouped by Course.term, and the course lines from one more.
+
+The assembled transcript is cached per student under a version stamp that
+is bumped whenever one of the student's enrollments changes (see
+core/signals.py, and core/finalization.py for bulk finalization), so a
+cached transcript is never served after the underlying grades change.
+As with profile versions (core/roles.py), the stamp must live in a cache
+shared by all workers for the invalidation to reach every process.
+"""
+from decimal import Decimal, ROUND_HALF_UP
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, DecimalField, F, Min, Sum
+
+from .models import Enrollment
+
+
+VERSION_CACHE_PREFIX = 'lms:transcript_version'
+CACHE_PREFIX = 'lms:transcript'
+
+TWO_PLACES = Decimal('0.01')
+
+
+def get_transcript_version(student_id):
+    """Current version stamp for a student's transcript, creating one if the cache is cold"""
+    key = f'{VERSION_CACHE_PREFIX}:{student_id}'
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, uuid4().hex, None)
+        version = cache.get(key)
+    return version
+
+
+def bump_transcript_versions(student_ids):
+    """Invalidate the cached transcripts of the given students"""
+    cache.set_many({f'{VERSION_CACHE_PREFIX}:{student_id}': uuid4().hex for student_id in student_ids}, None)
+
+
+def _gpa(quality_points, credits):
+    if not credits:
+        return None
+    return (Decimal(quality_points) / credits).quantize(TWO_PLACES, rounding=ROUND_HALF_UP)
+
+
+def term_totals(student_id):
+    """
+    [{term, credits, quality_points, courses, started}] for a student's
+    completed enrollments, oldest term first. One GROUP BY query.
+    """
+    return list(
+        Enrollment.objects.filter(student_id=student_id, status='completed', gpa_points__isnull=False)
+        .values(term=F('course__term'))
+        .annotate(
+            credits=Sum('course__credits'),
+            quality_points=Sum(
+                F('gpa_points') * F('course__credits'),
+                output_field=DecimalField(max_digits=12, decimal_places=2),
+            ),
+            courses=Count('id'),
+            started=Min('enrollment_date'),
+        )
+        .order_by('started')
+    )
+
+
+def build_transcript(student_id):
+    """Uncached transcript: terms with their courses and GPA, plus cumulative totals"""
+    totals = {row['term']: row for row in term_totals(student_id)}
+    courses = (
+        Enrollment.objects.filter(student_id=student_id, status='completed')
+        .order_by('enrollment_date', 'course__course_code')
+        .values(
+            'final_grade',
+            'gpa_points',
+            term=F('course__term'),
+            course_code=F('course__course_code'),
+            course_name=F('course__course_name'),
+            credits=F('course__credits'),
+        )
+    )
+
+    terms = {}
+    for course in courses:
+        term = terms.setdefault(course['term'], {'term': course['term'], 'courses': []})
+        term['courses'].append(course)
+    for term in terms.values():
+        row = totals.get(term['term'])
+        term['credits'] = row['credits'] if row else 0
+        term['gpa'] = _gpa(row['quality_points'], row['credits']) if row else None
+
+    credits = sum(row['credits'] for row in totals.values())
+    quality_points = sum((row['quality_points'] for row in totals.values()), Decimal('0'))
+    return {
+        'terms': list(terms.values()),
+        'total_credits': credits,
+        'cumulative_gpa': _gpa(quality_points, credits),
+    }
+
+
+def get_transcript(student_id):
+    """The student's transcript, served from cache while their version stamp is current"""
+    key = f'{CACHE_PREFIX}:{student_id}:{get_transcript_version(student_id)}'
+    transcript = cache.get(key)
+    if transcript is None:
+        transcript = build_transcript(student_id)
+        cache.set(key, transcript, settings.LMS_TRANSCRIPT_CACHE_TIMEOUT)
+    return transcript
@@ -0,0 +1,223 @@
+"""
+Resumable, chunked uploads of submission files.
+
+A client announces the file (name, size, SHA-256) and gets an upload id
+and a fixed chunk size back. It then PUTs the file one chunk at a time,
+each tagged with the byte offset it starts at. Chunks are streamed from
+the request straight into a part file in the upload temp area in
+COPY_BUFFER pieces, so memory use does not depend on the chunk or file
+size, and each chunk is fsynced before the session's offset moves past
+it. After a dropped connection the client asks for the status, learns
+the offset the server has, and carries on from there.
+
+Completing the upload hashes the part file, rejects it if the digest does
+not match the announced one, and otherwise attaches it to the student's
+Submission. The part file sits on the media filesystem by default, so the
+content-addressed storage (core/storage.py) renames it into place instead
+of copying it, and does not hash it a second time.
+"""
+import hashlib
+import os
+import re
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Enrollment, Submission, UploadSession
+
+
+# Bytes moved per read/write while streaming a chunk or hashing the file
+COPY_BUFFER = 64 * 1024
+
+SHA256_PATTERN = re.compile(r'^[0-9a-f]{64}$')
+
+
+class UploadError(Exception):
+    """A request the upload protocol rejects; status is the HTTP status to answer with"""
+
+    status = 400
+
+    def __init__(self, message, status=None):
+        super().__init__(message)
+        if status is not None:
+            self.status = status
+
+
+class OffsetMismatch(UploadError):
+    """A chunk that does not start where the server's copy ends"""
+
+    status = 409
+
+
+class VerifiedUpload(File):
+    """An assembled part file whose SHA-256 has already been checked"""
+
+    def __init__(self, path, name, sha256, size):
+        super().__init__(open(path, 'rb'), name=name)
+        self.path = path
+        self.sha256 = sha256
+        self.size = size
+
+    def temporary_file_path(self):
+        return self.path
+
+
+def upload_temp_dir():
+    return settings.LMS_UPLOAD_TEMP_DIR or os.path.join(settings.MEDIA_ROOT, '.uploads')
+
+
+def part_path(session):
+    return os.path.join(upload_temp_dir(), f'{session.pk}.part')
+
+
+def session_status(session):
+    """What a client needs to resume an upload"""
+    return {
+        'upload_id': str(session.pk),
+        'filename': session.filename,
+        'size': session.size,
+        'chunk_size': session.chunk_size,
+        'offset': session.offset,
+        'complete': session.completed_at is not None,
+        'submission_id': session.submission_id,
+    }
+
+
+def start_upload(user, assignment, filename, size, sha256):
+    """Open an upload session for one of the student's assignments"""
+    filename = os.path.basename(filename or '').strip()
+    sha256 = (sha256 or '').strip().lower()
+    if not filename:
+        raise UploadError('A filename is required')
+    if not SHA256_PATTERN.match(sha256):
+        raise UploadError('sha256 must be the hex SHA-256 digest of the file')
+    if not 0 < size <= settings.LMS_UPLOAD_MAX_SIZE:
+        raise UploadError(f'size must be between 1 and {settings.LMS_UPLOAD_MAX_SIZE} bytes')
+    if not Enrollment.objects.filter(student=user, course__modules__assignments=assignment, status='active').exists():
+        raise UploadError('You are not enrolled in this assignment\'s course', status=403)
+    if Submission.objects.filter(student=user, assignment=assignment, status='graded').exists():
+        raise UploadError('This assignment has already been graded', status=409)
+
+    session = UploadSession.objects.create(
+        user=user, assignment=assignment, filename=filename, size=size, sha256=sha256,
+        chunk_size=settings.LMS_UPLOAD_CHUNK_SIZE,
+    )
+    os.makedirs(upload_temp_dir(), exist_ok=True)
+    open(part_path(session), 'wb').close()
+    return session
+
+
+def write_chunk(session, offset, stream, length):
+    """
+    Append one chunk read from `stream` at `offset`. Every chunk but the
+    last must be exactly chunk_size bytes. Returns the new offset.
+    """
+    if session.completed_at:
+        raise UploadError('This upload is already complete', status=409)
+    if offset != session.offset:
+        raise OffsetMismatch(f'Expected a chunk at offset {session.offset}, not {offset}')
+    expected = min(session.chunk_size, session.size - offset)
+    if length != expected:
+        raise UploadError(f'The chunk at offset {offset} must be {expected} bytes, not {length}')
+
+    try:
+        part = open(part_path(session), 'r+b')
+    except FileNotFoundError:
+        raise UploadError('This upload has expired; start a new one', status=410)
+    with part:
+        # Drop anything a previously interrupted attempt left past the offset
+        part.seek(offset)
+        part.truncate()
+        written = 0
+        while written < length:
+            data = stream.read(min(COPY_BUFFER, length - written))
+            if not data:
+                break
+            part.write(data)
+            written += len(data)
+        if written != length:
+            part.truncate(offset)
+            raise UploadError(f'Received {written} of {length} bytes; resend the chunk')
+        part.flush()
+        os.fsync(part.fileno())
+
+    # Another request for the same offset may have finished first
+    if not UploadSession.objects.filter(pk=session.pk, offset=offset).update(
+        offset=offset + length, updated_at=timezone.now()
+    ):
+        session.refresh_from_db(fields=['offset'])
+        raise OffsetMismatch(f'The chunk at offset {offset} was already received')
+    session.offset = offset + length
+    return session.offset
+
+
+def file_sha256(path):
+    sha256 = hashlib.sha256()
+    with open(path, 'rb') as part:
+        for data in iter(lambda: part.read(COPY_BUFFER), b''):
+            sha256.update(data)
+    return sha256.hexdigest()
+
+
+def complete_upload(session):
+    """
+    Verify the assembled file and attach it to the student's submission
+    for the assignment (creating it if needed). A digest mismatch resets
+    the upload to offset 0.
+    """
+    if session.completed_at:
+        return session.submission
+    if session.offset != session.size:
+        raise UploadError(f'{session.size - session.offset} byte(s) have not been uploaded yet', status=409)
+    path = part_path(session)
+    if not os.path.exists(path):
+        raise UploadError('This upload has expired; start a new one', status=410)
+    digest = file_sha256(path)
+    if digest != session.sha256:
+        open(path, 'wb').close()
+        UploadSession.objects.filter(pk=session.pk).update(offset=0)
+        session.offset = 0
+        raise UploadError('The uploaded file does not match its SHA-256 digest; upload it again', status=422)
+
+    upload = VerifiedUpload(path, session.filename, digest, session.size)
+    try:
+        with transaction.atomic():
+            submission = (
+                Submission.objects.select_for_update()
+                .filter(student_id=session.user_id, assignment_id=session.assignment_id)
+                .first()
+            ) or Submission(student_id=session.user_id, assignment_id=session.assignment_id)
+            if submission.status == 'graded':
+                raise UploadError('This assignment has already been graded', status=409)
+            # Assigned rather than FieldFile.save() so the replaced file's reference is released
+            submission.file_upload = upload
+            submission.save()
+            session.submission = submission
+            session.completed_at = timezone.now()
+            session.save(update_fields=['submission', 'completed_at', 'updated_at'])
+    finally:
+        upload.close()
+    # The storage leaves the part file behind when the content was already stored
+    if os.path.exists(path):
+        os.unlink(path)
+    return submission
+
+
+def purge_expired_uploads(hours=None):
+    """Delete unfinished uploads (and their part files) idle for longer than `hours`"""
+    hours = settings.LMS_UPLOAD_EXPIRY_HOURS if hours is None else hours
+    expired = UploadSession.objects.filter(
+        completed_at__isnull=True, updated_at__lt=timezone.now() - timedelta(hours=hours)
+    )
+    purged = []
+    for session in expired.only('id').iterator():
+        try:
+            os.unlink(part_path(session))
+        except FileNotFoundError:
+            pass
+        purged.append(session.pk)
+    UploadSession.objects.filter(pk__in=purged).delete()
+    return len(purged)
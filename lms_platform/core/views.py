@@ -1,9 +1,14 @@
-from django.shortcuts import render, redirect
+from django.shortcuts import get_object_or_404, render, redirect
 from django.contrib.auth import authenticate, login, logout
-from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.http import HttpResponseForbidden
-from .models import UserProfile, Enrollment, Course, Assignment, Submission
+from django.http import JsonResponse
+from django.views.decorators.http import require_http_methods, require_POST, require_safe
+from .models import Assignment, UploadSession, UserProfile
+from .dashboard import build_student_dashboard
+from .media import serve_media
+from .roles import remember_profile, role_required
+from .transcript import get_transcript
+from .uploads import UploadError, complete_upload, session_status, start_upload, write_chunk
 
 def index(request):
     context = {
@@ -25,6 +30,7 @@ def student_login(request):
                 profile = UserProfile.objects.get(user=user)
                 if profile.role == 'student':
                     login(request, user)
+                    remember_profile(request, profile)  # later requests skip the profile query
                     return redirect('student_dashboard')
                 else:
                     messages.error(request, 'Access denied. Student accounts only.')
@@ -35,48 +41,94 @@ def student_login(request):
     
     return render(request, 'student/login.html')
 
-@login_required
+@role_required('student')
 def student_dashboard(request):
     """Student dashboard showing enrolled courses"""
-    # Check if user is a student
-    try:
-        profile = UserProfile.objects.get(user=request.user)
-        if profile.role != 'student':
-            return HttpResponseForbidden("Access denied. Students only.")
-    except UserProfile.DoesNotExist:
-        return HttpResponseForbidden("Student profile not found.")
-    
-    # Get student's enrollments and related data
-    enrollments = Enrollment.objects.filter(
-        student=request.user, 
-        status='active'
-    ).select_related('course', 'course__instructor')
-    
-    # Get recent assignments for enrolled courses
-    enrolled_course_ids = enrollments.values_list('course_id', flat=True)
-    recent_assignments = Assignment.objects.filter(
-        module__course_id__in=enrolled_course_ids
-    ).order_by('-created_at')[:5]
-    
-    # Get recent submissions by this student
-    recent_submissions = Submission.objects.filter(
-        student=request.user
-    ).order_by('-submission_date')[:5]
-    
-    context = {
-        'profile': profile,
-        'enrollments': enrollments,
-        'recent_assignments': recent_assignments,
-        'recent_submissions': recent_submissions,
-        'total_courses': enrollments.count(),
-        'total_submissions': Submission.objects.filter(student=request.user).count(),
-        'graded_submissions': Submission.objects.filter(student=request.user, status='graded').count(),
-    }
+    # Enrollments, recent activity and totals come from the dashboard read model
+    context = build_student_dashboard(request.user)
+    context['profile'] = request.lms_profile
     
     return render(request, 'student/dashboard.html', context)
 
+@role_required('student')
+def student_transcript(request):
+    """Student transcript with per-term and cumulative GPA"""
+    context = get_transcript(request.user.pk)
+    context['profile'] = request.lms_profile
+
+    return render(request, 'student/transcript.html', context)
+
 def student_logout(request):
     """Student logout view"""
     logout(request)
     messages.success(request, 'You have been logged out successfully.')
-    return redirect('student_login')
\ No newline at end of file
+    return redirect('student_login')
+
+# Resumable submission uploads (see core/uploads.py)
+def upload_error(error, session=None):
+    data = {'error': str(error)}
+    if session is not None:
+        data.update(session_status(session))
+    return JsonResponse(data, status=error.status)
+
+
+@role_required('student')
+@require_POST
+def upload_start(request):
+    """Open a chunked upload: assignment, filename, size and sha256 form fields"""
+    try:
+        assignment_id = int(request.POST.get('assignment', ''))
+    except ValueError:
+        return JsonResponse({'error': 'assignment must be an assignment id'}, status=400)
+    assignment = get_object_or_404(Assignment, pk=assignment_id)
+    try:
+        size = int(request.POST.get('size', ''))
+    except ValueError:
+        return JsonResponse({'error': 'size must be a whole number of bytes'}, status=400)
+    try:
+        session = start_upload(
+            request.user, assignment, request.POST.get('filename'), size, request.POST.get('sha256'),
+        )
+    except UploadError as error:
+        return upload_error(error)
+    return JsonResponse(session_status(session), status=201)
+
+
+@role_required('student')
+@require_http_methods(['GET', 'PUT'])
+def upload_chunk(request, upload_id):
+    """
+    GET: the upload's status (the offset to resume from).
+    PUT: one chunk as the raw request body, starting at the Upload-Offset header.
+    """
+    session = get_object_or_404(UploadSession, pk=upload_id, user=request.user)
+    if request.method == 'GET':
+        return JsonResponse(session_status(session))
+    try:
+        offset = int(request.headers.get('Upload-Offset', ''))
+        length = int(request.headers.get('Content-Length', ''))
+    except ValueError:
+        return JsonResponse({'error': 'Upload-Offset and Content-Length headers are required'}, status=400)
+    try:
+        write_chunk(session, offset, request, length)
+    except UploadError as error:
+        return upload_error(error, session)
+    return JsonResponse(session_status(session))
+
+
+@role_required('student')
+@require_POST
+def upload_complete(request, upload_id):
+    """Verify the assembled file and attach it to the student's submission"""
+    session = get_object_or_404(UploadSession, pk=upload_id, user=request.user)
+    try:
+        complete_upload(session)
+    except UploadError as error:
+        return upload_error(error, session)
+    return JsonResponse(session_status(session))
+
+
+@require_safe
+def protected_media(request, name):
+    """Uploaded files, after checking the user may see them (see core/media.py)"""
+    return serve_media(request, name)
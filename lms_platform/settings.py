@@ -50,10 +50,12 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",
+    "lms_platform.core.middleware.QueryInstrumentationMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware", 
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "lms_platform.core.middleware.LMSRoleMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
@@ -146,7 +148,86 @@ STATICFILES_DIRS = [
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Media is always served through the authorizing view in core/media.py.
+# LMS_MEDIA_ACCEL picks how authorized files are sent: '' streams them from
+# Django (with Range/ETag support), 'x-accel-redirect' hands them to nginx
+# and 'x-sendfile' to Apache (mod_xsendfile) or lighttpd. For nginx, alias
+# an internal location to MEDIA_ROOT:
+#   location /protected-media/ { internal; alias /path/to/media/; }
+LMS_MEDIA_ACCEL = config('LMS_MEDIA_ACCEL', default='')
+LMS_MEDIA_ACCEL_PREFIX = config('LMS_MEDIA_ACCEL_PREFIX', default='/protected-media/')
+# Seconds browsers may reuse a downloaded file (responses are marked private)
+LMS_MEDIA_MAX_AGE = config('LMS_MEDIA_MAX_AGE', default=3600, cast=int)
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.0/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
+
+# Cache
+# Use a shared backend (e.g. django.core.cache.backends.redis.RedisCache) in
+# production so profile/role invalidations reach every worker process
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default=''),
+    }
+}
+
+# LMS dashboard statistics
+# Seconds that grouped dashboard aggregates (core/stats.py) stay cached
+LMS_STATS_CACHE_TIMEOUT = config('LMS_STATS_CACHE_TIMEOUT', default=60, cast=int)
+
+# Seconds a student's transcript stays cached (it is also invalidated
+# whenever their enrollments change)
+LMS_TRANSCRIPT_CACHE_TIMEOUT = config('LMS_TRANSCRIPT_CACHE_TIMEOUT', default=3600, cast=int)
+
+# Per-request query instrumentation (core/middleware.py)
+# 'off', 'staff' (staff opt in with ?_lms_queries=1) or 'all' (timings for
+# everyone; SQL text in the response only for staff)
+LMS_QUERY_INSTRUMENTATION = config('LMS_QUERY_INSTRUMENTATION', default='staff')
+LMS_QUERY_TOP_N = config('LMS_QUERY_TOP_N', default=5, cast=int)
+LMS_QUERY_COUNT_WARNING = config('LMS_QUERY_COUNT_WARNING', default=50, cast=int)
+
+# Gradebook (core/gradebook.py)
+# Relative weight of each assignment type in a course grade
+LMS_GRADE_WEIGHTS = {
+    'homework': 20,
+    'quiz': 20,
+    'exam': 35,
+    'project': 25,
+}
+
+# Grading queue (core/grading_queue.py)
+# Seconds a grader's claim on a submission lasts before others can take it
+LMS_GRADING_LEASE_SECONDS = config('LMS_GRADING_LEASE_SECONDS', default=900, cast=int)
+
+# Resumable submission uploads (core/uploads.py)
+LMS_UPLOAD_CHUNK_SIZE = config('LMS_UPLOAD_CHUNK_SIZE', default=5 * 1024 * 1024, cast=int)
+LMS_UPLOAD_MAX_SIZE = config('LMS_UPLOAD_MAX_SIZE', default=2 * 1024 ** 3, cast=int)
+# Unfinished uploads older than this are purged by the purge_uploads command
+LMS_UPLOAD_EXPIRY_HOURS = config('LMS_UPLOAD_EXPIRY_HOURS', default=24, cast=int)
+# Where part files are written; empty means MEDIA_ROOT/.uploads, which keeps
+# them on the media filesystem so completing an upload is a rename, not a copy
+LMS_UPLOAD_TEMP_DIR = config('LMS_UPLOAD_TEMP_DIR', default='')
+
+# Profile picture variants (core/images.py)
+# Worker processes that resize uploads; 0 resizes inline on the request thread
+LMS_IMAGE_WORKERS = config('LMS_IMAGE_WORKERS', default=2, cast=int)
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'lms_platform.queries': {
+            'handlers': ['console'],
+            'level': config('LMS_QUERY_LOG_LEVEL', default='INFO'),
+            'propagate': False,
+        },
+    },
+}
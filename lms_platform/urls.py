@@ -16,10 +16,17 @@ urlpatterns = [
     
     # Student Portal URLs
     path("student/", core_views.student_dashboard, name='student_dashboard'),
+    path("student/transcript/", core_views.student_transcript, name='student_transcript'),
+    path("student/uploads/", core_views.upload_start, name='upload_start'),
+    path("student/uploads/<uuid:upload_id>/", core_views.upload_chunk, name='upload_chunk'),
+    path("student/uploads/<uuid:upload_id>/complete/", core_views.upload_complete, name='upload_complete'),
     path("student/login/", core_views.student_login, name='student_login'),
     path("student/logout/", core_views.student_logout, name='student_logout'),
+
+    # Uploaded files are private, so they are served in every environment
+    # through a view that checks permissions first
+    path(f"{settings.MEDIA_URL.strip('/')}/<path:name>", core_views.protected_media, name='protected_media'),
 ]
 
 if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
     urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
\ No newline at end of file